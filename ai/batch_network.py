@@ -0,0 +1,175 @@
+# ------------------ IMPORTS ------------------
+
+
+import neat
+import numpy as np
+from typing import List
+from neat.graphs import feed_forward_layers
+from ai.policy import ACTIVATIONS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+AGGREGATIONS = ("sum",)
+
+
+# ------------------ CLASSES ------------------
+
+
+class BatchNetwork:
+    """The feed-forward networks of a whole generation compiled into padded numpy arrays
+
+    Every genome gets one row. Its node values are stored in columns: the inputs first, then the evaluated
+    nodes in the order neat evaluates them, then a column which always holds 0 (for the outputs that are not
+    connected) and a scratch column (for the padding). The nodes are grouped by feed-forward layer, so one
+    layer of every network is computed at once, and the weighted inputs of a node are added in the same order
+    as in neat.nn.FeedForwardNetwork.activate.
+    """
+
+    def __init__(self, input_count: int, layers: List[dict], output_columns: np.ndarray, column_count: int):
+        self.input_count = input_count
+        self.layers = layers
+        self.output_columns = output_columns
+        self.column_count = column_count
+
+    @classmethod
+    def create(cls, genomes: List[neat.DefaultGenome], config: neat.Config) -> "BatchNetwork":
+        """Compile the networks of the given genomes
+
+        Args:
+            genomes (List[neat.DefaultGenome]): The genomes, in the order of the rows
+            config (neat.Config): The neat configuration
+
+        Returns:
+            BatchNetwork: The compiled networks
+        """
+        genome_config = config.genome_config
+        input_keys = genome_config.input_keys
+        output_keys = genome_config.output_keys
+        activation_names = sorted(ACTIVATIONS)
+
+        # Same node order and inputs order as neat.nn.FeedForwardNetwork.create
+        networks = []
+        for genome in genomes:
+            connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+            network_layers = []
+            for layer in feed_forward_layers(input_keys, output_keys, connections):
+                nodes = []
+                for node in layer:
+                    ng = genome.nodes[node]
+                    if ng.aggregation not in AGGREGATIONS:
+                        raise ValueError(f"Aggregation function '{ng.aggregation}' is not supported by BatchNetwork")
+                    if ng.activation not in ACTIVATIONS:
+                        raise ValueError(f"Activation function '{ng.activation}' is not supported by BatchNetwork")
+                    links = [(i, genome.connections[(i, o)].weight) for (i, o) in connections if o == node]
+                    nodes.append((node, activation_names.index(ng.activation), ng.bias, ng.response, links))
+                network_layers.append(nodes)
+            networks.append(network_layers)
+
+        node_count = max((sum(len(layer) for layer in layers) for layers in networks), default=0)
+        zero_column = len(input_keys) + node_count
+        scratch_column = zero_column + 1
+        layer_count = max((len(layers) for layers in networks), default=0)
+
+        columns = []
+        for layers in networks:
+            column = {key: i for i, key in enumerate(input_keys)}
+            for nodes in layers:
+                for node in nodes:
+                    column[node[0]] = len(column)
+            columns.append(column)
+
+        layers = []
+        for depth in range(layer_count):
+            width = max(len(layers_[depth]) if depth < len(layers_) else 0 for layers_ in networks)
+            fan_in = max((len(node[4]) for layers_ in networks if depth < len(layers_) for node in layers_[depth]), default=0)
+
+            targets = np.full((len(genomes), width), scratch_column, dtype=int)
+            activations = np.zeros((len(genomes), width), dtype=int)
+            biases = np.zeros((len(genomes), width))
+            responses = np.zeros((len(genomes), width))
+            sources = np.full((len(genomes), width, fan_in), zero_column, dtype=int)
+            weights = np.zeros((len(genomes), width, fan_in))
+
+            for row, layers_ in enumerate(networks):
+                if depth >= len(layers_):
+                    continue
+                column = columns[row]
+                for j, (node, activation, bias, response, links) in enumerate(layers_[depth]):
+                    targets[row, j] = column[node]
+                    activations[row, j] = activation
+                    biases[row, j] = bias
+                    responses[row, j] = response
+                    for k, (source, weight) in enumerate(links):
+                        sources[row, j, k] = column[source]
+                        weights[row, j, k] = weight
+
+            layers.append({
+                "targets": targets,
+                "activations": activations,
+                "used_activations": [activation_names[i] for i in np.unique(activations[targets != scratch_column])],
+                "biases": biases,
+                "responses": responses,
+                "sources": sources,
+                "weights": weights,
+            })
+
+        output_columns = np.array([[column.get(key, zero_column) for key in output_keys] for column in columns],
+                                  dtype=int).reshape(len(genomes), len(output_keys))
+
+        return cls(len(input_keys), layers, output_columns, scratch_column + 1)
+
+    def activate(self, inputs: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Activate many networks at once (see neat.nn.FeedForwardNetwork.activate)
+
+        Args:
+            inputs (np.ndarray): The (n, inputs) inputs, one line per network
+            rows (np.ndarray): The n networks to activate, all of them in order if None
+
+        Returns:
+            np.ndarray: The (n, outputs) outputs
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        if rows is None:
+            rows = np.arange(len(self.output_columns))
+        activation_names = sorted(ACTIVATIONS)
+
+        values = np.zeros((len(rows), self.column_count))
+        values[:, :self.input_count] = inputs
+        line = np.arange(len(rows))[:, None]
+
+        for layer in self.layers:
+            sources = layer["sources"][rows]
+            weights = layer["weights"][rows]
+
+            total = np.zeros(sources.shape[:2])
+            for k in range(sources.shape[2]):
+                total += values[line, sources[:, :, k]] * weights[:, :, k]
+            z = layer["biases"][rows] + layer["responses"][rows] * total
+
+            used_activations = layer["used_activations"]
+            if len(used_activations) == 1:
+                output = ACTIVATIONS[used_activations[0]](z)
+            else:
+                output = np.zeros_like(z)
+                activations = layer["activations"][rows]
+                for name in used_activations:
+                    mask = activations == activation_names.index(name)
+                    output[mask] = ACTIVATIONS[name](z[mask])
+
+            values[line, layer["targets"][rows]] = output
+
+        return values[line, self.output_columns[rows]]
+
+    def choose(self, inputs: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Get the index of the highest output of many networks at once (the Action chosen by each car)
+
+        Args:
+            inputs (np.ndarray): The (n, inputs) inputs, one line per network
+            rows (np.ndarray): The n networks to activate, all of them in order if None
+
+        Returns:
+            np.ndarray: The (n,) chosen outputs
+        """
+        return self.activate(inputs, rows).argmax(axis=1)
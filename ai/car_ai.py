@@ -1,10 +1,16 @@
 # ------------------ IMPORTS ------------------
 
 
+import os
 import neat
-import pygame
-from render.car import Car, Action
+import numpy as np
+from ai.batch_network import BatchNetwork
+from ai.metrics import Metrics
+from ai.replay import ReplayWriter
+from render.car import Car
+from render.car_fleet import CarFleet
 from render.neural_network.nn import NN
+from render.sensors import DistanceFieldRayCaster, GridRayCaster, SegmentRayCaster
 from render.track import Track
 
 
@@ -15,81 +21,245 @@ class CarAI:
     TOTAL_GENERATIONS = 0
     TIME_LIMIT = 15
 
-    def __init__(self, genomes: neat.DefaultGenome, config: neat.Config, start_position: list, track: Track):
+    # Simulation ticks of a headless generation, the same budget as TIME_LIMIT at 60 FPS
+    STEP_LIMIT = 900
+
+    # "field" sphere traces the sensors of every car on the track's distance field, "grid" walks them pixel by
+    # pixel on the track's wall grid, "vector" intersects them (and the cars) with the walls' boundaries
+    SENSOR_BACKEND = "field"
+
+    # A car which is less than STALL_DISTANCE pixels away from where it was STALL_WINDOW ticks earlier is killed
+    # (a car spinning in place never gets further than a few car lengths), 0 disables it (90 ticks for instance)
+    STALL_WINDOW = 0
+    STALL_DISTANCE = 3 * Car.CAR_SIZE_X
+
+    # Every genome drives START_POSES cars, from poses spread along the track (see CarFleet.get_start_poses), and
+    # gets the POSE_REDUCER of their fitnesses: "mean", "min" or a quantile between 0 and 1 (0.25 for the first
+    # quartile), the latter two favouring the genomes which drive well from everywhere
+    START_POSES = 1
+    POSE_REDUCER = "mean"
+
+    # A car which has not driven further along the track for PATIENCE ticks is killed, 0 disables it (300 ticks for
+    # instance). Like the stall detection, it is decided car by car, so a genome gets the same fitness whatever it is
+    # simulated with, which an early end of the whole generation would not give
+    PATIENCE = 0
+
+    # The settings above which are changed from the command line, to be given to the worker processes and to be
+    # part of the fitness cache's context
+    SETTINGS = ("SENSOR_BACKEND", "STALL_WINDOW", "STALL_DISTANCE", "PATIENCE", "START_POSES", "POSE_REDUCER")
+
+    # Where the neural network of the best car is drawn
+    NN_POSITION = (60, 130)
+
+    def __init__(self, genomes: neat.DefaultGenome, config: neat.Config, start_position: list, track: Track,
+                 start_angle: int = Car.DEFAULT_ANGLE, visualise: bool = True, metrics: Metrics = None,
+                 replay_directory: str = None):
         CarAI.TOTAL_GENERATIONS += 1
         
         self.genomes = genomes
-
-        self.cars = []
-        self.nets = []
+        self.config = config
+        self.visualise = visualise
+        self.metrics = metrics if metrics is not None else Metrics()
         
         self.best_fitness = 0
-        self.nns = []
+
+        # Only the network of the best car is drawn, its visualisation is built when a car becomes the best one
+        self.nns = {}
         self.best_nn = None
 
-        # We create a neural network for every given genome
+        # We compile the neural networks of every given genome into a single batch
+        self.network = BatchNetwork.create([genome for _, genome in genomes], config)
         for _, genome in genomes:
-            net = neat.nn.FeedForwardNetwork.create(genome, config)
-            self.nets.append(net)
             genome.fitness = 0
-            self.cars.append(Car(start_position, track))
-            self.nns.append(NN(config, genome, (60, 130)))
 
-        self.remaining_cars = len(self.cars)
+        # The track does not change during a generation, the arrays derived from it are cached by the track
+        wall_segments = None
+        if CarAI.SENSOR_BACKEND == "grid":
+            ray_caster = GridRayCaster(track.get_collision_grid())
+        elif CarAI.SENSOR_BACKEND == "vector":
+            wall_segments = track.get_wall_segments()
+            ray_caster = SegmentRayCaster(wall_segments)
+        else:
+            ray_caster = DistanceFieldRayCaster(track.get_distance_field())
+
+        # Every car of the generation lives in a single fleet, the i-th car being driven by the i-th genome, from
+        # the first start pose, then the (len(genomes) + i)-th car from the second one and so on
+        if CarAI.START_POSES > 1:
+            poses = CarFleet.get_start_poses(track, start_position, start_angle, CarAI.START_POSES)
+            positions = np.repeat([position for position, _ in poses], len(genomes), axis=0)
+            angles = np.repeat([angle for _, angle in poses], len(genomes))
+        else:
+            poses = None
+            positions, angles = start_position, start_angle
+        self.fleet = CarFleet(len(genomes) * CarAI.START_POSES, positions, track, angles, ray_caster, self.metrics,
+                              CarAI.STALL_WINDOW, CarAI.STALL_DISTANCE, wall_segments, CarAI.PATIENCE)
+        self.fitness = np.zeros(self.fleet.size)
+        self.best_car = None
+
+        self.ticks = 0
+
+        # Every tick of the generation is recorded, to be played back with render.replay_viewer
+        self.recorder = None
+        if replay_directory is not None:
+            path = os.path.join(replay_directory, ReplayWriter.FILE_NAME % CarAI.TOTAL_GENERATIONS)
+            self.recorder = ReplayWriter(path, track, self.fleet.size, len(self.fleet.ray_caster.sensor_angles),
+                                         start_position, start_angle, CarAI.TOTAL_GENERATIONS, poses)
+
+        self.remaining_cars = self.fleet.size
         self.best_nn = None
         self.best_input = None
+        self.best_output = None
 
-    def compute(self, track: pygame.Surface) -> None:
-        """Compute the next move of every car and update their fitness
+    def compute(self) -> None:
+        """Compute the next move of every car and update their fitness"""
+        self.metrics.mark()
+        cars = np.flatnonzero(self.fleet.alive)
+        car_data = self.fleet.get_data(cars)
 
-        Args:
-            genomes (neat.DefaultGenome): The neat genomes
-            track (pygame.Surface): The track on which the car is being drawn
-            width (int): The width of the window
-        """
-        i = 0
-        for car, net in zip(self.cars, self.nets):
-            
-            car_data = car.get_data()
-
-            # Activate the neural network and get the output from the car_data (input)
-            output = net.activate(car_data)
-            
-            # Output gets treated and the car is updated in the next lines
-            choice = output.index(max(output))
-            
-            # Refreshing nodes of all neural networks
-            for node in self.nns[i].nodes:
-                node.inputs = car_data
-                node.output = choice
-
-            # 0: Left
-            if choice == Action.TURN_LEFT:
-                car.turn_left()
-
-            # 1: Right
-            elif choice == Action.TURN_RIGHT:
-                car.turn_right()
-
-            # 2: Accelerate
-            elif choice == Action.ACCELERATE:
-                car.accelerate()
-
-            # 3: Brake
-            elif choice == Action.BRAKE:
-                car.brake()
-                
-            i += 1
+        # Activate the neural networks of every living car at once and get their output from the car_data (input)
+        choices = self.network.choose(car_data, cars % len(self.genomes))
+        self.metrics.lap("inference")
+
+        # 0: Left, 1: Right, 2: Accelerate, 3: Brake
+        self.fleet.apply_actions(cars, choices)
 
         # Refresh cars sprites, number of cars which are still alive and update their fitness
-        self.remaining_cars = sum(1 for car in self.cars if car.alive)
+        self.remaining_cars = len(cars)
 
-        # We draw the car if it is still alive
         # We also update the fitness of every car by giving them the reward they got for their last move
-        for i, car in enumerate(self.cars):
-            if car.alive:
-                car.update_sprite(track)
-                self.genomes[i][1].fitness += car.get_reward()
-                if self.genomes[i][1].fitness > self.best_fitness:
-                    self.best_fitness = self.genomes[i][1].fitness
-                    self.best_nn = self.nns[i]
+        updated_cars = self.fleet.update()
+        self.fitness[updated_cars] += self.fleet.get_rewards(updated_cars)
+        self.ticks += 1
+        self.metrics.count("ticks")
+        self.metrics.count("car_ticks", len(updated_cars))
+
+        if len(updated_cars):
+            best_car = int(self.fitness.argmax())
+            if self.fitness[best_car] > self.best_fitness:
+                self.best_fitness = self.fitness[best_car]
+                self.best_car = best_car
+                self.best_nn = self.get_nn(best_car)
+
+        # Refreshing the inputs and output of the best car, shown by the nodes of its neural network
+        if self.best_car is not None and self.best_car in cars:
+            j = int(np.searchsorted(cars, self.best_car))
+            self.best_input = car_data[j].tolist()
+            self.best_output = int(choices[j])
+            if self.best_nn is not None:
+                self.best_nn.update(self.best_input, self.best_output)
+        self.metrics.lap("fitness")
+
+        if self.recorder is not None:
+            self.recorder.write(self.fleet, cars, choices, self.fitness)
+            self.metrics.lap("recording")
+
+    def get_nn(self, car: int) -> NN:
+        """Get the visualisation of the neural network of a car, building it the first time
+
+        Args:
+            car (int): The index of the car
+
+        Returns:
+            NN: The visualisation, None if the generation is not visualised
+        """
+        if not self.visualise:
+            return None
+        if car not in self.nns:
+            self.nns[car] = NN(self.config, self.genomes[car % len(self.genomes)][1], CarAI.NN_POSITION)
+        return self.nns[car]
+
+    def is_over(self) -> bool:
+        """Check whether the generation is over, because every car crashed, stalled or stopped getting further
+
+        Returns:
+            bool: True if the generation is over
+        """
+        return self.remaining_cars == 0
+
+    def simulate(self, step_limit: int = STEP_LIMIT) -> int:
+        """Run the whole generation without any display and give every genome its fitness
+
+        Args:
+            step_limit (int): The maximum number of simulation ticks
+
+        Returns:
+            int: The number of ticks which were simulated
+        """
+        ticks = 0
+        while ticks < step_limit:
+            self.compute()
+            ticks += 1
+
+            if self.is_over():
+                break
+
+        self.assign_fitness(step_limit)
+        return ticks
+
+    def get_final_cars(self, step_limit: int = STEP_LIMIT) -> np.ndarray:
+        """Tell which cars have a fitness which would not change if the generation went on: the dead ones, or
+        every car once the step limit is reached
+
+        Args:
+            step_limit (int): The maximum number of simulation ticks of the generation
+
+        Returns:
+            np.ndarray: Whether the fitness of each genome is final, which is when the ones of all its cars are
+        """
+        final = ~self.fleet.alive | (self.ticks >= step_limit)
+        return final.reshape(-1, len(self.genomes)).all(axis=0)
+
+    def get_genome_fitness(self) -> np.ndarray:
+        """Combine the fitnesses of the cars of every genome with POSE_REDUCER
+
+        Returns:
+            np.ndarray: The fitness of each genome
+        """
+        return CarAI.reduce_fitness(self.fitness.reshape(-1, len(self.genomes)), CarAI.POSE_REDUCER)
+
+    def get_genome_laps(self) -> np.ndarray:
+        """Get the most laps driven by the cars of every genome
+
+        Returns:
+            np.ndarray: The laps of each genome
+        """
+        return self.fleet.laps.reshape(-1, len(self.genomes)).max(axis=0)
+
+    @staticmethod
+    def reduce_fitness(fitness: np.ndarray, reducer: str) -> np.ndarray:
+        """Combine several fitnesses of every genome into one
+
+        Args:
+            fitness (np.ndarray): The fitnesses, one row per evaluation and one column per genome
+            reducer (str): "mean", "min" or a quantile between 0 and 1
+
+        Returns:
+            np.ndarray: The fitness of each genome
+        """
+        if reducer == "mean":
+            return fitness.mean(axis=0)
+        if reducer == "min":
+            return fitness.min(axis=0)
+        return np.quantile(fitness, float(reducer), axis=0)
+
+    def assign_fitness(self, step_limit: int = STEP_LIMIT) -> None:
+        """Give every genome the fitness its car has gathered, to be called once the generation is over
+
+        The car-ticks saved by the stall detection and by PATIENCE are also counted in the metrics. They are upper
+        bounds, every car which was stopped is assumed to have lived until the step limit.
+
+        Args:
+            step_limit (int): The maximum number of simulation ticks of the generation
+        """
+        for (_, genome), fitness in zip(self.genomes, self.get_genome_fitness().tolist()):
+            genome.fitness = fitness
+
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+        if self.metrics.enabled:
+            stalled_tick = self.fleet.stalled_tick[self.fleet.stalled_tick >= 0]
+            self.metrics.count("stall_saved_car_ticks", int(np.maximum(step_limit - stalled_tick, 0).sum()))
+            stagnant_tick = self.fleet.stagnant_tick[self.fleet.stagnant_tick >= 0]
+            self.metrics.count("patience_saved_car_ticks", int(np.maximum(step_limit - stagnant_tick, 0).sum()))
@@ -0,0 +1,212 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import copy
+import gzip
+import neat
+import pickle
+import random
+import threading
+import numpy as np
+from ai.batch_network import BatchNetwork
+from ai.policy import ACTIVATIONS, Policy
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def load_population(neat_config_path: str, checkpoint: str = None) -> neat.Population:
+    """Create a new population, or restore the one of a checkpoint
+
+    Args:
+        neat_config_path (str): The neat configuration file (ignored when resuming, the checkpoint holds its own)
+        checkpoint (str): The checkpoint file to resume from, if any
+
+    Returns:
+        neat.Population: The population, without any reporter
+    """
+    if checkpoint is not None:
+        return neat.Checkpointer.restore_checkpoint(checkpoint)
+
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        neat_config_path
+    )
+    return neat.Population(config)
+
+
+def _write_gzip(path: str, data: bytes) -> None:
+    """Compress and write data, through a temporary file so that a crash never leaves a truncated file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(path + ".tmp", "wb", compresslevel=5) as file:
+        file.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _winner_data(genome: neat.DefaultGenome, config: neat.Config) -> bytes:
+    """Pickle a genome with its fitness and its compiled network, as export_winner writes them
+
+    Args:
+        genome (neat.DefaultGenome): The genome
+        config (neat.Config): The neat configuration
+
+    Returns:
+        bytes: The pickled {"fitness", "genome", "network"} dictionary
+    """
+    winner = {
+        "fitness": genome.fitness,
+        "genome": genome,
+        "network": BatchNetwork.create([genome], config),
+    }
+    return pickle.dumps(winner, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def export_winner(genome: neat.DefaultGenome, config: neat.Config, path: str) -> None:
+    """Save a genome and its compiled network, to evaluate it later without any evolution
+
+    Args:
+        genome (neat.DefaultGenome): The genome (usually the best one)
+        config (neat.Config): The neat configuration
+        path (str): The file to write
+    """
+    _write_gzip(path, _winner_data(genome, config))
+
+
+def load_winner(path: str) -> dict:
+    """Load a genome saved by export_winner
+
+    Args:
+        path (str): The exported file
+
+    Returns:
+        dict: The "genome", its "fitness" and its compiled "network" (a BatchNetwork of one row)
+    """
+    with gzip.open(path) as file:
+        return pickle.load(file)
+
+
+def compile_policy(genome: neat.DefaultGenome, config: neat.Config) -> Policy:
+    """Turn a genome into a standalone Policy, through its compiled network
+
+    Args:
+        genome (neat.DefaultGenome): The genome
+        config (neat.Config): The neat configuration
+
+    Returns:
+        Policy: The policy, which gives the outputs of neat.nn.FeedForwardNetwork.activate
+    """
+    network = BatchNetwork.create([genome], config)
+    zero_column = network.column_count - 2
+    activation_names = sorted(ACTIVATIONS)
+
+    # With a single network, the nodes of every layer fill their columns in order and only the sources are padded
+    activations, biases, responses, node_starts, sources, weights, layer_starts = [], [], [], [0], [], [], [0]
+    for layer in network.layers:
+        for j in range(layer["targets"].shape[1]):
+            activations.append(activation_names[layer["activations"][0, j]])
+            biases.append(layer["biases"][0, j])
+            responses.append(layer["responses"][0, j])
+            links = layer["sources"][0, j] != zero_column
+            sources += layer["sources"][0, j][links].tolist()
+            weights += layer["weights"][0, j][links].tolist()
+            node_starts.append(len(sources))
+        layer_starts.append(len(biases))
+
+    return Policy(network.input_count, activations, np.array(biases), np.array(responses), np.array(node_starts),
+                  np.array(sources), np.array(weights), np.array(layer_starts), network.output_columns[0])
+
+
+def export_policy(genome: neat.DefaultGenome, config: neat.Config, path: str) -> None:
+    """Save a genome as a standalone policy, to drive with it anywhere numpy runs (see ai.policy.Policy)
+
+    Args:
+        genome (neat.DefaultGenome): The genome (usually the best one)
+        config (neat.Config): The neat configuration
+        path (str): The .npz file to write
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    compile_policy(genome, config).save(path)
+
+
+# ------------------ CLASSES ------------------
+
+
+class BackgroundCheckpointer(neat.Checkpointer):
+    """A neat.Checkpointer which does not stall the simulation while writing
+
+    The state is pickled on the calling thread, so the snapshot is consistent, then compressed and written by a
+    background thread. The best genome seen so far is exported next to every checkpoint (see export_winner), as
+    it was when it got its best fitness: the population keeps mutating and evaluating its own genome objects.
+    Files are compatible with neat.Checkpointer.restore_checkpoint. Once the evolution is over, the best genome
+    is also exported as a standalone policy (see export_policy).
+    """
+
+    WINNER_SUFFIX = "winner"
+    POLICY_SUFFIX = "policy.npz"
+
+    def __init__(self, generation_interval: int = 10, time_interval_seconds: float = 300,
+                 filename_prefix: str = "checkpoints/neat-checkpoint-"):
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+        self.best_genome = None
+        self.best_fitness = None
+        self.writer = None
+
+    def post_evaluate(self, config: neat.Config, population: dict, species: neat.DefaultSpeciesSet,
+                      best_genome: neat.DefaultGenome) -> None:
+        if self.best_fitness is None or best_genome.fitness > self.best_fitness:
+            self.best_genome = copy.deepcopy(best_genome)
+            self.best_fitness = best_genome.fitness
+
+    def save_checkpoint(self, config: neat.Config, population: dict, species_set: neat.DefaultSpeciesSet,
+                        generation: int) -> None:
+        """Start saving the given state, waiting first for the previous save if it is not over"""
+        filename = f"{self.filename_prefix}{generation}"
+        print(f"Saving checkpoint to {filename}")
+
+        files = [(filename, pickle.dumps((generation, config, population, species_set, random.getstate()),
+                                         protocol=pickle.HIGHEST_PROTOCOL))]
+        if self.best_genome is not None:
+            files.append((self.filename_prefix + BackgroundCheckpointer.WINNER_SUFFIX, _winner_data(self.best_genome, config)))
+
+        self.wait()
+        self.writer = threading.Thread(target=lambda: [_write_gzip(path, data) for path, data in files])
+        self.writer.start()
+
+    def save_population(self, population: neat.Population) -> None:
+        """Save a population right now, for instance before quitting in the middle of a generation
+
+        Args:
+            population (neat.Population): The population, which will be evaluated again when resumed
+        """
+        self.save_checkpoint(population.config, population.population, population.species, population.generation)
+
+    def save_winner(self, config: neat.Config) -> None:
+        """Export the best genome seen so far right now, once the evolution is over
+
+        Args:
+            config (neat.Config): The neat configuration
+        """
+        self.wait()
+        if self.best_genome is not None:
+            export_winner(self.best_genome, config, self.filename_prefix + BackgroundCheckpointer.WINNER_SUFFIX)
+            export_policy(self.best_genome, config, self.filename_prefix + BackgroundCheckpointer.POLICY_SUFFIX)
+
+    def __getstate__(self) -> dict:
+        # The species set keeps its reporters, so the checkpointer is pickled with every checkpoint, but not its thread
+        state = self.__dict__.copy()
+        state["writer"] = None
+        return state
+
+    def wait(self) -> None:
+        """Wait until the last checkpoint is written"""
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
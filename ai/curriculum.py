@@ -0,0 +1,41 @@
+# ------------------ IMPORTS ------------------
+
+
+from typing import List
+
+
+# ------------------ CLASSES ------------------
+
+
+class Curriculum:
+    """Add the tracks of a training one by one, from the easiest, as the drivers get better
+
+    The genomes are first evaluated on the first initial tracks only. Whenever the best fitness of a generation
+    (combined over the tracks it was evaluated on) reaches promotion_fitness, the next track is added, until every
+    track is. Without promotion_fitness, every track is used from the start.
+    """
+
+    def __init__(self, names: List[str], promotion_fitness: float = None, initial: int = 1):
+        """
+        Args:
+            names (List[str]): The names of the tracks, from the easiest to the hardest
+            promotion_fitness (float): The best fitness at which the next track is added, None to use every track
+            initial (int): The number of tracks used from the start
+        """
+        self.names = names
+        self.promotion_fitness = promotion_fitness
+        self.active = len(names) if promotion_fitness is None else max(min(initial, len(names)), 1)
+
+    def update(self, best_fitness: float) -> bool:
+        """Add the next track if the best fitness of the generation is high enough
+
+        Args:
+            best_fitness (float): The best fitness of the generation
+
+        Returns:
+            bool: True if a track was added
+        """
+        if self.active < len(self.names) and best_fitness >= self.promotion_fitness:
+            self.active += 1
+            return True
+        return False
@@ -0,0 +1,421 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import time
+import neat
+import pickle
+import socket
+import struct
+import argparse
+import selectors
+import threading
+from collections import deque
+from typing import Callable, List, Tuple
+
+# Run as a script rather than with python -m, the repository is not on the path
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.car_ai import CarAI
+from ai.fitness_cache import FitnessCache
+from render.track import Track
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def send_message(connection: socket.socket, kind: str, payload: object = None) -> None:
+    """Send a message: its pickled length on 4 bytes then the pickled (kind, payload) pair
+
+    Args:
+        connection (socket.socket): The connected socket
+        kind (str): The type of the message
+        payload (object): Its content, anything which can be pickled
+    """
+    data = pickle.dumps((kind, payload), protocol=pickle.HIGHEST_PROTOCOL)
+    connection.sendall(struct.pack("<I", len(data)) + data)
+
+
+def receive_message(connection: socket.socket) -> Tuple[str, object]:
+    """Wait for the next message of a blocking socket
+
+    Args:
+        connection (socket.socket): The connected socket
+
+    Returns:
+        Tuple[str, object]: The kind and payload of the message, None if the connection was closed
+    """
+    header = _receive_exactly(connection, 4)
+    if header is None:
+        return None
+    data = _receive_exactly(connection, struct.unpack("<I", header)[0])
+    return None if data is None else pickle.loads(data)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    """Read size bytes from a blocking socket, None if it was closed before"""
+    chunks = []
+    while size:
+        chunk = connection.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Split a HOST:PORT address, the host being every interface if empty"""
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+# ------------------ CLASSES ------------------
+
+
+class _Worker:
+    """What the coordinator knows of a connected worker"""
+
+    def __init__(self, connection: socket.socket, address: tuple):
+        self.connection = connection
+        self.address = address
+        self.buffer = bytearray()
+        self.last_seen = time.monotonic()
+        self.configured = None
+        self.tracks = set()
+        self.batch = None
+
+
+class Coordinator:
+    """Hand the genomes of every generation over to worker processes connected through TCP, and collect their
+    fitness, to be used in place of simulating them locally
+
+    Workers (see DistributedWorker) connect whenever they want, from any machine which can reach the address. A
+    generation is split into batches of BATCH_SIZE genomes and every idle worker is given one. The neat
+    configuration and the settings of CarAI are sent to a worker before its first batch, and a track before the
+    first batch which is simulated on it. After that, the batches refer to the track by its content hash. A
+    worker sends a heartbeat every HEARTBEAT_INTERVAL seconds, even while it simulates. When it disconnects or is
+    not heard from for HEARTBEAT_TIMEOUT seconds, it is dropped and its batch is given to another worker. When no
+    worker is connected for connect_timeout seconds, the evaluation gives up.
+    The messages are pickled, so the workers must only connect to a trusted coordinator.
+    """
+
+    BATCH_SIZE = 10
+    HEARTBEAT_INTERVAL = 1.0
+    HEARTBEAT_TIMEOUT = 10.0
+    CONNECT_TIMEOUT = 300.0
+
+    def __init__(self, address: str, step_limit: int = CarAI.STEP_LIMIT, fitness_cache: FitnessCache = None,
+                 debug: bool = True, connect_timeout: float = CONNECT_TIMEOUT):
+        """
+        Args:
+            address (str): The HOST:PORT address the workers connect to
+            step_limit (int): The maximum number of simulation ticks of a generation
+            fitness_cache (FitnessCache): The fitnesses already known, None to simulate every genome
+            debug (bool): Whether to print the workers which connect and disconnect
+            connect_timeout (float): How long to wait for a worker while none is connected
+        """
+        self.address = parse_address(address)
+        self.step_limit = step_limit
+        self.connect_timeout = connect_timeout
+        self.fitness_cache = fitness_cache
+        self.debug = debug
+        self.workers = {}
+        self.lost_batches = []
+        self.generation = 0
+        self.best_laps = 0
+        self.selector = None
+        self.server = None
+
+    def start(self) -> None:
+        """Start listening for workers"""
+        self.server = socket.create_server(self.address)
+        self.server.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        if self.debug:
+            print(f"Waiting for workers on {self.address[0] or '*'}:{self.server.getsockname()[1]}")
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config, track: Track,
+                 start_position: list, start_angle: int, wait: Callable[[int, int], None] = None) -> None:
+        """Give every genome its fitness once the workers simulated all of them, and keep the most laps driven by
+        the ones simulated
+
+        Args:
+            genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs of the generation
+            config (neat.Config): The neat configuration
+            track (Track): The track to simulate them on
+            start_position (list): The start position of the cars
+            start_angle (int): The start angle of the cars
+            wait (Callable[[int, int], None]): Called with the numbers of batches done and to do while waiting for
+                the workers, to keep a window responsive
+
+        Raises:
+            TimeoutError: If no worker was connected for connect_timeout seconds
+        """
+        if self.server is None:
+            self.start()
+
+        CarAI.TOTAL_GENERATIONS += 1
+        self.generation += 1
+        if self.fitness_cache is not None:
+            genomes = self.fitness_cache.split(genomes)
+
+        track_key = track.get_content_hash()
+        setup = (config, self.step_limit, {name: getattr(CarAI, name) for name in CarAI.SETTINGS})
+        batches = [genomes[i:i + Coordinator.BATCH_SIZE] for i in range(0, len(genomes), Coordinator.BATCH_SIZE)]
+        pending = deque(range(len(batches)))
+        results = [None] * len(batches)
+        done = 0
+        alone_since = time.monotonic()
+
+        while done < len(batches):
+            for key, _ in self.selector.select(Coordinator.HEARTBEAT_INTERVAL / 4):
+                if key.fileobj is self.server:
+                    self.accept()
+                    continue
+
+                worker = key.data
+                for kind, payload in self.receive(worker):
+                    if kind == "result":
+                        (generation, batch), batch_results = payload
+                        worker.batch = None
+                        if generation == self.generation and results[batch] is None:
+                            results[batch] = batch_results
+                            done += 1
+
+            for worker in list(self.workers.values()):
+                if time.monotonic() - worker.last_seen > Coordinator.HEARTBEAT_TIMEOUT:
+                    self.drop(worker, "timed out")
+
+            # The batches of the dropped workers are dispatched again first
+            while self.lost_batches:
+                generation, batch = self.lost_batches.pop()
+                if generation == self.generation and results[batch] is None:
+                    pending.appendleft(batch)
+
+            for worker in list(self.workers.values()):
+                if not pending:
+                    break
+                if worker.batch is None:
+                    batch = pending.popleft()
+                    try:
+                        if worker.configured is not config:
+                            send_message(worker.connection, "setup", setup)
+                            worker.configured = config
+                        if track_key not in worker.tracks:
+                            send_message(worker.connection, "track", (track_key, track.get_collision_grid(),
+                                                                      track.get_distance_field()))
+                            worker.tracks.add(track_key)
+                        send_message(worker.connection, "batch", ((self.generation, batch), track_key,
+                                                                  start_position, start_angle, batches[batch]))
+                        worker.batch = (self.generation, batch)
+                    except OSError:
+                        worker.batch = (self.generation, batch)
+                        self.drop(worker, "disconnected")
+
+            if self.workers:
+                alone_since = time.monotonic()
+            elif time.monotonic() - alone_since > self.connect_timeout:
+                raise TimeoutError(f"No worker connected to the coordinator for {self.connect_timeout:g} seconds")
+
+            if wait is not None:
+                wait(done, len(batches))
+
+        self.best_laps = 0
+        for batch, batch_results in zip(batches, results):
+            for (_, genome), (fitness, _, laps) in zip(batch, batch_results):
+                genome.fitness = fitness
+                self.best_laps = max(self.best_laps, laps)
+            if self.fitness_cache is not None:
+                self.fitness_cache.store(batch, [final for _, final, _ in batch_results])
+
+    def accept(self) -> None:
+        """Register a worker which just connected"""
+        connection, address = self.server.accept()
+        connection.setblocking(True)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        worker = _Worker(connection, address)
+        self.workers[connection.fileno()] = worker
+        self.selector.register(connection, selectors.EVENT_READ, worker)
+        if self.debug:
+            print(f"Worker {address[0]}:{address[1]} connected ({len(self.workers)} workers)")
+
+    def receive(self, worker: _Worker) -> List[Tuple[str, object]]:
+        """Read what a worker sent, dropping it if it disconnected
+
+        Args:
+            worker (_Worker): The worker, whose socket is readable
+
+        Returns:
+            List[Tuple[str, object]]: The complete messages received
+        """
+        try:
+            data = worker.connection.recv(1 << 20)
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(worker, "disconnected")
+            return []
+
+        worker.last_seen = time.monotonic()
+        worker.buffer += data
+        messages = []
+        while len(worker.buffer) >= 4:
+            length = struct.unpack_from("<I", worker.buffer)[0]
+            if len(worker.buffer) < 4 + length:
+                break
+            messages.append(pickle.loads(bytes(worker.buffer[4:4 + length])))
+            del worker.buffer[:4 + length]
+        return messages
+
+    def drop(self, worker: _Worker, reason: str) -> None:
+        """Forget a worker, its batch being dispatched again by evaluate
+
+        Args:
+            worker (_Worker): The worker
+            reason (str): Why it is dropped, for the log
+        """
+        if self.workers.pop(worker.connection.fileno(), None) is None:
+            return
+        self.selector.unregister(worker.connection)
+        worker.connection.close()
+        if self.debug:
+            print(f"Worker {worker.address[0]}:{worker.address[1]} {reason}"
+                  f"{', its batch is dispatched again' if worker.batch is not None else ''} "
+                  f"({len(self.workers)} workers)")
+        if worker.batch is not None:
+            self.lost_batches.append(worker.batch)
+
+    def close(self) -> None:
+        """Stop the workers and stop listening"""
+        for worker in list(self.workers.values()):
+            try:
+                send_message(worker.connection, "stop")
+            except OSError:
+                pass
+            worker.connection.close()
+        self.workers = {}
+        if self.server is not None:
+            self.selector.close()
+            self.server.close()
+            self.server = None
+
+    def __enter__(self) -> "Coordinator":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class DistributedWorker:
+    """Simulate the batches of genomes a Coordinator sends, until it stops or disconnects
+
+    The tracks it receives are kept by their content hash for its whole life. A separate thread sends the
+    heartbeats, so a long batch does not get the worker dropped.
+    """
+
+    CONNECT_TIMEOUT = 30.0
+
+    def __init__(self, address: str, connect_timeout: float = CONNECT_TIMEOUT):
+        """
+        Args:
+            address (str): The HOST:PORT address of the coordinator
+            connect_timeout (float): How long to keep trying to connect, the coordinator may start after the worker
+        """
+        self.address = parse_address(address)
+        self.connect_timeout = connect_timeout
+        self.config = None
+        self.step_limit = CarAI.STEP_LIMIT
+        self.tracks = {}
+        self.batches = 0
+
+    def connect(self) -> socket.socket:
+        """Connect to the coordinator, retrying until connect_timeout
+
+        Returns:
+            socket.socket: The connected socket
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                connection = socket.create_connection(self.address)
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                return connection
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def run(self) -> None:
+        """Simulate the batches of the coordinator until it stops"""
+        connection = self.connect()
+        lock = threading.Lock()
+        stopping = threading.Event()
+
+        def send_heartbeats() -> None:
+            while not stopping.wait(Coordinator.HEARTBEAT_INTERVAL):
+                try:
+                    with lock:
+                        send_message(connection, "heartbeat")
+                except OSError:
+                    return
+
+        heartbeat = threading.Thread(target=send_heartbeats, name="heartbeat", daemon=True)
+        heartbeat.start()
+
+        try:
+            while True:
+                message = receive_message(connection)
+                if message is None or message[0] == "stop":
+                    break
+                kind, payload = message
+
+                if kind == "setup":
+                    self.config, self.step_limit, settings = payload
+                    for name, value in settings.items():
+                        setattr(CarAI, name, value)
+                elif kind == "track":
+                    key, collision_grid, distance_field = payload
+                    self.tracks[key] = Track.from_arrays(collision_grid, distance_field)
+                elif kind == "batch":
+                    batch, key, start_position, start_angle, genomes = payload
+                    car_ai = CarAI(genomes, self.config, start_position, self.tracks[key], start_angle,
+                                   visualise=False)
+                    car_ai.simulate(self.step_limit)
+                    results = list(zip(car_ai.get_genome_fitness().tolist(),
+                                       car_ai.get_final_cars(self.step_limit).tolist(),
+                                       car_ai.get_genome_laps().tolist()))
+                    with lock:
+                        send_message(connection, "result", (batch, results))
+                    self.batches += 1
+        except OSError:
+            pass
+        finally:
+            stopping.set()
+            connection.close()
+
+
+# ------------------ MAIN FUNCTION ------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate the genomes of a coordinator started with "
+                                                 "main.py --coordinator.")
+    parser.add_argument("address", help="HOST:PORT address of the coordinator")
+    parser.add_argument("--connect-timeout", type=float, default=DistributedWorker.CONNECT_TIMEOUT, metavar="SECONDS",
+                        help="how long to keep trying to connect to the coordinator")
+    arguments = parser.parse_args()
+
+    worker = DistributedWorker(arguments.address, arguments.connect_timeout)
+    worker.run()
+    print(f"Coordinator gone, {worker.batches} batches simulated")
+
+
+# ------------------ MAIN CALL ------------------
+
+
+if __name__ == "__main__":
+    main()
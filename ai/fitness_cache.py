@@ -0,0 +1,95 @@
+# ------------------ IMPORTS ------------------
+
+
+import neat
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import List, Tuple
+from render.track import Track
+
+
+# ------------------ CLASSES ------------------
+
+
+class FitnessCache:
+    """Remember the fitness of the networks already simulated, so that the elites and the offspring identical to
+    a network seen before are not simulated again
+
+    A network is identified by a hash of its enabled connections (in the order they are summed, which changes
+    the rounding), their weights and its nodes. The cache is only valid for the track, the start pose and the
+    simulation settings it was created with, which are hashed once into its context. Only final fitnesses are
+    stored: the ones of cars which crashed or stalled, or which drove until the step limit, since an alive car
+    of a generation which ended early would have gathered more. The least recently used entries are dropped once
+    the cache holds max_size of them.
+    """
+
+    def __init__(self, max_size: int, track: Track, start_position: list, start_angle: int, settings: tuple = ()):
+        """
+        Args:
+            max_size (int): The maximum number of fitnesses kept
+            track (Track): The track the genomes are evaluated on
+            start_position (list): The start position of the cars
+            start_angle (int): The start angle of the cars
+            settings (tuple): Anything else the fitness depends on (step limit, sensors...), as a tuple of values
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        context = hashlib.blake2b(digest_size=16)
+        context.update(np.ascontiguousarray(track.get_collision_grid()).tobytes())
+        context.update(repr((track.width, track.height, tuple(start_position), start_angle, settings)).encode())
+        self.context = context.digest()
+
+    def key(self, genome: neat.DefaultGenome) -> bytes:
+        """Hash the network of a genome in the context of the cache
+
+        Args:
+            genome (neat.DefaultGenome): The genome
+
+        Returns:
+            bytes: The key of the genome
+        """
+        connections = [(key, connection.weight) for key, connection in genome.connections.items() if connection.enabled]
+        nodes = [(key, node.bias, node.response, node.activation, node.aggregation)
+                 for key, node in sorted(genome.nodes.items())]
+        return hashlib.blake2b(repr((connections, nodes)).encode(), digest_size=16, key=self.context).digest()
+
+    def split(self, genomes: List[Tuple[int, neat.DefaultGenome]]) -> List[Tuple[int, neat.DefaultGenome]]:
+        """Give their fitness to the genomes which are in the cache
+
+        Args:
+            genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs of the generation
+
+        Returns:
+            List[Tuple[int, neat.DefaultGenome]]: The pairs of the genomes which still have to be simulated
+        """
+        missing = []
+        for genome_id, genome in genomes:
+            key = self.key(genome)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                genome.fitness = self.entries[key]
+                self.hits += 1
+            else:
+                missing.append((genome_id, genome))
+                self.misses += 1
+        return missing
+
+    def store(self, genomes: List[Tuple[int, neat.DefaultGenome]], final: List[bool]) -> None:
+        """Remember the fitness of simulated genomes
+
+        Args:
+            genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs, with their fitness
+            final (List[bool]): Whether the fitness of each genome is final (see CarAI.get_final_cars)
+        """
+        for (_, genome), is_final in zip(genomes, final):
+            if is_final:
+                key = self.key(genome)
+                self.entries[key] = genome.fitness
+                self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
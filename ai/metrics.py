@@ -0,0 +1,151 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import csv
+import json
+import time
+
+
+# ------------------ CLASSES ------------------
+
+
+class Metrics:
+    """Per-phase timings and counters of the hot path, gathered generation by generation
+
+    The code being measured calls mark() before a phase and lap(phase) after it, so consecutive phases share
+    a single clock read. When disabled, every method returns right away, which keeps the overhead to a
+    method call and an attribute check per phase.
+    The phases must all be timed by the same thread, another one may only read the summary and the caption.
+    """
+
+    def __init__(self, enabled: bool = False, log_path: str = None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.csv_columns = None
+        self.timings = {}
+        self.counters = {}
+        self.last = 0.0
+        self.generation = 0
+        self.generation_start = time.perf_counter()
+
+    def start_generation(self) -> None:
+        """Reset the timings and counters for a new generation"""
+        self.generation += 1
+        self.timings = {}
+        self.counters = {}
+        self.generation_start = time.perf_counter()
+        self.last = self.generation_start
+
+    def mark(self) -> None:
+        """Start timing a phase"""
+        if self.enabled:
+            self.last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Add the time elapsed since the last mark (or lap) to a phase
+
+        Args:
+            phase (str): The name of the phase
+        """
+        if self.enabled:
+            now = time.perf_counter()
+            self.timings[phase] = self.timings.get(phase, 0.0) + now - self.last
+            self.last = now
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """Increase a counter
+
+        Args:
+            counter (str): The name of the counter
+            amount (int): The amount to add
+        """
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def summary(self) -> dict:
+        """Get the timings (in seconds) and counters of the current generation
+
+        Returns:
+            dict: The metrics, with the ticks and car-ticks per second when they are counted
+        """
+        seconds = time.perf_counter() - self.generation_start
+        summary = {"seconds": seconds}
+        # Copied first, the phases may be timed by another thread meanwhile
+        timings, counters = dict(self.timings), dict(self.counters)
+        summary.update({f"{phase}_seconds": timing for phase, timing in timings.items()})
+        summary.update(counters)
+        for counter in ("ticks", "car_ticks"):
+            if counter in counters:
+                summary[f"{counter}_per_second"] = counters[counter] / seconds if seconds else 0.0
+        return summary
+
+    def caption(self) -> str:
+        """Get a short description of the current generation's metrics, for the window's title
+
+        Returns:
+            str: The ticks per second and the share of each phase, empty if disabled
+        """
+        if not self.enabled:
+            return ""
+        timings = dict(self.timings)
+        total = sum(timings.values()) or 1.0
+        summary = self.summary()
+        phases = " ".join(f"{phase} {round(100 * timing / total)}%" for phase, timing in timings.items())
+        return f"{round(summary.get('ticks_per_second', 0))} ticks/s ({phases})"
+
+    def end_generation(self, **extra) -> dict:
+        """Append the metrics of the generation to the log (a .csv or a .jsonl file, according to its extension)
+
+        Args:
+            **extra: Any other value to log with the metrics
+
+        Returns:
+            dict: The logged metrics, None if disabled
+        """
+        if not self.enabled:
+            return None
+
+        row = {"generation": self.generation}
+        row.update(self.summary())
+        row.update(extra)
+
+        if self.log_path is not None:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self.log_path.endswith(".csv"):
+                self._append_csv(row)
+            else:
+                with open(self.log_path, "a") as file:
+                    file.write(json.dumps(row) + "\n")
+
+        return row
+
+    def _append_csv(self, row: dict) -> None:
+        """Append a row to the CSV log, rewriting it with the new columns if some appeared
+
+        The columns are kept in memory, the log being read only once (for its header, when it already exists) and
+        again when it has to be rewritten.
+        """
+        if self.csv_columns is None:
+            self.csv_columns = []
+            if os.path.exists(self.log_path):
+                with open(self.log_path, newline="") as file:
+                    self.csv_columns = next(csv.reader(file), [])
+
+        new_columns = [column for column in row if column not in self.csv_columns]
+        if new_columns or not self.csv_columns:
+            rows = []
+            if self.csv_columns:
+                with open(self.log_path, newline="") as file:
+                    rows = list(csv.DictReader(file))
+            self.csv_columns += new_columns
+            rows.append(row)
+            with open(self.log_path, "w", newline="") as file:
+                writer = csv.DictWriter(file, self.csv_columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(self.log_path, "a", newline="") as file:
+                csv.DictWriter(file, self.csv_columns).writerow(row)
@@ -0,0 +1,270 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import time
+import neat
+import numpy as np
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+from ai.car_ai import CarAI
+from ai.fitness_cache import FitnessCache
+from render.car import Car
+from render.track import Track
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+# State of a worker process, set once by _initialize_worker
+_worker = {}
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def _share_array(array: np.ndarray) -> Tuple[SharedMemory, tuple]:
+    """Copy an array into a new shared memory block
+
+    Returns:
+        Tuple[SharedMemory, tuple]: The block and the (name, shape, dtype) needed to attach to it
+    """
+    memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=memory.buf)[...] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def _attach_array(descriptor: tuple) -> np.ndarray:
+    """Get a view on an array shared by _share_array (the block is kept alive as long as the worker)"""
+    name, shape, dtype = descriptor
+    memory = SharedMemory(name=name)
+    _worker.setdefault("memories", []).append(memory)
+    return np.ndarray(shape, dtype, buffer=memory.buf)
+
+
+def _share_track(track: Track) -> Tuple[object, List[SharedMemory]]:
+    """Make a track available to the workers
+
+    Returns:
+        Tuple[object, List[SharedMemory]]: The path of the track if it is saved (its arrays are then memory-mapped
+        by the workers), the descriptors of its wall grid and distance field shared by _share_array otherwise,
+        and the shared memory blocks to free once the workers are done
+    """
+    if track.path is not None:
+        return track.path, []
+    grid_memory, grid = _share_array(track.get_collision_grid())
+    field_memory, field = _share_array(track.get_distance_field())
+    return (grid, field), [grid_memory, field_memory]
+
+
+def _initialize_worker(config: neat.Config, tracks: List[tuple], step_limit: int, settings: dict = None) -> None:
+    """Attach a freshly started worker to the shared tracks, once for its whole life
+
+    Every track is given as a (track, start_position, start_angle) tuple, the track being what _share_track
+    returned. The settings are the CarAI.SETTINGS of the main process.
+    """
+    for name, value in (settings or {}).items():
+        setattr(CarAI, name, value)
+    _worker["config"] = config
+    _worker["tracks"] = []
+    for track, start_position, start_angle in tracks:
+        if isinstance(track, str):
+            track = Track.load(track, load_image=False)
+        else:
+            track = Track.from_arrays(*(_attach_array(descriptor) for descriptor in track))
+        _worker["tracks"].append((track, start_position, start_angle))
+    _worker["step_limit"] = step_limit
+
+
+def _evaluate_genomes(genomes: List[Tuple[int, neat.DefaultGenome]], track: int = 0) -> List[Tuple[float, bool, int]]:
+    """Simulate a batch of genomes headlessly in a worker
+
+    Args:
+        genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs of the batch
+        track (int): The index of the track to simulate them on
+
+    Returns:
+        List[Tuple[float, bool, int]]: The fitness of each genome, whether it is final (see CarAI.get_final_cars)
+        and its laps
+    """
+    track, start_position, start_angle = _worker["tracks"][track]
+    car_ai = CarAI(genomes, _worker["config"], start_position, track, start_angle, visualise=False)
+    car_ai.simulate(_worker["step_limit"])
+    return list(zip(car_ai.get_genome_fitness().tolist(), car_ai.get_final_cars(_worker["step_limit"]).tolist(),
+                    car_ai.get_genome_laps().tolist()))
+
+
+def _evaluate_timed(genomes: List[Tuple[int, neat.DefaultGenome]], track: int) -> Tuple[List[float], int, float]:
+    """Simulate a batch of genomes on a track in a worker, see _evaluate_genomes
+
+    Returns:
+        Tuple[List[float], int, float]: The fitness of each genome, the most laps of the batch and the seconds the
+        simulation took
+    """
+    start = time.perf_counter()
+    results = _evaluate_genomes(genomes, track)
+    return [fitness for fitness, _, _ in results], max(laps for _, _, laps in results), time.perf_counter() - start
+
+
+# ------------------ CLASSES ------------------
+
+
+class _PoolEvaluator:
+    """The pool of processes of the evaluators below, started on the first generation and stopped by close
+
+    The wall grid and distance field of every track are put in shared memory once, when the pool starts (or
+    memory-mapped from its directory if the track is saved), so every worker reads the same arrays and only
+    the genomes and their fitness travel between processes.
+    """
+
+    def __init__(self, tracks: List[Tuple[Track, list, int]], step_limit: int, workers: int):
+        """
+        Args:
+            tracks (List[Tuple[Track, list, int]]): The (track, start_position, start_angle) of every track
+            step_limit (int): The maximum number of simulation ticks of a generation
+            workers (int): The number of processes, one per CPU if None
+        """
+        self.tracks = tracks
+        self.step_limit = step_limit
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.memories = []
+
+    def start(self, config: neat.Config) -> None:
+        """Share the tracks and start the workers
+
+        Args:
+            config (neat.Config): The neat configuration, sent once to every worker
+        """
+        tracks = []
+        for track, start_position, start_angle in self.tracks:
+            shared, memories = _share_track(track)
+            tracks.append((shared, start_position, start_angle))
+            self.memories += memories
+
+        self.pool = multiprocessing.Pool(
+            self.workers,
+            _initialize_worker,
+            (config, tracks, self.step_limit, {name: getattr(CarAI, name) for name in CarAI.SETTINGS})
+        )
+
+    def close(self) -> None:
+        """Stop the workers and free the shared tracks"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        for memory in self.memories:
+            memory.close()
+            memory.unlink()
+        self.memories = []
+
+    def __enter__(self) -> "_PoolEvaluator":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class ParallelEvaluator(_PoolEvaluator):
+    """Evaluate the genomes of a generation in a pool of processes sharing the track (see _PoolEvaluator), to be
+    given to neat.Population.run
+
+    Since the cars never interact and each one is only stopped by itself or by the step limit (never by the rest
+    of its batch), splitting a generation gives the same fitness as simulating it at once.
+    """
+
+    BATCHES_PER_WORKER = 2
+
+    def __init__(self, track: Track, start_position: list, start_angle: int = Car.DEFAULT_ANGLE,
+                 step_limit: int = CarAI.STEP_LIMIT, workers: int = None, fitness_cache: FitnessCache = None):
+        super().__init__([(track, start_position, start_angle)], step_limit, workers)
+        self.fitness_cache = fitness_cache
+        self.best_laps = 0
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """Give every genome its fitness, and keep the most laps driven by the ones simulated
+
+        Args:
+            genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs of the generation
+            config (neat.Config): The neat configuration
+        """
+        if self.pool is None:
+            self.start(config)
+
+        CarAI.TOTAL_GENERATIONS += 1
+        self.best_laps = 0
+        if self.fitness_cache is not None:
+            genomes = self.fitness_cache.split(genomes)
+        if not genomes:
+            return
+
+        batch_count = min(len(genomes), self.workers * ParallelEvaluator.BATCHES_PER_WORKER)
+        batches = [genomes[i::batch_count] for i in range(batch_count)]
+
+        for batch, results in zip(batches, self.pool.map(_evaluate_genomes, batches)):
+            for (_, genome), (fitness, _, laps) in zip(batch, results):
+                genome.fitness = fitness
+                self.best_laps = max(self.best_laps, laps)
+            if self.fitness_cache is not None:
+                self.fitness_cache.store(batch, [final for _, final, _ in results])
+
+
+class MultiTrackEvaluator(_PoolEvaluator):
+    """Evaluate the genomes of a generation on several tracks at once, in a pool of processes
+
+    Every track is shared with the workers once, when the pool starts (see _PoolEvaluator), and each worker
+    keeps all of them, so a batch of genomes can be simulated on any track. The batches of every active track are
+    dispatched together, and the fitnesses a genome got on the tracks are combined with the reducer (see
+    CarAI.reduce_fitness). The seconds spent on each track, the best fitness on it and the most laps driven on any
+    track are kept for reporting.
+    """
+
+    BATCHES_PER_WORKER = 2
+
+    def __init__(self, tracks: List[Tuple[Track, list, int]], step_limit: int = CarAI.STEP_LIMIT, workers: int = None,
+                 reducer: str = "mean"):
+        """
+        Args:
+            tracks (List[Tuple[Track, list, int]]): The (track, start_position, start_angle) of every track
+            step_limit (int): The maximum number of simulation ticks of a generation
+            workers (int): The number of processes, one per CPU if None
+            reducer (str): How the fitnesses of a genome on the tracks are combined
+        """
+        super().__init__(tracks, step_limit, workers)
+        self.reducer = reducer
+        self.track_seconds = [0.0] * len(tracks)
+        self.track_best = [0.0] * len(tracks)
+        self.best_laps = 0
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config,
+                 active: int = None) -> None:
+        """Give every genome its fitness, combined over the active tracks
+
+        Args:
+            genomes (List[Tuple[int, neat.DefaultGenome]]): The (genome_id, genome) pairs of the generation
+            config (neat.Config): The neat configuration
+            active (int): The number of tracks the genomes are evaluated on (the first ones), all of them if None
+        """
+        if self.pool is None:
+            self.start(config)
+
+        CarAI.TOTAL_GENERATIONS += 1
+        active = len(self.tracks) if active is None else active
+        batch_count = min(len(genomes), max(self.workers * MultiTrackEvaluator.BATCHES_PER_WORKER // active, 1))
+        tasks = [(genomes[i::batch_count], track) for track in range(active) for i in range(batch_count)]
+
+        fitness = np.zeros((active, len(genomes)))
+        self.track_seconds = [0.0] * len(self.tracks)
+        self.best_laps = 0
+        for task, (results, laps, seconds) in enumerate(self.pool.starmap(_evaluate_timed, tasks)):
+            track, i = divmod(task, batch_count)
+            fitness[track, i::batch_count] = results
+            self.track_seconds[track] += seconds
+            self.best_laps = max(self.best_laps, laps)
+
+        self.track_best = [float(best) for best in fitness.max(axis=1)] + [0.0] * (len(self.tracks) - active)
+        for (_, genome), combined in zip(genomes, CarAI.reduce_fitness(fitness, self.reducer).tolist()):
+            genome.fitness = combined
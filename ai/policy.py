@@ -0,0 +1,187 @@
+# ------------------ IMPORTS ------------------
+
+
+import math
+import numpy as np
+from typing import List
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+# Numpy versions of the neat activations (same clamping and scaling as in neat.activations)
+ACTIVATIONS = {
+    "tanh": lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "identity": lambda z: z,
+    "clamped": lambda z: np.clip(z, -1.0, 1.0),
+}
+
+# The same activations on a single value, as computed by neat.activations
+SCALAR_ACTIVATIONS = {
+    "tanh": lambda z: math.tanh(max(-60.0, min(60.0, 2.5 * z))),
+    "sigmoid": lambda z: 1.0 / (1.0 + math.exp(-max(-60.0, min(60.0, 5.0 * z)))),
+    "relu": lambda z: z if z > 0.0 else 0.0,
+    "identity": lambda z: z,
+    "clamped": lambda z: max(-1.0, min(1.0, z)),
+}
+
+
+# ------------------ CLASSES ------------------
+
+
+class Policy:
+    """A trained feed-forward network as a few flat arrays, evaluated on batches of sensor readings with numpy only
+
+    This module only depends on numpy, so it can be copied into another simulator along with a policy exported
+    by ai.checkpoint.export_policy. The nodes are stored in the order neat evaluates them, so that a node only
+    depends on the inputs and on the nodes before it. Their values are columns after the inputs, followed by
+    a column which always holds 0 (for the outputs that are not connected). The incoming connections of the
+    nodes are stored one after the other, node_starts giving where the ones of each node start, and consecutive
+    nodes which do not depend on each other are grouped in layers, each layer being computed at once. The
+    weighted inputs of a node are added in the same order as in neat.nn.FeedForwardNetwork.activate, which gives
+    the same outputs. A single vector is rather evaluated in plain Python (see activate_one), numpy calls costing
+    more than such a small network.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, input_count: int, activations: List[str], biases: np.ndarray, responses: np.ndarray,
+                 node_starts: np.ndarray, sources: np.ndarray, weights: np.ndarray, layer_starts: np.ndarray,
+                 output_columns: np.ndarray):
+        """
+        Args:
+            input_count (int): The number of inputs
+            activations (List[str]): The activation of every node (see ACTIVATIONS)
+            biases (np.ndarray): The bias of every node
+            responses (np.ndarray): The response of every node
+            node_starts (np.ndarray): Where the connections of every node start, followed by their count
+            sources (np.ndarray): The column every connection comes from
+            weights (np.ndarray): The weight of every connection
+            layer_starts (np.ndarray): Where every layer starts, followed by the number of nodes
+            output_columns (np.ndarray): The column of every output
+        """
+        self.input_count = int(input_count)
+        self.activations = list(activations)
+        self.biases = np.asarray(biases, dtype=float)
+        self.responses = np.asarray(responses, dtype=float)
+        self.node_starts = np.asarray(node_starts, dtype=np.int32)
+        self.sources = np.asarray(sources, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=float)
+        self.layer_starts = np.asarray(layer_starts, dtype=np.int32)
+        self.output_columns = np.asarray(output_columns, dtype=np.int32)
+        self.zero_column = self.input_count + len(self.biases)
+
+        # Every layer gets its connections as (nodes, fan_in) matrices, padded with the zero column
+        self.layers = []
+        for start, end in zip(self.layer_starts[:-1].tolist(), self.layer_starts[1:].tolist()):
+            counts = np.diff(self.node_starts[start:end + 1])
+            layer_sources = np.full((end - start, max(counts.max(initial=0), 1)), self.zero_column, dtype=np.intp)
+            layer_weights = np.zeros(layer_sources.shape)
+            for j, node in enumerate(range(start, end)):
+                edges = slice(self.node_starts[node], self.node_starts[node + 1])
+                layer_sources[j, :counts[j]] = self.sources[edges]
+                layer_weights[j, :counts[j]] = self.weights[edges]
+
+            names = self.activations[start:end]
+            groups = [(name, np.array([j for j, other in enumerate(names) if other == name]))
+                      for name in sorted(set(names))]
+            self.layers.append((self.input_count + start, self.input_count + end, layer_sources.T.copy(),
+                                layer_weights.T.copy(), self.biases[start:end], self.responses[start:end], groups))
+
+        starts = self.node_starts.tolist()
+        sources, weights = self.sources.tolist(), self.weights.tolist()
+        self.nodes = [(SCALAR_ACTIVATIONS[activation], bias, response, list(zip(sources[start:end], weights[start:end])))
+                      for activation, bias, response, start, end in zip(self.activations, self.biases.tolist(),
+                                                                         self.responses.tolist(), starts[:-1], starts[1:])]
+        self.output_list = self.output_columns.tolist()
+
+    def activate_one(self, inputs: List[float]) -> List[float]:
+        """Compute the outputs of the network for a single vector of inputs, without numpy
+
+        Args:
+            inputs (List[float]): The inputs
+
+        Returns:
+            List[float]: The outputs
+        """
+        values = [float(value) for value in inputs]
+        for activation, bias, response, links in self.nodes:
+            values.append(activation(bias + response * sum([values[source] * weight for source, weight in links])))
+        values.append(0.0)
+        return [values[column] for column in self.output_list]
+
+    def activate(self, inputs: np.ndarray) -> np.ndarray:
+        """Compute the outputs of the network for a batch of inputs
+
+        Args:
+            inputs (np.ndarray): The (n, inputs) inputs, or a single (inputs,) vector
+
+        Returns:
+            np.ndarray: The (n, outputs) outputs, or a single (outputs,) vector
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        if inputs.ndim == 1:
+            return np.array(self.activate_one(inputs.tolist()))
+
+        values = np.zeros((len(inputs), self.zero_column + 1))
+        values[:, :self.input_count] = inputs
+        for start, end, sources, weights, biases, responses, groups in self.layers:
+            total = np.zeros((len(inputs), end - start))
+            for k in range(len(sources)):
+                total += values[:, sources[k]] * weights[k]
+            z = biases + responses * total
+
+            if len(groups) == 1:
+                values[:, start:end] = ACTIVATIONS[groups[0][0]](z)
+            else:
+                for name, columns in groups:
+                    values[:, start + columns] = ACTIVATIONS[name](z[:, columns])
+
+        return values[:, self.output_columns]
+
+    def choose(self, inputs: np.ndarray) -> np.ndarray:
+        """Get the index of the highest output (the action of a car) for a batch of inputs, see activate"""
+        return self.activate(inputs).argmax(axis=-1)
+
+    def save(self, path: str) -> None:
+        """Save the policy as an uncompressed .npz archive of its arrays
+
+        Args:
+            path (str): The file to write
+        """
+        names = sorted(set(self.activations))
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                version=np.int32(Policy.FORMAT_VERSION),
+                input_count=np.int32(self.input_count),
+                activation_names=np.array(names),
+                activations=np.array([names.index(name) for name in self.activations], dtype=np.uint8),
+                biases=self.biases,
+                responses=self.responses,
+                node_starts=self.node_starts,
+                sources=self.sources,
+                weights=self.weights,
+                layer_starts=self.layer_starts,
+                output_columns=self.output_columns,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "Policy":
+        """Load a policy saved by save
+
+        Args:
+            path (str): The .npz file
+
+        Returns:
+            Policy: The policy
+        """
+        with np.load(path) as arrays:
+            if int(arrays["version"]) != Policy.FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy format version {int(arrays['version'])} in {path}")
+            names = arrays["activation_names"].tolist()
+            return cls(int(arrays["input_count"]), [names[i] for i in arrays["activations"].tolist()],
+                       arrays["biases"], arrays["responses"], arrays["node_starts"], arrays["sources"],
+                       arrays["weights"], arrays["layer_starts"], arrays["output_columns"])
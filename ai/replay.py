@@ -0,0 +1,161 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import json
+import struct
+import numpy as np
+from typing import List, Tuple
+from render.track import Track
+
+
+# ------------------ CLASSES ------------------
+
+
+class ReplayWriter:
+    """Record every tick of a generation in a binary file, to be played back later (see Replay)
+
+    The file starts with MAGIC, the length of a JSON header and the header itself (generation, number of cars,
+    track, start poses...). Then comes one record per car for every tick, appended as the generation runs, so a
+    file is readable (up to its last complete tick) even while it is written or if the run was interrupted.
+    """
+
+    MAGIC = b"NCRP"
+    FORMAT_VERSION = 1
+    FILE_NAME = "generation_%05d.replay"
+    # The track is saved in a directory named after its content, so that recording another track in the same
+    # directory never overwrites the one of the earlier replays
+    TRACK_DIRECTORY = "track_%s"
+
+    def __init__(self, path: str, track: Track, size: int, sensor_count: int, start_position: list, start_angle: int,
+                 generation: int, start_poses: List[Tuple[list, int]] = None):
+        """
+        Args:
+            path (str): The file to write (its directory is created if needed)
+            track (Track): The track of the generation, saved next to the file if it was not saved yet
+            size (int): The number of cars
+            sensor_count (int): The number of sensors of each car
+            start_position (list): The start position of the cars
+            start_angle (int): The start angle of the cars
+            generation (int): The generation number
+            start_poses (List[Tuple[list, int]]): The (position, angle) poses when the cars start from several
+                ones (see CarAI.START_POSES), the size being a multiple of their number, the given pose only if None
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        if track.path is None:
+            track.save(os.path.join(directory, ReplayWriter.TRACK_DIRECTORY % track.get_content_hash()), start_position,
+                       start_angle)
+        if start_poses is None:
+            start_poses = [(start_position, start_angle)]
+
+        self.record = np.zeros(size, dtype=ReplayWriter.record_dtype(sensor_count))
+        header = json.dumps({
+            "version": ReplayWriter.FORMAT_VERSION,
+            "generation": generation,
+            "cars": size,
+            "sensors": sensor_count,
+            "track": os.path.relpath(track.path, directory),
+            "start_position": [float(start_position[0]), float(start_position[1])],
+            "start_angle": int(start_angle),
+            "start_poses": [{"position": [float(position[0]), float(position[1])], "angle": int(angle)}
+                            for position, angle in start_poses],
+        }).encode()
+
+        self.file = open(path, "wb")
+        self.file.write(ReplayWriter.MAGIC + struct.pack("<I", len(header)) + header)
+
+    @staticmethod
+    def record_dtype(sensor_count: int) -> np.dtype:
+        """Get the type of the record of a car for one tick
+
+        Args:
+            sensor_count (int): The number of sensors of each car
+
+        Returns:
+            np.dtype: The record type (30 bytes with 5 sensors)
+        """
+        return np.dtype([
+            ("x", "<f4"),
+            ("y", "<f4"),
+            ("angle", "<i2"),
+            ("speed", "<f4"),
+            ("sensors", "<u2", (sensor_count,)),
+            ("action", "i1"),
+            ("alive", "?"),
+            ("fitness", "<f4"),
+        ])
+
+    def write(self, fleet, cars: np.ndarray, choices: np.ndarray, fitness: np.ndarray) -> None:
+        """Append the state of every car after a tick
+
+        Args:
+            fleet (CarFleet): The cars
+            cars (np.ndarray): The indices of the cars which chose an action during the tick
+            choices (np.ndarray): Their actions
+            fitness (np.ndarray): The fitness of every car
+        """
+        record = self.record
+        record["x"] = fleet.position[:, 0]
+        record["y"] = fleet.position[:, 1]
+        record["angle"] = fleet.angle
+        record["speed"] = fleet.speed
+        record["sensors"] = np.minimum(fleet.sensor_distances, np.iinfo(np.uint16).max)
+        record["action"] = -1
+        record["action"][cars] = choices
+        record["alive"] = fleet.alive
+        record["fitness"] = fitness
+        self.file.write(record.tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class Replay:
+    """A generation recorded by ReplayWriter, memory-mapped so that any tick can be read without loading the rest"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            if file.read(len(ReplayWriter.MAGIC)) != ReplayWriter.MAGIC:
+                raise ValueError(f"{path} is not a replay")
+            header_length, = struct.unpack("<I", file.read(4))
+            self.header = json.loads(file.read(header_length))
+        if self.header["version"] != ReplayWriter.FORMAT_VERSION:
+            raise ValueError(f"Unsupported replay format version {self.header['version']} in {path}")
+
+        self.path = path
+        self.generation = self.header["generation"]
+        self.cars = self.header["cars"]
+
+        # A tick which is still being written (or was interrupted) is left out
+        dtype = ReplayWriter.record_dtype(self.header["sensors"])
+        offset = len(ReplayWriter.MAGIC) + 4 + header_length
+        ticks = (os.path.getsize(path) - offset) // (dtype.itemsize * self.cars)
+        if ticks:
+            self.ticks = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(ticks, self.cars))
+        else:
+            self.ticks = np.zeros((0, self.cars), dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    def get_start_positions(self) -> np.ndarray:
+        """Get where every car started, the poses being given to consecutive groups of cars (see CarAI.START_POSES)
+
+        Returns:
+            np.ndarray: The (cars, 2) start positions
+        """
+        poses = self.header.get("start_poses", [{"position": self.header["start_position"]}])
+        positions = np.array([pose["position"] for pose in poses], dtype=float).reshape(-1, 2)
+        return np.repeat(positions, self.cars // len(positions), axis=0)
+
+    def load_track(self, load_image: bool = True) -> Track:
+        """Load the track the generation was recorded on
+
+        Args:
+            load_image (bool): Whether to decode the saved image of the track (see Track.load)
+
+        Returns:
+            Track: The track
+        """
+        return Track.load(os.path.join(os.path.dirname(self.path), self.header["track"]), load_image)
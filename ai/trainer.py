@@ -0,0 +1,208 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import neat
+import random
+from typing import List, Tuple
+from ai.car_ai import CarAI
+from ai.checkpoint import BackgroundCheckpointer, load_population
+from ai.curriculum import Curriculum
+from ai.distributed import Coordinator
+from ai.fitness_cache import FitnessCache
+from ai.metrics import Metrics
+from ai.parallel import MultiTrackEvaluator, ParallelEvaluator
+from render.car import Car
+from render.track import Track
+
+
+# ------------------ CLASSES ------------------
+
+
+class HeadlessTrainer:
+    """Train the cars without any display
+
+    Unlike Engine.run_simulation, a generation is not limited by wall-clock time but by a fixed number of
+    simulation ticks, which run as fast as the CPU allows. Given the same seed, track and start pose, two runs
+    produce the same generations whatever the machine and its load, and whatever the number of workers, since
+    every car is only ever stopped by itself (crash, stall or PATIENCE) or by the step limit.
+    Given other tracks, every genome is also evaluated on them (each with its own start pose) by a
+    MultiTrackEvaluator, from the start or as the curriculum adds them, and its fitnesses are combined.
+    Given the address of a coordinator, the genomes are simulated by the workers connected to it instead.
+    """
+
+    def __init__(self, neat_config_path: str, track: Track, start_position: list, start_angle: int = Car.DEFAULT_ANGLE,
+                 max_simulations: int = 1000, step_limit: int = CarAI.STEP_LIMIT, debug: bool = True, seed: int = None,
+                 workers: int = 1, checkpointer: BackgroundCheckpointer = None, resume: str = None,
+                 metrics: Metrics = None, replay_directory: str = None, fitness_cache_size: int = 0,
+                 other_tracks: List[Track] = None, track_reducer: str = "mean", promotion_fitness: float = None,
+                 coordinator_address: str = None):
+        self.neat_config_path = neat_config_path
+        self.track = track
+        self.start_position = start_position
+        self.start_angle = start_angle
+        self.max_simulations = max_simulations
+        self.step_limit = step_limit
+        self.debug = debug
+        self.seed = seed
+        self.workers = workers
+        self.checkpointer = checkpointer
+        self.resume = resume
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.replay_directory = replay_directory
+        self.other_tracks = other_tracks or []
+        self.track_reducer = track_reducer
+        self.promotion_fitness = promotion_fitness
+        self.coordinator_address = coordinator_address
+
+        # Replayed generations must simulate every genome, and the fitness of a genome changes with the tracks
+        self.fitness_cache = None
+        if fitness_cache_size > 0 and replay_directory is None and not self.other_tracks:
+            settings = (step_limit,) + tuple(getattr(CarAI, name) for name in CarAI.SETTINGS)
+            self.fitness_cache = FitnessCache(fitness_cache_size, track, start_position, start_angle, settings)
+
+    def run_simulation(self, genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+        """Simulate one generation until every car is dead or the step budget is spent
+
+        Args:
+            genomes (List[neat.DefaultGenome]): The (genome_id, genome) pairs of the generation
+            config (neat.Config): The neat configuration
+        """
+        self.metrics.start_generation()
+        hits, misses = self.get_cache_counts()
+        simulated = genomes if self.fitness_cache is None else self.fitness_cache.split(genomes)
+
+        best_laps = 0
+        if simulated:
+            car_ai = CarAI(simulated, config, self.start_position, self.track, self.start_angle, visualise=False,
+                           metrics=self.metrics, replay_directory=self.replay_directory)
+            car_ai.simulate(self.step_limit)
+            best_laps = int(car_ai.fleet.laps.max())
+            if self.fitness_cache is not None:
+                self.fitness_cache.store(simulated, car_ai.get_final_cars(self.step_limit).tolist())
+
+        self.report_cache(hits, misses)
+        self.metrics.end_generation(cars=len(genomes), best_fitness=max(genome.fitness for _, genome in genomes),
+                                    best_laps=best_laps)
+
+    def get_cache_counts(self) -> Tuple[int, int]:
+        """Get the hits and misses of the fitness cache so far (zeros without cache)"""
+        if self.fitness_cache is None:
+            return 0, 0
+        return self.fitness_cache.hits, self.fitness_cache.misses
+
+    def report_cache(self, hits: int, misses: int) -> None:
+        """Count and print the hits and misses of the fitness cache since the given counts
+
+        Args:
+            hits (int): The hits before the generation
+            misses (int): The misses before the generation
+        """
+        if self.fitness_cache is None:
+            return
+        hits = self.fitness_cache.hits - hits
+        misses = self.fitness_cache.misses - misses
+        self.metrics.count("fitness_cache_hits", hits)
+        self.metrics.count("fitness_cache_misses", misses)
+        if self.debug:
+            print(f"Fitness cache: {hits} hits, {misses} simulated ({len(self.fitness_cache.entries)} stored, "
+                  f"{self.fitness_cache.hits} hits in total)")
+
+    def run(self) -> neat.DefaultGenome:
+        """Run the evolution
+
+        Returns:
+            neat.DefaultGenome: The best genome found
+        """
+        if self.seed is not None:
+            random.seed(self.seed)
+
+        population = load_population(self.neat_config_path, self.resume)
+
+        if self.debug:
+            population.add_reporter(neat.StdOutReporter(True))
+            population.add_reporter(neat.StatisticsReporter())
+
+        if self.checkpointer is not None:
+            population.add_reporter(self.checkpointer)
+
+        if self.other_tracks:
+            winner = self.run_tracks(population)
+        elif self.coordinator_address is not None:
+            with Coordinator(self.coordinator_address, self.step_limit, self.fitness_cache, self.debug) as coordinator:
+
+                def evaluate(genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+                    self.metrics.start_generation()
+                    hits, misses = self.get_cache_counts()
+                    self.metrics.mark()
+                    coordinator.evaluate(genomes, config, self.track, self.start_position, self.start_angle)
+                    self.metrics.lap("evaluation")
+                    self.report_cache(hits, misses)
+                    best_fitness = max(genome.fitness for _, genome in genomes)
+                    self.metrics.end_generation(cars=len(genomes), best_fitness=best_fitness, best_laps=coordinator.best_laps)
+
+                winner = population.run(evaluate, self.max_simulations)
+        elif self.workers <= 1:
+            winner = population.run(self.run_simulation, self.max_simulations)
+        else:
+            with ParallelEvaluator(self.track, self.start_position, self.start_angle, self.step_limit,
+                                   self.workers, self.fitness_cache) as evaluator:
+
+                # The phases happen in the workers, only the whole evaluation is timed
+                def evaluate(genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+                    self.metrics.start_generation()
+                    hits, misses = self.get_cache_counts()
+                    self.metrics.mark()
+                    evaluator.evaluate(genomes, config)
+                    self.metrics.lap("evaluation")
+                    self.report_cache(hits, misses)
+                    best_fitness = max(genome.fitness for _, genome in genomes)
+                    self.metrics.end_generation(cars=len(genomes), best_fitness=best_fitness, best_laps=evaluator.best_laps)
+
+                winner = population.run(evaluate, self.max_simulations)
+
+        if self.checkpointer is not None:
+            self.checkpointer.save_winner(population.config)
+
+        return winner
+
+    def run_tracks(self, population: neat.Population) -> neat.DefaultGenome:
+        """Run the evolution on every track, see MultiTrackEvaluator and Curriculum
+
+        Args:
+            population (neat.Population): The population to evolve
+
+        Returns:
+            neat.DefaultGenome: The best genome found
+        """
+        tracks = [(self.track, self.start_position, self.start_angle)]
+        tracks += [(track, track.start_position, track.start_angle) for track in self.other_tracks]
+        names = [os.path.basename(os.path.normpath(track.path)) if track.path else f"track {i + 1}"
+                 for i, (track, _, _) in enumerate(tracks)]
+        curriculum = Curriculum(names, self.promotion_fitness)
+
+        with MultiTrackEvaluator(tracks, self.step_limit, self.workers, self.track_reducer) as evaluator:
+
+            # The phases happen in the workers, only the whole evaluation and the time spent on each track are timed
+            def evaluate(genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+                self.metrics.start_generation()
+                self.metrics.mark()
+                evaluator.evaluate(genomes, config, curriculum.active)
+                self.metrics.lap("evaluation")
+
+                best_fitness = max(genome.fitness for _, genome in genomes)
+                per_track = {}
+                for i, name in enumerate(names[:curriculum.active]):
+                    per_track[f"track_{i + 1}_seconds"] = evaluator.track_seconds[i]
+                    per_track[f"track_{i + 1}_best_fitness"] = evaluator.track_best[i]
+                    if self.debug:
+                        print(f"Track {name}: {evaluator.track_seconds[i]:.2f}s of simulation, "
+                              f"best fitness {evaluator.track_best[i]:.1f}")
+                self.metrics.end_generation(cars=len(genomes), best_fitness=best_fitness, best_laps=evaluator.best_laps,
+                                            tracks=curriculum.active, **per_track)
+
+                if curriculum.update(best_fitness) and self.debug:
+                    print(f"Curriculum: adding track {names[curriculum.active - 1]} "
+                          f"({curriculum.active}/{len(names)} tracks)")
+
+            return population.run(evaluate, self.max_simulations)
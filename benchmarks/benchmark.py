@@ -0,0 +1,337 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+# The benchmarks never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import neat
+import pygame
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from ai.batch_network import BatchNetwork
+from ai.car_ai import CarAI
+from render.car import Car
+from render.sample_tracks import TRACKS
+from render.sensors import DistanceFieldRayCaster, GridRayCaster, SegmentRayCaster
+from render.track import Track
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+NEAT_CONFIG_PATH = "neat_config.ini"
+RESULTS_DIRECTORY = "benchmarks/results"
+POPULATIONS = [50, 500, 5000]
+GENERATION_STEPS = 300
+MIN_DURATION = 0.5
+SEED = 0
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def load_config(population: int = None) -> neat.Config:
+    """Load the neat configuration, with the given population size (the configured one if None)"""
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        NEAT_CONFIG_PATH
+    )
+    if population is not None:
+        config.pop_size = population
+    return config
+
+
+def create_genomes(population: int = None, evolved: int = 0) -> Tuple[List[Tuple[int, neat.DefaultGenome]], neat.Config]:
+    """Create a seeded population, optionally evolved for a few generations on random fitness to get hidden nodes"""
+    random.seed(SEED)
+    config = load_config(population)
+    neat_population = neat.Population(config)
+    if evolved:
+        neat_population.run(lambda genomes, _: [setattr(genome, "fitness", random.random()) for _, genome in genomes],
+                            evolved)
+    return list(neat_population.population.items()), config
+
+
+def create_cars(track: Track, start_position: list, count: int) -> List[Car]:
+    """Create cars on the start position with various angles, ready for their sensors and collision checks"""
+    rng = random.Random(SEED)
+    cars = []
+    for _ in range(count):
+        car = Car(start_position, track)
+        car.angle = rng.randrange(0, 360, Car.ANGLE_INCREMENT)
+        car.update_center()
+        car.refresh_corners_positions()
+        cars.append(car)
+    return cars
+
+
+def measure(function: Callable[[], None], min_duration: float = MIN_DURATION) -> Tuple[float, int]:
+    """Call a function until it has run for at least min_duration seconds
+
+    Returns:
+        Tuple[float, int]: The total time and the number of calls
+    """
+    calls, start = 0, time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_duration:
+            return elapsed, calls
+
+
+def result(track: str, population: int, stage: str, seconds: float, ticks: int, car_ticks: int) -> dict:
+    return {
+        "track": track,
+        "population": population,
+        "stage": stage,
+        "seconds": seconds,
+        "ticks": ticks,
+        "car_ticks": car_ticks,
+        "ticks_per_second": ticks / seconds,
+        "car_ticks_per_second": car_ticks / seconds,
+    }
+
+
+# ------------------ STAGES ------------------
+
+
+def bench_check_sensor(track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    cars = create_cars(track, start_position, population)
+    surface = track.get_surface()
+
+    def tick():
+        for car in cars:
+            car.sensors.clear()
+            for sensor_angle in Car.SENSOR_ANGLES:
+                car.check_sensor(sensor_angle, surface)
+
+    seconds, calls = measure(tick)
+    return seconds, calls, calls * population
+
+
+def bench_batched_sensors(caster_class: type, track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    cars = create_cars(track, start_position, population)
+    if caster_class is GridRayCaster:
+        caster = caster_class(track.get_collision_grid())
+    elif caster_class is SegmentRayCaster:
+        caster = caster_class(track.get_wall_segments())
+    else:
+        caster = caster_class(track.get_distance_field())
+    centers = np.array([car.center for car in cars])
+    angles = np.array([car.angle for car in cars])
+
+    seconds, calls = measure(lambda: caster.cast(centers, angles))
+    return seconds, calls, calls * population
+
+
+def bench_check_collision(track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    cars = create_cars(track, start_position, population)
+    surface = track.get_surface()
+
+    def tick():
+        for car in cars:
+            car.check_collision(surface)
+
+    seconds, calls = measure(tick)
+    return seconds, calls, calls * population
+
+
+def bench_update_sprite(track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    cars = create_cars(track, start_position, population)
+    surface = track.get_surface()
+
+    def tick():
+        # Cars are put back on the start each time so that they keep driving on the track
+        for car in cars:
+            car.position = list(start_position)
+            car.alive = True
+            car.update_sprite(surface)
+
+    seconds, calls = measure(tick)
+    return seconds, calls, calls * population
+
+
+def bench_compute(track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    genomes, config = create_genomes(population)
+    car_ai = CarAI(genomes, config, start_position, track, visualise=False)
+    ticks, car_ticks = 0, 0
+
+    def tick():
+        nonlocal car_ai, ticks, car_ticks
+        if car_ai.remaining_cars == 0:
+            car_ai = CarAI(genomes, config, start_position, track, visualise=False)
+        car_ticks += int(car_ai.fleet.alive.sum())
+        car_ai.compute()
+        ticks += 1
+
+    seconds, _ = measure(tick)
+    return seconds, ticks, car_ticks
+
+
+def bench_generation(track: Track, start_position: list, population: int) -> Tuple[float, int, int]:
+    """A whole headless generation (see HeadlessTrainer.run_simulation), networks compilation included"""
+    genomes, config = create_genomes(population)
+    ticks, car_ticks = 0, 0
+
+    start = time.perf_counter()
+    car_ai = CarAI(genomes, config, start_position, track, visualise=False)
+    while ticks < GENERATION_STEPS:
+        car_ticks += car_ai.remaining_cars
+        car_ai.compute()
+        ticks += 1
+        if car_ai.is_over():
+            break
+    car_ai.assign_fitness(GENERATION_STEPS)
+    return time.perf_counter() - start, ticks, car_ticks
+
+
+STAGES: Dict[str, Callable] = {
+    "Car.check_sensor": bench_check_sensor,
+    "GridRayCaster.cast": lambda *arguments: bench_batched_sensors(GridRayCaster, *arguments),
+    "DistanceFieldRayCaster.cast": lambda *arguments: bench_batched_sensors(DistanceFieldRayCaster, *arguments),
+    "SegmentRayCaster.cast": lambda *arguments: bench_batched_sensors(SegmentRayCaster, *arguments),
+    "Car.check_collision": bench_check_collision,
+    "Car.update_sprite": bench_update_sprite,
+    "CarAI.compute": bench_compute,
+    "run_simulation": bench_generation,
+}
+
+
+# ------------------ CHECKS ------------------
+
+
+def check_sensors(track: Track, start_position: list, count: int = 200) -> bool:
+    """Check that the batched sensors give exactly the sensors of Car.check_sensor"""
+    cars = create_cars(track, start_position, count)
+    surface = track.get_surface()
+    expected = []
+    for car in cars:
+        car.sensors.clear()
+        for sensor_angle in Car.SENSOR_ANGLES:
+            car.check_sensor(sensor_angle, surface)
+        expected.append(car.sensors)
+
+    centers = np.array([car.center for car in cars])
+    angles = np.array([car.angle for car in cars])
+    for caster in (GridRayCaster(track.get_collision_grid()), DistanceFieldRayCaster(track.get_distance_field())):
+        points, distances = caster.cast(centers, angles)
+        sensors = [[[tuple(point), distance] for point, distance in zip(car_points, car_distances)]
+                   for car_points, car_distances in zip(points.tolist(), distances.tolist())]
+        if sensors != expected:
+            return False
+    return True
+
+
+def check_networks(population: int = 200, samples: int = 20) -> bool:
+    """Check that BatchNetwork chooses the action of neat.nn.FeedForwardNetwork, with close outputs"""
+    genomes, config = create_genomes(population, evolved=30)
+    network = BatchNetwork.create([genome for _, genome in genomes], config)
+    nets = [neat.nn.FeedForwardNetwork.create(genome, config) for _, genome in genomes]
+    rng = np.random.default_rng(SEED)
+
+    for _ in range(samples):
+        inputs = rng.integers(0, 500, size=(len(genomes), len(config.genome_config.input_keys)))
+        outputs = network.activate(inputs)
+        for net, row, output in zip(nets, inputs.tolist(), outputs):
+            expected = net.activate(row)
+            if not np.allclose(expected, output, rtol=0, atol=1e-9) or expected.index(max(expected)) != output.argmax():
+                return False
+    return True
+
+
+# ------------------ MAIN FUNCTION ------------------
+
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Compare the car-ticks per second to the ones of a previous run
+
+    Returns:
+        List[str]: A line for every stage which got slower by more than the tolerance
+    """
+    with open(baseline_path) as file:
+        baseline = {(r["track"], r["population"], r["stage"]): r for r in json.load(file)["results"]}
+
+    regressions = []
+    for r in results:
+        previous = baseline.get((r["track"], r["population"], r["stage"]))
+        if previous is None:
+            continue
+        ratio = r["car_ticks_per_second"] / previous["car_ticks_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{r['stage']} on {r['track']} with {r['population']} cars: {ratio:.2f}x the baseline speed")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the sensors, physics, inference and full generations.")
+    parser.add_argument("--tracks", nargs="+", default=list(TRACKS), choices=list(TRACKS))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--populations", nargs="+", type=int, default=POPULATIONS)
+    parser.add_argument("--output", help="JSON file to write the results to (a timestamped file in "
+                                         f"{RESULTS_DIRECTORY} by default)")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown ratio above which a stage counts as a regression")
+    parser.add_argument("--skip-checks", action="store_true", help="do not check the batched code against the original")
+    arguments = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    tracks = {name: TRACKS[name]() for name in arguments.tracks}
+    checks = {}
+    if not arguments.skip_checks:
+        checks["networks"] = check_networks()
+        for name, (track, start_position) in tracks.items():
+            checks[f"sensors_{name}"] = check_sensors(track, start_position)
+        print("Checks: " + ", ".join(f"{name} {'ok' if ok else 'FAILED'}" for name, ok in checks.items()))
+
+    results = []
+    print(f"{'track':<10}{'cars':>7}  {'stage':<30}{'ticks/s':>12}{'car-ticks/s':>15}")
+    for name, (track, start_position) in tracks.items():
+        for population in arguments.populations:
+            for stage in arguments.stages:
+                seconds, ticks, car_ticks = STAGES[stage](track, start_position, population)
+                results.append(result(name, population, stage, seconds, ticks, car_ticks))
+                print(f"{name:<10}{population:>7}  {stage:<30}{ticks / seconds:>12.1f}{car_ticks / seconds:>15.0f}")
+
+    output = arguments.output or os.path.join(RESULTS_DIRECTORY, time.strftime("benchmark_%Y%m%d_%H%M%S.json"))
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump({
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "generation_steps": GENERATION_STEPS,
+            "checks": checks,
+            "results": results,
+        }, file, indent=4)
+    print(f"Results written to {output}")
+
+    failed = [name for name, ok in checks.items() if not ok]
+    regressions = compare(results, arguments.compare, arguments.tolerance) if arguments.compare else []
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+# ------------------ MAIN CALL ------------------
+
+
+if __name__ == "__main__":
+    main()
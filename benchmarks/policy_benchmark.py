@@ -0,0 +1,109 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import neat
+import numpy as np
+from ai.checkpoint import compile_policy, export_policy, load_winner
+from ai.policy import Policy
+from benchmarks.benchmark import create_genomes, load_config, measure
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+EVOLVED_GENERATIONS = 30
+MIN_LAYERS = 3
+BATCH_SIZES = [1, 10, 100, 1000]
+SEED = 0
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def evolved_genome() -> neat.DefaultGenome:
+    """Evolve a seeded population on random fitness for a while and take its largest genome, then add nodes and
+    connections to it until its network has at least MIN_LAYERS layers (see benchmark.create_genomes)"""
+    genomes, config = create_genomes(None, EVOLVED_GENERATIONS)
+    genome = max((genome for _, genome in genomes), key=lambda genome: genome.size())
+    while len(compile_policy(genome, config).layers) < MIN_LAYERS:
+        genome.mutate_add_node(config.genome_config)
+        genome.mutate_add_connection(config.genome_config)
+    return genome
+
+
+def check_outputs(policy: Policy, net: neat.nn.FeedForwardNetwork, inputs: np.ndarray) -> bool:
+    """Check that the policy gives the outputs of neat.nn.FeedForwardNetwork.activate, one vector or many"""
+    expected = [net.activate(row) for row in inputs.tolist()]
+    single = [policy.activate_one(row) for row in inputs.tolist()]
+    return single == expected and np.allclose(policy.activate(inputs), expected, rtol=0, atol=1e-9)
+
+
+def check_standalone() -> bool:
+    """Check that importing the runtime alone does not import pygame (nor neat)"""
+    code = "import sys, ai.policy; sys.exit(any(m in sys.modules for m in ('pygame', 'neat')))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
+
+
+# ------------------ MAIN FUNCTION ------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the exported policy runtime with neat's activate.")
+    parser.add_argument("--winner", help="genome exported by a training (checkpoints/neat-checkpoint-winner), "
+                                         "an evolved random genome by default")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    arguments = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    config = load_config()
+    genome = load_winner(arguments.winner)["genome"] if arguments.winner else evolved_genome()
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "policy.npz")
+        export_policy(genome, config, path)
+        size = os.path.getsize(path)
+        policy = Policy.load(path)
+
+    nodes, connections = genome.size()
+    print(f"Genome: {nodes} nodes, {connections} enabled connections, {len(policy.layers)} layers, "
+          f"policy of {size} bytes")
+
+    rng = np.random.default_rng(SEED)
+    inputs = rng.integers(0, 500, size=(max(arguments.batch_sizes), policy.input_count)).astype(float)
+    checks = {"outputs": check_outputs(policy, net, inputs[:200]), "standalone": check_standalone()}
+    print("Checks: " + ", ".join(f"{name} {'ok' if ok else 'FAILED'}" for name, ok in checks.items()))
+
+    rows = inputs.tolist()
+    print(f"{'batch':>7}  {'activate (us/vector)':>22}{'policy (us/vector)':>20}{'speedup':>10}")
+    for batch_size in arguments.batch_sizes:
+        batch, batch_rows = inputs[:batch_size], rows[:batch_size]
+        activate_seconds, activate_calls = measure(lambda: [net.activate(row) for row in batch_rows])
+        if batch_size == 1:
+            vector = batch_rows[0]
+            policy_seconds, policy_calls = measure(lambda: policy.activate_one(vector))
+        else:
+            policy_seconds, policy_calls = measure(lambda: policy.activate(batch))
+
+        activate_time = activate_seconds / (activate_calls * batch_size) * 1e6
+        policy_time = policy_seconds / (policy_calls * batch_size) * 1e6
+        print(f"{batch_size:>7}  {activate_time:>22.2f}{policy_time:>20.2f}{activate_time / policy_time:>9.1f}x")
+
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+# ------------------ MAIN CALL ------------------
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 # ------------------ IMPORTS ------------------
 
 
-from render.engine import Engine
+import os
+import argparse
+from ai.car_ai import CarAI
+from ai.metrics import Metrics
+from render.car import Car
+from render.track import Track
 
 
 # ------------------ GLOBAL VARIABLES ------------------
@@ -10,14 +15,188 @@ from render.engine import Engine
 NEAT_CONFIG_PATH = "neat_config.ini"
 RAY_CAST = True
 MAX_SIMULATIONS = 1000
+CHECKPOINT_GENERATIONS = 0
+CHECKPOINT_SECONDS = 300
+CHECKPOINT_PREFIX = "checkpoints/neat-checkpoint-"
+METRICS_PATH = "metrics.csv"
+FITNESS_CACHE_SIZE = 1000
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def is_reducer(value: str) -> bool:
+    """Tell whether a value of the command line is a valid reducer (see CarAI.reduce_fitness)"""
+    if value in ("mean", "min"):
+        return True
+    try:
+        return 0 <= float(value) <= 1
+    except ValueError:
+        return False
 
 
 # ------------------ MAIN FUNCTION ------------------
 
 
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Draw a track and watch cars learn to drive on it.")
+    parser.add_argument("--headless", action="store_true",
+                        help="train without any window, each generation being limited by simulation ticks")
+    parser.add_argument("--track", help="saved track directory, or image of the track (white pixels are walls), "
+                                        "required when headless")
+    parser.add_argument("--generate", type=int, metavar="SEED",
+                        help="train on a procedural track built from a seed instead of a drawn one")
+    parser.add_argument("--hairpins", type=int, default=0, help="number of hairpins of a procedural track")
+    parser.add_argument("--start", nargs=2, type=float, metavar=("X", "Y"),
+                        help="top left position of the cars on the track, required when headless with an image")
+    parser.add_argument("--angle", type=int, help="start angle of the cars, in degrees")
+    parser.add_argument("--steps", type=int, help="simulation ticks per generation when headless")
+    parser.add_argument("--seed", type=int, help="seed of the evolution when headless")
+    parser.add_argument("--workers", type=int, default=1, help="processes evaluating the genomes when headless")
+    parser.add_argument("--sensors", choices=("field", "grid", "vector"), default="field",
+                        help="how the sensors are cast: on the distance field, pixel by pixel on the wall grid, or "
+                             "analytically on the walls' boundaries (which also checks the collisions)")
+    parser.add_argument("--stall-window", type=int, default=CarAI.STALL_WINDOW, metavar="TICKS",
+                        help="ticks after which a car which stayed within --stall-distance is killed, only "
+                             "when above 0 (90 for instance)")
+    parser.add_argument("--stall-distance", type=float, default=CarAI.STALL_DISTANCE, metavar="PIXELS",
+                        help="distance under which a car did not get anywhere, see --stall-window")
+    parser.add_argument("--patience", type=int, default=CarAI.PATIENCE, metavar="TICKS",
+                        help="ticks after which a car which did not drive further along the track is killed, "
+                             "only when above 0 (300 for instance)")
+    parser.add_argument("--start-poses", type=int, default=CarAI.START_POSES, metavar="POSES",
+                        help="cars driven by every network, from start poses spread along the track")
+    parser.add_argument("--pose-reducer", default=CarAI.POSE_REDUCER, metavar="REDUCER",
+                        help="how the fitnesses of the cars of a network are combined: mean, min or a quantile "
+                             "between 0 and 1")
+    parser.add_argument("--other-tracks", nargs="+", default=[], metavar="TRACK",
+                        help="saved track directories the networks are also evaluated on when headless, from the "
+                             "easiest to the hardest")
+    parser.add_argument("--track-reducer", default="mean", metavar="REDUCER",
+                        help="how the fitnesses of a network on the tracks are combined: mean, min or a quantile "
+                             "between 0 and 1")
+    parser.add_argument("--curriculum", type=float, metavar="FITNESS",
+                        help="start with the first track only, and add the next one whenever the best fitness of a "
+                             "generation reaches FITNESS")
+    parser.add_argument("--coordinator", metavar="HOST:PORT",
+                        help="have the genomes simulated by workers started with python -m ai.distributed HOST:PORT, "
+                             "on this machine or others")
+    parser.add_argument("--fitness-cache", type=int, default=FITNESS_CACHE_SIZE, metavar="GENOMES",
+                        help="fitnesses remembered when headless, so that identical networks (like the elites) are "
+                             "not simulated again (0 to disable)")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="checkpoint file to resume the evolution from")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_GENERATIONS, metavar="GENERATIONS",
+                        help="generations between two checkpoints, which are only written when this is "
+                             "above 0 (10 for instance)")
+    parser.add_argument("--checkpoint-seconds", type=float, default=CHECKPOINT_SECONDS, metavar="SECONDS",
+                        help="maximum seconds between two checkpoints")
+    parser.add_argument("--checkpoint-prefix", default=CHECKPOINT_PREFIX,
+                        help="path prefix of the checkpoint files (the best genome is exported as <prefix>winner)")
+    parser.add_argument("--record", metavar="DIRECTORY",
+                        help="record every generation in DIRECTORY, to be played back with python -m render.replay_viewer")
+    parser.add_argument("--metrics", nargs="?", const=METRICS_PATH, metavar="LOG",
+                        help="time every phase of the simulation, show it in the window's title and append it to a "
+                             f"per-generation .csv or .jsonl log ({METRICS_PATH} by default)")
+    parser.add_argument("--draw-every", type=int, default=1, metavar="TICKS",
+                        help="draw only one simulation tick out of TICKS in the window")
+    parser.add_argument("--draw-top", type=int, metavar="CARS", help="draw only the CARS living cars with the best fitness")
+    parser.add_argument("--bake-dead", action="store_true",
+                        help="draw dead cars once on the track instead of on every frame")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="update only the areas of the window which changed")
+    parser.add_argument("--threaded", action="store_true",
+                        help="simulate on a separate thread, the window drawing the latest tick at its own frame rate "
+                             f"(a generation then lasts {CarAI.STEP_LIMIT} ticks at most)")
+    parser.add_argument("--generations", type=int, default=MAX_SIMULATIONS, help="maximum number of generations")
+    arguments = parser.parse_args()
+
+    if arguments.headless and arguments.track is None and arguments.generate is None:
+        parser.error("--headless requires --track or --generate")
+    if arguments.stall_window < 0 or arguments.patience < 0:
+        parser.error("--stall-window and --patience must not be negative")
+    if arguments.start_poses < 1:
+        parser.error("--start-poses must be at least 1")
+    if not is_reducer(arguments.pose_reducer):
+        parser.error("--pose-reducer must be mean, min or a quantile between 0 and 1")
+    if not is_reducer(arguments.track_reducer):
+        parser.error("--track-reducer must be mean, min or a quantile between 0 and 1")
+    if arguments.other_tracks and (not arguments.headless or arguments.record is not None):
+        parser.error("--other-tracks only works headless, without --record")
+    if arguments.coordinator is not None and (arguments.other_tracks or arguments.record is not None):
+        parser.error("--coordinator does not work with --other-tracks nor --record")
+    if arguments.record is not None and arguments.headless and arguments.workers > 1:
+        parser.error("--record only works with a single worker")
+
+    return arguments
+
+
+def load_track(arguments: argparse.Namespace) -> Track:
+    """Load (or generate) the track given on the command line and apply the start pose given on the command line, if any"""
+    if arguments.generate is not None:
+        from render.track_generator import TrackGenerator
+
+        track = TrackGenerator(hairpins=arguments.hairpins).generate(arguments.generate)
+    elif os.path.isdir(arguments.track):
+        track = Track.load(arguments.track)
+    else:
+        track = Track.from_image(arguments.track)
+        track.start_angle = Car.DEFAULT_ANGLE
+
+    if arguments.start is not None:
+        track.start_position = list(arguments.start)
+    if arguments.angle is not None:
+        track.start_angle = arguments.angle
+
+    return track
+
+
 def main() -> None:
-    window = Engine(NEAT_CONFIG_PATH, RAY_CAST, MAX_SIMULATIONS)
-    window.run()
+    arguments = parse_arguments()
+
+    track = load_track(arguments) if arguments.track is not None or arguments.generate is not None else None
+
+    checkpointer = None
+    if arguments.checkpoint_every > 0:
+        from ai.checkpoint import BackgroundCheckpointer
+
+        checkpointer = BackgroundCheckpointer(arguments.checkpoint_every, arguments.checkpoint_seconds,
+                                              arguments.checkpoint_prefix)
+
+    metrics = Metrics(arguments.metrics is not None, arguments.metrics)
+    CarAI.SENSOR_BACKEND = arguments.sensors
+    CarAI.STALL_WINDOW = arguments.stall_window
+    CarAI.STALL_DISTANCE = arguments.stall_distance
+    CarAI.PATIENCE = arguments.patience
+    CarAI.START_POSES = arguments.start_poses
+    CarAI.POSE_REDUCER = arguments.pose_reducer
+
+    if arguments.headless:
+        from ai.trainer import HeadlessTrainer
+
+        if track.start_position is None:
+            raise SystemExit(f"{arguments.track} has no start position, give one with --start")
+
+        other_tracks = [Track.load(path, load_image=False) for path in arguments.other_tracks]
+        for path, other_track in zip(arguments.other_tracks, other_tracks):
+            if other_track.start_position is None:
+                raise SystemExit(f"{path} has no start position")
+
+        trainer = HeadlessTrainer(NEAT_CONFIG_PATH, track, track.start_position, track.start_angle,
+                                  arguments.generations, arguments.steps or CarAI.STEP_LIMIT, RAY_CAST,
+                                  arguments.seed, arguments.workers, checkpointer, arguments.resume, metrics,
+                                  arguments.record, arguments.fitness_cache, other_tracks, arguments.track_reducer,
+                                  arguments.curriculum, arguments.coordinator)
+        trainer.run()
+    else:
+        from render.engine import Engine
+        from render.render_policy import RenderPolicy
+
+        render_policy = RenderPolicy(arguments.draw_every, arguments.draw_top, arguments.bake_dead,
+                                     arguments.dirty_rects)
+        window = Engine(NEAT_CONFIG_PATH, RAY_CAST, arguments.generations, track, checkpointer, arguments.resume,
+                        metrics, render_policy, arguments.record, arguments.threaded,
+                        arguments.coordinator)
+        window.run()
 
 
 # ------------------ MAIN CALL ------------------
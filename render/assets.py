@@ -0,0 +1,61 @@
+# ------------------ IMPORTS ------------------
+
+
+import pygame
+from typing import Dict, Tuple
+
+
+# ------------------ CLASSES ------------------
+
+
+class RotatedSprite:
+    """An image loaded and scaled once per process, with its rotated versions computed once as well
+
+    Rotated versions are cropped back to the size of the image around its center, like cars have always been
+    drawn. The angles multiple of the given step are computed as soon as the image is loaded, any other angle
+    the first time it is asked for.
+    """
+
+    _cache: Dict[tuple, "RotatedSprite"] = {}
+
+    def __init__(self, path: str, size: Tuple[int, int], step: int):
+        image = pygame.image.load(path).convert_alpha()
+        self.image = pygame.transform.scale(image, size)
+        self.rotations = {angle: self._rotate(angle) for angle in range(0, 360, step)}
+
+    @classmethod
+    def get(cls, path: str, size: Tuple[int, int], step: int) -> "RotatedSprite":
+        """Get the sprite of an image, loading it only the first time
+
+        Args:
+            path (str): The path of the image
+            size (Tuple[int, int]): The size the image is scaled to
+            step (int): The angle step, in degrees, of the rotations computed in advance
+
+        Returns:
+            RotatedSprite: The shared sprite
+        """
+        key = (path, tuple(size), step)
+        if key not in cls._cache:
+            cls._cache[key] = cls(path, size, step)
+        return cls._cache[key]
+
+    def rotated(self, angle: int) -> pygame.Surface:
+        """Get the image rotated by the given angle
+
+        Args:
+            angle (int): The angle, in degrees
+
+        Returns:
+            pygame.Surface: The rotated and cropped image (shared, it must not be modified)
+        """
+        angle = angle % 360
+        if angle not in self.rotations:
+            self.rotations[angle] = self._rotate(angle)
+        return self.rotations[angle]
+
+    def _rotate(self, angle: int) -> pygame.Surface:
+        sprite_as_rect = self.image.get_rect()
+        rotated_sprite = pygame.transform.rotate(self.image, angle)
+        sprite_as_rect.center = rotated_sprite.get_rect().center
+        return rotated_sprite.subsurface(sprite_as_rect)
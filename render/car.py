@@ -3,6 +3,8 @@
 
 import pygame
 import math
+import numpy as np
+from render.assets import RotatedSprite
 from render.colors import Color
 from render.track import Track
 
@@ -35,22 +37,16 @@ class Car:
     DEFAULT_SPEED = 10
     DEFAULT_ANGLE = 0
 
-    COLLISION_SURFACE_COLOR = Color.WHITE
+    COLLISION_SURFACE_COLOR = Track.WALL_COLOR
 
     DRAW_SENSORS = True
     SENSORS_DRAW_DISTANCE = 1920
+    SENSOR_ANGLES = (-90, -45, 0, 45, 90)
 
     def __init__(self, start_position: list, track: Track):
-        # The _sprite is the untouched sprite (not rotated) while the sprite is the one which will be moved around
-        self._sprite = pygame.image.load(CAR_SPRITE_PATH).convert_alpha()
-
-        # Scale Sprite
-        self._sprite = pygame.transform.scale(
-            self._sprite, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y)
-        )
-
-        # Assigning the current sprite to this variable sprite (the one which will be rotated) we need this to avoid out of memory errors from pygame
-        self.sprite = self._sprite
+        # The sprites are shared by every car, the sprite is the current (rotated) one
+        self.sprites = RotatedSprite.get(CAR_SPRITE_PATH, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y), Car.ANGLE_INCREMENT)
+        self.sprite = self.sprites.rotated(Car.DEFAULT_ANGLE)
 
         self.position = start_position.copy()
 
@@ -90,10 +86,7 @@ class Car:
         else:
             # Change the sprite color of the car to a black and white one
             if not self.has_been_rendered_as_dead:
-                self._sprite = pygame.image.load(DEAD_CAR_SPRITE_PATH).convert_alpha()
-                self._sprite = pygame.transform.scale(
-                    self._sprite, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y)
-                )
+                self.sprites = RotatedSprite.get(DEAD_CAR_SPRITE_PATH, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y), Car.ANGLE_INCREMENT)
                 self.update_center()
                 self.has_been_rendered_as_dead = True
             track.blit(self.sprite, self.position)
@@ -106,11 +99,12 @@ class Car:
                                  self.center, position, 2)
                 pygame.draw.circle(track, Color.RED, position, 4)
 
-    def check_collision(self, track: pygame.Surface) -> bool:
+    def check_collision(self, track: pygame.Surface, collision_grid: np.ndarray = None) -> bool:
         """Check if the car is colliding with the track (by using a color system)
 
         Args:
             track (pygame.Surface): The track on which the car is being drawn
+            collision_grid (np.ndarray): The wall grid of the track (see Track.get_collision_grid), read instead of the surface if given
         """
         track_x = track.get_width()
         track_y = track.get_height()
@@ -119,6 +113,11 @@ class Car:
                 self.alive = False
                 return True
 
+            elif collision_grid is not None:
+                if collision_grid[int(point[0]), int(point[1])]:
+                    self.alive = False
+                    return True
+
             elif track.get_at((int(point[0]), int(point[1]))) == Car.COLLISION_SURFACE_COLOR:
                 self.alive = False
                 return True
@@ -196,18 +195,21 @@ class Car:
 
     def update_center(self) -> None:
         """Update the center of the car after a rotation (when it turns left or right)"""
-        sprite_as_rect = self._sprite.get_rect()
-        rotated_sprite = pygame.transform.rotate(self._sprite, self.angle)
-        sprite_as_rect.center = rotated_sprite.get_rect().center
-        self.sprite = rotated_sprite.subsurface(sprite_as_rect)
+        self.sprite = self.sprites.rotated(self.angle)
         # Calculate New Center
         self.center = [
             int(self.position[0]) + Car.CAR_SIZE_X / 2,
             int(self.position[1]) + Car.CAR_SIZE_Y / 2
         ]
 
-    def update_sprite(self, track: pygame.Surface) -> None:
-        """Update the sprite of the car and its new informations (position, center, sensors, etc.)"""
+    def update_sprite(self, track: pygame.Surface, cast_sensors: bool = True, collision_grid: np.ndarray = None) -> None:
+        """Update the sprite of the car and its new informations (position, center, sensors, etc.)
+
+        Args:
+            track (pygame.Surface): The track on which the car is being drawn
+            cast_sensors (bool): Whether to cast the sensors pixel by pixel here, disable it when they are cast in batch
+            collision_grid (np.ndarray): The wall grid of the track, used for the collision check if given
+        """
 
         # Update the sprite
         self.update_center()
@@ -228,12 +230,13 @@ class Car:
         self.refresh_corners_positions()
 
         # Check collisions
-        self.check_collision(track)
+        self.check_collision(track, collision_grid)
 
         # Clear radars and rewrite them (-90, -45, 0, 45, 90)
-        self.sensors.clear()
-        for sensor_angle in range(-90, 90 + 1, 45):
-            self.check_sensor(sensor_angle, track)
+        if cast_sensors:
+            self.sensors.clear()
+            for sensor_angle in Car.SENSOR_ANGLES:
+                self.check_sensor(sensor_angle, track)
 
     def get_data(self) -> list[int]:
         """Get the data of the car's sensors
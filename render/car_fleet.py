@@ -0,0 +1,423 @@
+# ------------------ IMPORTS ------------------
+
+
+import math
+import pygame
+import numpy as np
+from typing import List, Tuple
+from ai.metrics import Metrics
+from render.assets import RotatedSprite
+from render.car import Car, Action, CAR_SPRITE_PATH, DEAD_CAR_SPRITE_PATH
+from render.colors import Color
+from render.sensors import RayCaster, DistanceFieldRayCaster, unit_vectors
+from render.track import Track
+from render.wall_segments import WallSegments
+
+
+# ------------------ CLASSES ------------------
+
+
+class CarFleet:
+    """A whole population of cars stored as numpy arrays (one row per car)
+
+    It follows the exact rules of the Car class (same actions, same movement, same corners, same collision
+    and same reward) but every step is applied to all the cars at once instead of one Car object at a time.
+    The driven distance, which the Car class never updates, is the progress of each car along the track (see
+    Track.get_progress_field), laps included.
+    Given the walls' boundaries (see WallSegments), the collisions are checked analytically on them instead of
+    on the wall grid.
+    The cars may start from different poses (see get_start_poses), the progress along the track being counted
+    from the first one and the driven distance of each car from its own.
+    """
+
+    CORNER_ANGLES = (30, 150, 210, 330)
+
+    # A start pose heads towards the cells further along the track than it by more than HEADING_MIN_CELLS and at
+    # most HEADING_MAX_CELLS cells, among the ones within HEADING_SEARCH_CELLS cells of it on both axes (see
+    # get_start_poses): far enough to give a direction, close enough to follow the turns
+    HEADING_MIN_CELLS = 2
+    HEADING_MAX_CELLS = 6
+    HEADING_SEARCH_CELLS = 8
+
+    def __init__(self, size: int, start_position: list, track: Track, start_angle: int = Car.DEFAULT_ANGLE,
+                 ray_caster: RayCaster = None, metrics: Metrics = None, stall_window: int = 0,
+                 stall_distance: float = 0, wall_segments: WallSegments = None, patience: int = 0):
+        """
+        Args:
+            size (int): The number of cars
+            start_position (list): The start position of every car, or the (size, 2) start positions of the cars
+            track (Track): The track
+            start_angle (int): The start angle of every car, or the (size,) start angles of the cars
+            ray_caster (RayCaster): How the sensors are cast, on the track's distance field if None
+            metrics (Metrics): Where the phases of update are timed
+            stall_window (int): The ticks after which a car which did not get anywhere is killed, 0 to disable it
+            stall_distance (float): The distance under which a car did not get anywhere
+            wall_segments (WallSegments): The walls' boundaries, to check the collisions on instead of the wall grid
+            patience (int): The ticks after which a car which did not drive further along the track is killed, 0 to
+                disable it
+        """
+        self.size = size
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.track_width = track.width
+        self.track_height = track.height
+        self.wall_segments = wall_segments
+        self.collision_grid = track.get_collision_grid() if wall_segments is None else None
+        self.ray_caster = ray_caster if ray_caster is not None else DistanceFieldRayCaster(track.get_distance_field())
+
+        self.position = np.array(np.broadcast_to(np.reshape(start_position, (-1, 2)), (size, 2)), dtype=float)
+        self.center = self.position + (Car.CAR_SIZE_X / 2, Car.CAR_SIZE_Y / 2)
+        self.angle = np.array(np.broadcast_to(start_angle, (size,)), dtype=int)
+        self.speed = np.full(size, Car.DEFAULT_SPEED, dtype=float)
+        self.alive = np.ones(size, dtype=bool)
+
+        sensors = len(self.ray_caster.sensor_angles)
+        self.sensor_points = np.zeros((size, sensors, 2), dtype=int)
+        self.sensor_distances = np.zeros((size, sensors), dtype=int)
+        self.has_sensors = np.zeros(size, dtype=bool)
+
+        self.driven_distance = np.zeros(size)
+        self.speed_penalty = np.zeros(size)
+
+        self.progress_field, self.lap_length = track.get_progress_field(self.center[0], int(self.angle[0]))
+        self.start_progress = np.maximum(self.get_progress(np.arange(size)), 0)
+        self.progress = self.start_progress.copy()
+        self.laps = np.zeros(size, dtype=int)
+
+        self.track_diagonal = math.sqrt(track.width**2 + track.height**2)
+        self.DISTANCE_NORMALIZER = self.track_diagonal / 2
+        self.MAX_EXPECTED_SPEED = self.track_diagonal / 100
+        self.minimum_speed = np.full(size, Car.CAR_SIZE_X / 6)
+        self.angle_increment = np.degrees(np.arctan2(Car.CAR_SIZE_Y, self.speed * 10))
+        self.penalty_factor = self.track_diagonal / 1000
+
+        # The positions of the last stall_window ticks (a ring buffer, starting with the start positions), to kill
+        # the cars which do not get anywhere
+        self.stall_window = stall_window
+        self.stall_distance = stall_distance
+        self.position_history = None
+        if stall_window > 0:
+            self.position_history = np.repeat(self.position[None].astype(np.float32), stall_window, axis=0)
+        self.stalled_tick = np.full(size, -1)
+
+        # The furthest each car has driven and when, to kill the cars which stopped getting further
+        self.patience = patience
+        self.best_distance = np.zeros(size)
+        self.last_progress_tick = np.zeros(size, dtype=int)
+        self.stagnant_tick = np.full(size, -1)
+        self.ticks = 0
+
+    def apply_actions(self, cars: np.ndarray, choices: np.ndarray) -> None:
+        """Apply the chosen action of each given car (see Car.turn_left, Car.turn_right, etc.)
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+            choices (np.ndarray): The Action chosen by each of these cars
+        """
+        self.angle[cars[choices == Action.TURN_LEFT]] += Car.ANGLE_INCREMENT
+        self.angle[cars[choices == Action.TURN_RIGHT]] -= Car.ANGLE_INCREMENT
+        self.speed[cars[choices == Action.ACCELERATE]] += Car.SPEED_INCREMENT
+
+        braking = cars[choices == Action.BRAKE]
+        slow = self.speed[braking] <= Car.MINIMUM_SPEED
+        self.speed[braking[~slow]] -= Car.SPEED_INCREMENT
+        self.speed[braking[slow]] = Car.MINIMUM_SPEED
+        self.speed_penalty[braking[slow]] += 1
+
+    def update(self) -> np.ndarray:
+        """Move every living car, check its collisions and cast its sensors (see Car.update_sprite)
+
+        The movement, collision and sensors phases are timed from the last mark of the fleet's metrics.
+
+        Returns:
+            np.ndarray: The indices of the cars which were alive, and therefore updated
+        """
+        cars = np.flatnonzero(self.alive)
+        if not len(cars):
+            return cars
+
+        # The center is the one of the sprite before the move, like in Car.update_center
+        center = np.trunc(self.position[cars]) + (Car.CAR_SIZE_X / 2, Car.CAR_SIZE_Y / 2)
+        previous_center = self.center[cars]
+        self.center[cars] = center
+
+        angle = self.angle[cars]
+        cos, sin = unit_vectors(angle)
+        self.position[cars, 0] += cos * self.speed[cars]
+        self.position[cars, 1] += sin * self.speed[cars]
+
+        self.update_adaptive_parameters(cars)
+        self.update_progress(cars)
+        self.metrics.lap("movement")
+
+        corners = self.get_corners(center, angle)
+        self.alive[cars] = ~self.check_collision(corners, previous_center)
+        self.ticks += 1
+        if self.position_history is not None:
+            self.check_progress(cars)
+        if self.patience:
+            self.check_patience(cars)
+        self.metrics.lap("collision")
+
+        steps = self.ray_caster.steps
+        points, distances = self.ray_caster.cast(center, angle)
+        self.sensor_points[cars] = points
+        self.sensor_distances[cars] = distances
+        self.has_sensors[cars] = True
+        self.metrics.lap("sensors")
+        self.metrics.count("ray_steps", self.ray_caster.steps - steps)
+
+        return cars
+
+    def update_progress(self, cars: np.ndarray) -> None:
+        """Update the laps and the driven distance of the given cars from the progress field
+
+        A car whose progress jumps by more than half a lap has crossed the start line, forward if its progress
+        fell and backward if it rose. The cars standing on a wall keep their last progress.
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+        """
+        progress = self.get_progress(cars)
+
+        known = progress >= 0
+        cars, progress = cars[known], progress[known]
+        if self.lap_length:
+            jump = progress - self.progress[cars]
+            self.laps[cars] += (jump < -self.lap_length / 2).astype(int) - (jump > self.lap_length / 2)
+        self.progress[cars] = progress
+        self.driven_distance[cars] = self.laps[cars] * self.lap_length + progress - self.start_progress[cars]
+
+    def get_progress(self, cars: np.ndarray) -> np.ndarray:
+        """Read the progress field under the center of the given cars
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+
+        Returns:
+            np.ndarray: The progress of each car, -1 on a wall
+        """
+        cells = (self.position[cars] + (Car.CAR_SIZE_X / 2, Car.CAR_SIZE_Y / 2)) // Track.PROGRESS_CELL_SIZE
+        x = np.clip(cells[:, 0].astype(int), 0, self.progress_field.shape[0] - 1)
+        y = np.clip(cells[:, 1].astype(int), 0, self.progress_field.shape[1] - 1)
+        return self.progress_field[x, y]
+
+    @staticmethod
+    def get_start_poses(track: Track, start_position: list, start_angle: int, count: int) -> List[Tuple[list, int]]:
+        """Spread start poses evenly along a track, the given one first
+
+        The k-th pose is on the cell furthest from the walls among the ones k / count of a lap away from the
+        given pose along the track (of the furthest reachable cell if the track is not a loop), heading towards
+        the cells a few cells further along.
+
+        Args:
+            track (Track): The track
+            start_position (list): The first start position (top left corner of the sprite)
+            start_angle (int): The first start angle
+            count (int): The number of poses
+
+        Returns:
+            List[Tuple[list, int]]: The (position, angle) poses
+        """
+        size = Track.PROGRESS_CELL_SIZE
+        start_center = (start_position[0] + Car.CAR_SIZE_X / 2, start_position[1] + Car.CAR_SIZE_Y / 2)
+        field, lap_length = track.get_progress_field(start_center, start_angle)
+        clearance = Track.chebyshev_distance_field(field < 0)
+        length = lap_length or int(field.max())
+
+        poses = [(list(start_position), start_angle)]
+        for k in range(1, count):
+            target = length * k // count
+            band = np.abs(field - target) <= size
+            if not band.any():
+                poses.append(poses[0])
+                continue
+            x, y = np.unravel_index(np.argmax(np.where(band, clearance, -1)), field.shape)
+
+            # The direction of the track is the one of the cells a few cells further, around the chosen one
+            ahead = ((field > field[x, y] + CarFleet.HEADING_MIN_CELLS * size)
+                     & (field <= field[x, y] + CarFleet.HEADING_MAX_CELLS * size))
+            search = CarFleet.HEADING_SEARCH_CELLS
+            near = np.zeros_like(ahead)
+            near[max(x - search, 0):x + search + 1, max(y - search, 0):y + search + 1] = True
+            cells = np.argwhere(ahead & near)
+            angle = start_angle
+            if len(cells):
+                dx, dy = cells.mean(axis=0) - (x, y)
+                angle = round(-math.degrees(math.atan2(dy, dx)) / Car.ANGLE_INCREMENT) * Car.ANGLE_INCREMENT % 360
+
+            position = [(int(x) + 0.5) * size - Car.CAR_SIZE_X / 2, (int(y) + 0.5) * size - Car.CAR_SIZE_Y / 2]
+            poses.append((position, int(angle)))
+
+        return poses
+
+    def check_progress(self, cars: np.ndarray) -> None:
+        """Kill the given cars if they are less than stall_distance away from where they were stall_window ticks
+        ago, which is the case of the cars spinning in place, so a car which never moves dies on the tick
+        stall_window
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+        """
+        slot = self.ticks % self.stall_window
+        if self.ticks >= self.stall_window:
+            moved = np.hypot(*(self.position[cars] - self.position_history[slot, cars]).T)
+            stalled = cars[(moved < self.stall_distance) & self.alive[cars]]
+            self.alive[stalled] = False
+            self.stalled_tick[stalled] = self.ticks
+            self.metrics.count("stalled_cars", len(stalled))
+        self.position_history[slot, cars] = self.position[cars]
+
+    def check_patience(self, cars: np.ndarray) -> None:
+        """Kill the given cars if their driven distance has not reached a new maximum for patience ticks, which is
+        the case of the cars going round in circles or driving backwards, so a car which never gets further dies on
+        the tick patience
+
+        Unlike an early end of the whole generation, this only depends on each car, so the fitness of a genome
+        does not depend on the genomes it is simulated with.
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+        """
+        improved = cars[self.driven_distance[cars] > self.best_distance[cars]]
+        self.best_distance[improved] = self.driven_distance[improved]
+        self.last_progress_tick[improved] = self.ticks
+
+        stagnant = cars[(self.ticks - self.last_progress_tick[cars] >= self.patience) & self.alive[cars]]
+        self.alive[stagnant] = False
+        self.stagnant_tick[stagnant] = self.ticks
+        self.metrics.count("stagnant_cars", len(stagnant))
+
+    def update_adaptive_parameters(self, cars: np.ndarray) -> None:
+        """Update the adaptive parameters of the given cars (see Car.update_adaptive_parameters)
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+        """
+        self.angle_increment[cars] = np.degrees(np.arctan2(Car.CAR_SIZE_Y, self.speed[cars] * 10))
+        min_sensor_distance = np.where(self.has_sensors[cars], self.sensor_distances[cars].min(axis=1), Car.CAR_SIZE_X)
+        self.minimum_speed[cars] = np.maximum(Car.CAR_SIZE_X / 6, min_sensor_distance / 20)
+
+    def get_corners(self, centers: np.ndarray, angles: np.ndarray) -> np.ndarray:
+        """Get the corners of the given cars (see Car.refresh_corners_positions)
+
+        Args:
+            centers (np.ndarray): The (n, 2) centers of the cars
+            angles (np.ndarray): The (n,) angles of the cars
+
+        Returns:
+            np.ndarray: The (n, 4, 2) corners of the cars
+        """
+        cos, sin = unit_vectors(angles[:, None] + np.array(CarFleet.CORNER_ANGLES))
+        corners = np.empty(cos.shape + (2,))
+        corners[..., 0] = centers[:, None, 0] + cos * (0.5 * Car.CAR_SIZE_X)
+        corners[..., 1] = centers[:, None, 1] + sin * (0.5 * Car.CAR_SIZE_Y)
+        return corners
+
+    def check_collision(self, corners: np.ndarray, previous_centers: np.ndarray = None) -> np.ndarray:
+        """Check which cars have a corner outside of the track or on a wall (see Car.check_collision)
+
+        With the walls' boundaries, a car collides when an edge of its rectangle crosses one, when its center
+        crossed one since the previous tick (so that a fast car cannot jump into a wall between two ticks), or when
+        its center is in a wall: a rectangle crossing no boundary lies in a single wall or stretch of road, and is
+        then on a wall like its center (e.g. a car starting or ending a tick fully in a wall).
+
+        Args:
+            corners (np.ndarray): The (n, 4, 2) corners of the cars
+            previous_centers (np.ndarray): The (n, 2) centers of the cars on the previous tick, for the boundaries
+
+        Returns:
+            np.ndarray: Whether each car is colliding
+        """
+        x, y = corners[..., 0], corners[..., 1]
+        colliding = (x < 0) | (x >= self.track_width) | (y < 0) | (y >= self.track_height)
+        if self.wall_segments is None:
+            inside = ~colliding
+            colliding[inside] = self.collision_grid[x[inside].astype(int), y[inside].astype(int)]
+            return colliding.any(axis=1)
+
+        colliding = colliding.any(axis=1)
+        starts, ends = corners, np.roll(corners, -1, axis=1)
+        centers = corners.mean(axis=1, keepdims=True)
+        if previous_centers is not None:
+            starts = np.concatenate((starts, previous_centers[:, None]), axis=1)
+            ends = np.concatenate((ends, centers), axis=1)
+        crossing = self.wall_segments.intersects(starts.reshape(-1, 2), ends.reshape(-1, 2))
+        colliding |= crossing.reshape(len(corners), -1).any(axis=1)
+
+        # Only the cars still left have their center probed, the others being out of the track or crossing
+        inside = np.flatnonzero(~colliding)
+        colliding[inside] = self.wall_segments.contains(centers[inside, 0])
+        return colliding
+
+    def get_data(self, cars: np.ndarray) -> np.ndarray:
+        """Get the sensors' distances of the given cars (see Car.get_data)
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+
+        Returns:
+            np.ndarray: The (n, sensors) distances, zeros for the cars which have not cast their sensors yet
+        """
+        return self.sensor_distances[cars]
+
+    def get_rewards(self, cars: np.ndarray) -> np.ndarray:
+        """Get the reward of the given cars for their last move (see Car.get_reward)
+
+        Args:
+            cars (np.ndarray): The indices of the cars
+
+        Returns:
+            np.ndarray: The calculated rewards
+        """
+        driven_distance = self.driven_distance[cars]
+
+        distance_reward = driven_distance / self.DISTANCE_NORMALIZER
+
+        speed_reward = (self.speed[cars] / self.MAX_EXPECTED_SPEED) ** 0.5
+
+        malus = self.speed_penalty[cars] / self.penalty_factor
+
+        progress_factor = np.minimum(1.0, driven_distance / (self.track_diagonal * 0.75))
+
+        return (distance_reward + speed_reward - malus) * (1 + progress_factor)
+
+    def draw(self, screen: pygame.Surface, cars: np.ndarray = None) -> List[pygame.Rect]:
+        """Draw cars on the screen (and the sensors of the living ones if enabled, see Car.draw)
+
+        Args:
+            screen (pygame.Surface): The surface on which the cars will be drawn
+            cars (np.ndarray): The indices of the cars to draw, every car if None
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen which were drawn on
+        """
+        if cars is None:
+            cars = np.arange(self.size)
+        return CarFleet.draw_cars(screen, self.position[cars], self.angle[cars], self.alive[cars], self.center[cars],
+                                  self.sensor_points[cars], self.has_sensors[cars])
+
+    @staticmethod
+    def draw_cars(screen: pygame.Surface, position: np.ndarray, angle: np.ndarray, alive: np.ndarray,
+                  center: np.ndarray, sensor_points: np.ndarray, has_sensors: np.ndarray) -> List[pygame.Rect]:
+        """Draw cars given by their rows of the fleet's arrays (or of a copy of them, see Snapshot)
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen which were drawn on
+        """
+        size = (Car.CAR_SIZE_X, Car.CAR_SIZE_Y)
+        living_sprites = RotatedSprite.get(CAR_SPRITE_PATH, size, Car.ANGLE_INCREMENT)
+        dead_sprites = RotatedSprite.get(DEAD_CAR_SPRITE_PATH, size, Car.ANGLE_INCREMENT)
+
+        rects = []
+        for living, car_angle, car_position in zip(alive.tolist(), angle.tolist(), position.tolist()):
+            sprites = living_sprites if living else dead_sprites
+            rects.append(screen.blit(sprites.rotated(car_angle), car_position))
+
+        if Car.DRAW_SENSORS:
+            for i in np.flatnonzero(alive & has_sensors):
+                car_center = center[i].tolist()
+                for point in sensor_points[i].tolist():
+                    rects.append(pygame.draw.line(screen, Color.GREEN, car_center, point, 2))
+                    rects.append(pygame.draw.circle(screen, Color.RED, point, 4))
+
+        return rects
@@ -1,14 +1,21 @@
 # ------------------ IMPORTS ------------------
 
 
+import os
 import pygame
 import neat
 import time
 import numpy as np
 from typing import Tuple, List
 from ai.car_ai import CarAI
+from ai.checkpoint import BackgroundCheckpointer, load_population
+from ai.distributed import Coordinator
+from ai.metrics import Metrics
 from render.car import Car
 from render.colors import Color
+from render.neural_network.nn import NN
+from render.render_policy import RenderPolicy
+from render.snapshot import SimulationThread, SnapshotBuffer
 from render.track import Track
 
 
@@ -20,32 +27,62 @@ class Engine:
     HEIGHT = 950
     FPS = 60
     DEFAULT_FONT = "comicsansms"
+    TRACKS_DIRECTORY = "tracks"
 
-    def __init__(self, neat_config_path: str, debug: bool, max_simulations: int):
+    def __init__(self, neat_config_path: str, debug: bool, max_simulations: int, track: Track = None,
+                 checkpointer: BackgroundCheckpointer = None, resume: str = None, metrics: Metrics = None,
+                 render_policy: RenderPolicy = None, replay_directory: str = None, threaded: bool = False,
+                 coordinator_address: str = None):
         self.neat_config_path = neat_config_path
         self.debug = debug
         self.max_simulations = max_simulations
+        self.checkpointer = checkpointer
+        self.resume = resume
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.render_policy = render_policy if render_policy is not None else RenderPolicy()
+        self.replay_directory = replay_directory
+        self.threaded = threaded
+        self.coordinator_address = coordinator_address
+        self.coordinator = None
+        self.simulation = None
+        self.population = None
         self.title = "Neat Cars"
         
         pygame.init()
         pygame.display.set_caption(self.title)
-        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
+        self.track = track if track is not None else Track(self.WIDTH, self.HEIGHT)
+        self.screen = pygame.display.set_mode((self.track.width, self.track.height))
         self.clock = pygame.time.Clock()
         
-        self.track = Track(self.WIDTH, self.HEIGHT)
         self.car = Car([0, 0], self.track)
+        self.car.angle = self.track.start_angle
+        self.car.update_center()
         self.decided_car_pos = None
         
         self.state = "drawing_track"
         self.instructions = [
             "Left click to draw a black line, right click to draw a white line. Mouse wheel to adjust brush size. Press SPACE when done.",
-            "Use arrow keys to rotate. Click to place. CTRL + Z to go back. AI starts after placing."
+            "Use arrow keys to rotate. Click to place. CTRL + Z to go back. CTRL + S to save the track. AI starts after placing."
         ]
         self.instruction_index = 0
 
+        # A loaded track is already drawn
+        if track is not None:
+            self.state = "placing_start_point"
+            self.instruction_index = 1
+
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                # The simulation thread is stopped between two ticks, so that it does not write a replay meanwhile
+                if self.simulation is not None:
+                    self.simulation.stop()
+                    self.simulation.join()
+
+                # Keep the current generation, it will be evaluated again when resuming
+                if self.population is not None and self.checkpointer is not None:
+                    self.checkpointer.save_population(self.population)
+                    self.checkpointer.wait()
                 exit(0)
             
             if event.type == pygame.KEYUP and event.key == pygame.K_SPACE:
@@ -59,6 +96,10 @@ class Engine:
                         self.state = "drawing_track"
                         self.instruction_index = 0
 
+                if event.key == pygame.K_s and pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    if self.state == "placing_start_point":
+                        self.save_track()
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 4:
                     self.track.adjust_brush_size(1)
@@ -85,6 +126,12 @@ class Engine:
             self.state = "ai_running"
             self.decided_car_pos = self.car.position.copy()
 
+    def save_track(self):
+        """Export the track, with the current position of the car as start point, so it can be trained on headlessly"""
+        path = os.path.join(self.TRACKS_DIRECTORY, time.strftime("track_%Y%m%d_%H%M%S"))
+        self.track.save(path, self.car.position, self.car.angle)
+        print(f"Track saved in {path}")
+
     def draw(self):
         self.screen.blit(self.track.get_surface(), (0, 0))
         if self.state == "placing_start_point" or self.state == "ai_running":
@@ -94,51 +141,156 @@ class Engine:
         pygame.display.update()
 
     def start_ai(self):
-        config = neat.config.Config(
-            neat.DefaultGenome,
-            neat.DefaultReproduction,
-            neat.DefaultSpeciesSet,
-            neat.DefaultStagnation,
-            self.neat_config_path
-        )
-
-        population = neat.Population(config)
+        population = load_population(self.neat_config_path, self.resume)
+        self.population = population
 
         if self.debug:
             population.add_reporter(neat.StdOutReporter(True))
             population.add_reporter(neat.StatisticsReporter())
 
-        population.run(self.run_simulation, self.max_simulations)
+        if self.checkpointer is not None:
+            population.add_reporter(self.checkpointer)
+
+        if self.coordinator_address is None:
+            population.run(self.run_simulation, self.max_simulations)
+        else:
+            with Coordinator(self.coordinator_address, CarAI.STEP_LIMIT, debug=self.debug) as coordinator:
+                self.coordinator = coordinator
+                population.run(self.run_distributed_simulation, self.max_simulations)
+
+        if self.checkpointer is not None:
+            self.checkpointer.save_winner(population.config)
 
     def run_simulation(self, genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
-        car_ai = CarAI(genomes, config, self.decided_car_pos, self.track)
+        if self.threaded:
+            self.run_threaded_simulation(genomes, config)
+            return
+
+        self.metrics.start_generation()
+        car_ai = CarAI(genomes, config, self.decided_car_pos, self.track, self.car.angle, metrics=self.metrics,
+                       replay_directory=self.replay_directory)
+        policy = self.render_policy
+        policy.start(self.track.get_surface(), car_ai.fleet.size)
         timer = time.time()
 
         while True:
-            if not self.handle_events():
+            # Undrawn ticks neither handle events nor wait for the next frame
+            drawing = policy.should_draw()
+
+            self.metrics.mark()
+            if drawing and not self.handle_events():
                 return
+            self.metrics.lap("events")
 
-            car_ai.compute(self.track.get_surface())
+            car_ai.compute()
 
-            if car_ai.remaining_cars == 0 or time.time() - timer > CarAI.TIME_LIMIT:
+            if car_ai.is_over() or time.time() - timer > CarAI.TIME_LIMIT:
                 break
 
-            self.screen.blit(self.track.get_surface(), (0, 0))
-            for car in car_ai.cars:
-                car.draw(self.screen)
+            if not drawing:
+                continue
 
-            if car_ai.best_nn:
-                car_ai.best_nn.draw(self.screen)
+            self.metrics.mark()
+            rects = policy.draw(self.screen, car_ai.fleet, car_ai.fitness, car_ai.best_nn)
+            self.metrics.lap("drawing")
 
             caption = (f"{self.title} - Generation: {car_ai.TOTAL_GENERATIONS} - "
                        f"Alive: {car_ai.remaining_cars} - "
                        f"Time Left: {round(CarAI.TIME_LIMIT - (time.time() - timer), 2)}s - "
                        f"Best Fitness: {round(car_ai.best_fitness)}")
+            if self.metrics.enabled:
+                caption += f" - {self.metrics.caption()}"
+            pygame.display.set_caption(caption)
+
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            self.metrics.lap("display")
+            self.clock.tick(self.FPS)
+            self.metrics.lap("waiting")
+
+        car_ai.assign_fitness()
+        self.metrics.end_generation(cars=len(genomes), best_fitness=car_ai.best_fitness,
+                                    best_laps=int(car_ai.fleet.laps.max()))
+
+    def run_threaded_simulation(self, genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+        """Simulate a generation on its own thread while this one draws its latest snapshot, at FPS frames per second
+
+        Like a headless generation, it lasts at most CarAI.STEP_LIMIT ticks, which run as fast as the CPU allows.
+        The phases are only timed by the simulation, the window only counts its frames.
+        """
+        self.metrics.start_generation()
+        car_ai = CarAI(genomes, config, self.decided_car_pos, self.track, self.car.angle, visualise=False,
+                       metrics=self.metrics, replay_directory=self.replay_directory)
+        policy = self.render_policy
+        policy.start(self.track.get_surface(), car_ai.fleet.size)
+        buffer = SnapshotBuffer()
+        simulation = self.simulation = SimulationThread(car_ai, buffer, CarAI.STEP_LIMIT)
+
+        # The networks are drawn with pygame, so they are built here rather than by the simulation
+        nns = {}
+        frames = 0
+        simulation.start()
+
+        while simulation.is_alive():
+            self.handle_events()
+            snapshot = buffer.take()
+            if snapshot is None:
+                self.clock.tick(self.FPS)
+                continue
+
+            best_nn = None
+            if snapshot.best_car is not None:
+                if snapshot.best_car not in nns:
+                    nns[snapshot.best_car] = NN(config, genomes[snapshot.best_car % len(genomes)][1],
+                                                  CarAI.NN_POSITION)
+                best_nn = nns[snapshot.best_car]
+                if snapshot.best_input is not None:
+                    best_nn.update(snapshot.best_input, snapshot.best_output)
+            rects = policy.draw(self.screen, snapshot, snapshot.fitness, best_nn)
+
+            caption = (f"{self.title} - Generation: {car_ai.TOTAL_GENERATIONS} - "
+                       f"Alive: {snapshot.remaining_cars} - "
+                       f"Tick: {snapshot.tick}/{CarAI.STEP_LIMIT} - "
+                       f"Best Fitness: {round(snapshot.best_fitness)}")
+            if self.metrics.enabled:
+                caption += f" - {self.metrics.caption()}"
             pygame.display.set_caption(caption)
 
-            pygame.display.update()
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            frames += 1
             self.clock.tick(self.FPS)
 
+        simulation.join()
+        self.simulation = None
+        car_ai.assign_fitness(CarAI.STEP_LIMIT)
+        self.metrics.end_generation(cars=len(genomes), best_fitness=car_ai.best_fitness,
+                                    best_laps=int(car_ai.fleet.laps.max()), frames=frames)
+
+    def run_distributed_simulation(self, genomes: List[neat.DefaultGenome], config: neat.Config) -> None:
+        """Have the workers connected to the coordinator simulate a generation, the window only showing the progress
+
+        Like a headless generation, it lasts at most CarAI.STEP_LIMIT ticks.
+        """
+        self.metrics.start_generation()
+        self.screen.blit(self.track.get_surface(), (0, 0))
+        self.screen.blit(self.car.sprite, self.decided_car_pos)
+        pygame.display.update()
+
+        def wait(done: int, total: int) -> None:
+            self.handle_events()
+            pygame.display.set_caption(f"{self.title} - Generation: {CarAI.TOTAL_GENERATIONS} - "
+                                       f"Workers: {len(self.coordinator.workers)} - Batches: {done}/{total}")
+
+        self.metrics.mark()
+        self.coordinator.evaluate(genomes, config, self.track, self.decided_car_pos, self.car.angle, wait)
+        self.metrics.lap("evaluation")
+        self.metrics.end_generation(cars=len(genomes), best_fitness=max(genome.fitness for _, genome in genomes))
+
     def run(self):
         while True:
             if not self.handle_events():
@@ -21,7 +21,7 @@ class NN:
         input_names = ["0°", "45°", "90°", "135°", "180°"]
         output_names = ["Left", "Right", "Accelerate", "Brake"]
         hidden_nodes = [n for n in genome.nodes.keys()]
-        node_id_list = []
+        nodes_by_id = {}
 
         # nodes
         h = (NN.INPUT_NEURONS-1)*(Node.RADIUS*2 + Node.SPACING)
@@ -29,7 +29,7 @@ class NN:
             n = Node(input, pos[0], pos[1]+int(-h/2 + i*(Node.RADIUS*2 + Node.SPACING)), NodeType.INPUT, [
                      Color.GREEN_PALE, Color.GREEN, Color.DARK_GREEN_PALE, Color.DARK_GREEN], input_names[i], i)
             self.nodes.append(n)
-            node_id_list.append(input)
+            nodes_by_id[input] = n
 
         h = (NN.OUTPUT_NEURONS-1)*(Node.RADIUS*2 + Node.SPACING)
         for i, out in enumerate(config.genome_config.output_keys):
@@ -37,35 +37,73 @@ class NN:
                 Node.RADIUS*2 + Node.SPACING)), NodeType.OUTPUT, [Color.RED_PALE, Color.RED, Color.DARK_RED_PALE, Color.DARK_RED], output_names[i], i)
             self.nodes.append(n)
             hidden_nodes.remove(out)
-            node_id_list.append(out)
+            nodes_by_id[out] = n
 
         h = (len(hidden_nodes)-1)*(Node.RADIUS*2 + Node.SPACING)
         for i, m in enumerate(hidden_nodes):
             n = Node(m, self.pos[0] + (Node.LAYER_SPACING+2*Node.RADIUS), self.pos[1]+int(-h/2 + i*(Node.RADIUS*2 +
                      Node.SPACING)), NodeType.HIDDEN, [Color.BLUE_PALE, Color.DARK_BLUE, Color.BLUE_PALE, Color.DARK_BLUE])
             self.nodes.append(n)
-            node_id_list.append(m)
+            nodes_by_id[m] = n
 
         # connections
         self.connections = []
         for c in genome.connections.values():
             if c.enabled:
-                input_, output = c.key
+                input_, output = nodes_by_id[c.key[0]], nodes_by_id[c.key[1]]
                 
                 # Vérifier si le nœud d'entrée est connecté à un neurone caché
-                if self.nodes[node_id_list.index(input_)].type == NodeType.INPUT and self.nodes[node_id_list.index(output)].type == NodeType.HIDDEN:
-                    self.connections.append(Connection(self.nodes[node_id_list.index(input_)], self.nodes[node_id_list.index(output)], c.weight))
+                if input_.type == NodeType.INPUT and output.type == NodeType.HIDDEN:
+                    self.connections.append(Connection(input_, output, c.weight))
                 
                 # Vérifier si le neurone caché est connecté à un nœud de sortie
-                elif self.nodes[node_id_list.index(input_)].type == NodeType.HIDDEN and self.nodes[node_id_list.index(output)].type == NodeType.OUTPUT:
-                    self.connections.append(Connection(self.nodes[node_id_list.index(input_)], self.nodes[node_id_list.index(output)], c.weight))
+                elif input_.type == NodeType.HIDDEN and output.type == NodeType.OUTPUT:
+                    self.connections.append(Connection(input_, output, c.weight))
                 
                 # Vérifier si le nœud d'entrée est directement connecté à un nœud de sortie
-                elif self.nodes[node_id_list.index(input_)].type == NodeType.INPUT and self.nodes[node_id_list.index(output)].type == NodeType.OUTPUT:
-                    self.connections.append(Connection(self.nodes[node_id_list.index(input_)], self.nodes[node_id_list.index(output)], c.weight))
+                elif input_.type == NodeType.INPUT and output.type == NodeType.OUTPUT:
+                    self.connections.append(Connection(input_, output, c.weight))
 
-    def draw(self, screen: pygame.Surface):
+        self.static_layer = None
+        self.static_rect = None
+
+    def update(self, inputs: list, output: int) -> None:
+        """Show the given activation of the network
+
+        Args:
+            inputs (list): The values of the input nodes
+            output (int): The index of the chosen output
+        """
+        for node in self.nodes:
+            node.inputs = inputs
+            node.output = output
+
+    def render_static_layer(self) -> None:
+        """Draw the connections and the labels, which never change, once on a transparent surface"""
+        rects = [node.get_rect() for node in self.nodes]
+        margin = max((int(abs(c.wt * Node.CONNECTION_WIDTH)) for c in self.connections), default=0)
+        self.static_rect = rects[0].unionall(rects[1:]).inflate(2 * margin, 2 * margin)
+
+        self.static_layer = pygame.Surface(self.static_rect.size, pygame.SRCALPHA)
+        offset = (-self.static_rect.x, -self.static_rect.y)
         for c in self.connections:
-            c.draw(screen)
+            c.draw(self.static_layer, offset)
+        for node in self.nodes:
+            node.draw_label(self.static_layer, offset)
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
+        """Draw the network, only the colors of the nodes being drawn again on every frame
+
+        Args:
+            screen (pygame.Surface): The surface on which the network is drawn
+
+        Returns:
+            pygame.Rect: The area of the screen which was drawn on
+        """
+        if self.static_layer is None:
+            self.render_static_layer()
+
+        rect = screen.blit(self.static_layer, self.static_rect)
         for node in self.nodes:
             node.draw(screen)
+        return rect
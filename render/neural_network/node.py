@@ -37,19 +37,34 @@ class Node:
         self.inputs = [0, 0, 0, 0, 0]
         self.output = None
 
-    def draw(self, screen: pygame.Surface):
+        # The label never changes, so its text is rendered once
+        self.text = Node.FONT.render(self.label, 1, Color.BLACK) if self.type != NodeType.HIDDEN else None
+
+    def get_label_position(self) -> tuple:
+        return (self.x + (self.type-1) * ((self.text.get_width() if not self.type else 0) + Node.RADIUS + 5),
+                self.y - self.text.get_height()/2)
+
+    def get_rect(self) -> pygame.Rect:
+        rect = pygame.Rect(self.x - Node.RADIUS, self.y - Node.RADIUS, 2 * Node.RADIUS, 2 * Node.RADIUS)
+        if self.text is not None:
+            rect = rect.union(self.text.get_rect(topleft=self.get_label_position()))
+        return rect
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
 
         color_scheme = self.get_color()
 
-        pygame.draw.circle(
+        rect = pygame.draw.circle(
             screen, color_scheme[0], (self.x, self.y), Node.RADIUS)
         pygame.draw.circle(
             screen, color_scheme[1], (self.x, self.y), Node.RADIUS - 2)
 
-        if self.type != NodeType.HIDDEN:
-            text = Node.FONT.render(self.label, 1, Color.BLACK)
-            screen.blit(text, (self.x + (self.type-1) * ((text.get_width()
-                            if not self.type else 0) + Node.RADIUS + 5), self.y - text.get_height()/2))
+        return rect
+
+    def draw_label(self, screen: pygame.Surface, offset: tuple = (0, 0)):
+        if self.text is not None:
+            x, y = self.get_label_position()
+            screen.blit(self.text, (x + offset[0], y + offset[1]))
 
     def get_color(self):
         if self.type == NodeType.INPUT:
@@ -75,8 +90,8 @@ class Connection:
         self.output = output
         self.wt = wt
 
-    def draw(self, screen):
+    def draw(self, screen, offset=(0, 0)) -> pygame.Rect:
         color = Color.GREEN if self.wt >= 0 else Color.RED
         width = int(abs(self.wt * Node.CONNECTION_WIDTH))
-        pygame.draw.line(screen, color, (self.input.x + Node.RADIUS,
-                         self.input.y), (self.output.x - Node.RADIUS, self.output.y), width)
+        return pygame.draw.line(screen, color, (self.input.x + Node.RADIUS + offset[0],
+                         self.input.y + offset[1]), (self.output.x - Node.RADIUS + offset[0], self.output.y + offset[1]), width)
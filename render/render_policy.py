@@ -0,0 +1,95 @@
+# ------------------ IMPORTS ------------------
+
+
+import pygame
+import numpy as np
+from typing import List
+from render.neural_network.nn import NN
+
+
+# ------------------ CLASSES ------------------
+
+
+class RenderPolicy:
+    """How much of a running generation is drawn, so that watching it does not slow the simulation down
+
+    The default policy draws everything on every tick, like the window always did. Otherwise:
+    - only one simulation tick out of draw_every is drawn (and waits for the next frame),
+    - only the top_k living cars with the best fitness are drawn,
+    - dead cars are drawn once on a copy of the track (bake_dead) instead of on every frame,
+    - only the areas which changed since the last frame are sent to the display (dirty_rects).
+    """
+
+    def __init__(self, draw_every: int = 1, top_k: int = None, bake_dead: bool = False, dirty_rects: bool = False):
+        self.draw_every = max(draw_every, 1)
+        self.top_k = top_k
+        self.bake_dead = bake_dead
+        self.dirty_rects = dirty_rects
+
+        self.background = None
+        self.baked = None
+        self.previous_rects = None
+        self.tick = 0
+
+    def start(self, track: pygame.Surface, size: int) -> None:
+        """Get ready to draw a new generation
+
+        Args:
+            track (pygame.Surface): The surface of the track
+            size (int): The number of cars of the generation
+        """
+        self.background = track.copy() if self.bake_dead else track
+        self.baked = np.zeros(size, dtype=bool)
+        self.previous_rects = None
+        self.tick = 0
+
+    def should_draw(self) -> bool:
+        """Count a simulation tick and tell whether it must be drawn
+
+        Returns:
+            bool: True if the tick must be drawn
+        """
+        self.tick += 1
+        return (self.tick - 1) % self.draw_every == 0
+
+    def draw(self, screen: pygame.Surface, fleet, fitness: np.ndarray, best_nn: NN = None) -> List[pygame.Rect]:
+        """Draw the track, the cars and the neural network of the best car of a generation
+
+        Args:
+            screen (pygame.Surface): The surface on which the generation is drawn
+            fleet (CarFleet): The cars of the generation, or a Snapshot of them
+            fitness (np.ndarray): The fitness of every car
+            best_nn (NN): The neural network of the best car, if any
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen to update, None to update the whole screen
+        """
+        rects = []
+
+        dead = np.flatnonzero(~fleet.alive)
+        if self.bake_dead:
+            dying = dead[~self.baked[dead]]
+            if len(dying):
+                rects += fleet.draw(self.background, dying)
+                self.baked[dying] = True
+            dead = dead[:0]
+
+        living = np.flatnonzero(fleet.alive)
+        if self.top_k is not None and len(living) > self.top_k:
+            living = living[np.argsort(-fitness[living], kind="stable")[:self.top_k]]
+
+        full = not self.dirty_rects or self.previous_rects is None
+        if full:
+            screen.blit(self.background, (0, 0))
+        else:
+            # Erase what was drawn on the last frame (and show the cars which were baked in the meantime)
+            rects += self.previous_rects
+            for rect in rects:
+                screen.blit(self.background, rect, rect)
+
+        drawn = fleet.draw(screen, np.sort(np.concatenate((dead, living))))
+        if best_nn:
+            drawn.append(best_nn.draw(screen))
+
+        self.previous_rects = drawn
+        return None if full else rects + drawn
@@ -0,0 +1,170 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import glob
+import argparse
+import pygame
+import numpy as np
+
+# Run as a script rather than with python -m, the repository is not on the path
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.replay import Replay
+from render.assets import RotatedSprite
+from render.car import Car, CAR_SPRITE_PATH, DEAD_CAR_SPRITE_PATH
+from render.colors import Color
+from render.sensors import unit_vectors
+
+
+# ------------------ CLASSES ------------------
+
+
+class ReplayViewer:
+    """Play recorded generations back, at any speed and from any tick, without simulating anything
+
+    SPACE pauses, UP and DOWN change the speed, LEFT and RIGHT step one tick (ten with SHIFT), a click on the bar
+    at the bottom jumps to a tick, PAGE UP and PAGE DOWN open the previous and next generations of the directory
+    and S shows or hides the sensors.
+    """
+
+    FPS = 60
+    BAR_HEIGHT = 12
+    MIN_SPEED = 0.125
+    MAX_SPEED = 64
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.files = sorted(glob.glob(os.path.join(os.path.dirname(path) or ".", "*.replay")))
+        self.index = self.files.index(path) if path in self.files else 0
+        if path not in self.files:
+            self.files.insert(0, path)
+        self.speed = speed
+        self.playing = True
+        self.draw_sensors = Car.DRAW_SENSORS
+
+        pygame.init()
+        self.replay = None
+        self.track = None
+        self.screen = None
+        self.clock = pygame.time.Clock()
+        self.open(self.index)
+
+    def open(self, index: int) -> None:
+        """Open a recorded generation of the directory
+
+        Args:
+            index (int): The index of the file
+        """
+        self.index = index % len(self.files)
+        self.replay = Replay(self.files[self.index])
+        track = self.replay.load_track()
+        if self.screen is None or self.screen.get_size() != (track.width, track.height + ReplayViewer.BAR_HEIGHT):
+            self.screen = pygame.display.set_mode((track.width, track.height + ReplayViewer.BAR_HEIGHT))
+        self.track = track
+        self.sprites = RotatedSprite.get(CAR_SPRITE_PATH, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y), Car.ANGLE_INCREMENT)
+        self.dead_sprites = RotatedSprite.get(DEAD_CAR_SPRITE_PATH, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y), Car.ANGLE_INCREMENT)
+        self.sensor_angles = np.array(Car.SENSOR_ANGLES[:self.replay.header["sensors"]])
+        self.position = 0.0
+
+    def handle_events(self) -> bool:
+        last_tick = max(len(self.replay) - 1, 0)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+            if event.type == pygame.KEYDOWN:
+                step = 10 if pygame.key.get_mods() & pygame.KMOD_SHIFT else 1
+                if event.key == pygame.K_SPACE:
+                    self.playing = not self.playing
+                elif event.key == pygame.K_UP:
+                    self.speed = min(self.speed * 2, ReplayViewer.MAX_SPEED)
+                elif event.key == pygame.K_DOWN:
+                    self.speed = max(self.speed / 2, ReplayViewer.MIN_SPEED)
+                elif event.key == pygame.K_RIGHT:
+                    self.position = min(int(self.position) + step, last_tick)
+                elif event.key == pygame.K_LEFT:
+                    self.position = max(int(self.position) - step, 0)
+                elif event.key == pygame.K_PAGEDOWN:
+                    self.open(self.index + 1)
+                elif event.key == pygame.K_PAGEUP:
+                    self.open(self.index - 1)
+                elif event.key == pygame.K_s:
+                    self.draw_sensors = not self.draw_sensors
+
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and event.pos[1] >= self.track.height:
+                self.position = event.pos[0] / self.screen.get_width() * last_tick
+
+        return True
+
+    def draw(self) -> None:
+        self.screen.blit(self.track.get_surface(), (0, 0))
+        tick = min(int(self.position), len(self.replay) - 1)
+
+        if tick >= 0:
+            cars = self.replay.ticks[tick]
+            for x, y, angle, alive in zip(cars["x"].tolist(), cars["y"].tolist(), cars["angle"].tolist(),
+                                          cars["alive"].tolist()):
+                sprites = self.sprites if alive else self.dead_sprites
+                self.screen.blit(sprites.rotated(angle), (x, y))
+
+            # The end points are not recorded, they are found back from the distances. The sensors were cast from
+            # the center of the sprite before the move of the tick, like in CarFleet.update
+            if self.draw_sensors:
+                alive = np.flatnonzero(cars["alive"])
+                if tick:
+                    previous = self.replay.ticks[tick - 1]
+                    origins = np.stack((previous["x"][alive], previous["y"][alive]), axis=1)
+                else:
+                    origins = self.replay.get_start_positions()[alive]
+                centers = np.trunc(origins) + (Car.CAR_SIZE_X / 2, Car.CAR_SIZE_Y / 2)
+                cos, sin = unit_vectors(cars["angle"][alive][:, None] + self.sensor_angles)
+                distances = cars["sensors"][alive]
+                ends = np.stack((centers[:, None, 0] + cos * distances, centers[:, None, 1] + sin * distances), axis=2)
+                for center, points in zip(centers.tolist(), ends.tolist()):
+                    for point in points:
+                        pygame.draw.line(self.screen, Color.GREEN, center, point, 2)
+                        pygame.draw.circle(self.screen, Color.RED, point, 4)
+
+        bar = pygame.Rect(0, self.track.height, self.screen.get_width(), ReplayViewer.BAR_HEIGHT)
+        pygame.draw.rect(self.screen, Color.DARK_BLUE, bar)
+        if len(self.replay) > 1:
+            bar.width = int(bar.width * tick / (len(self.replay) - 1))
+            pygame.draw.rect(self.screen, Color.BLUE_PALE, bar)
+
+        caption = f"Replay - Generation: {self.replay.generation} - Tick: {tick + 1}/{len(self.replay)} - Speed: x{self.speed}"
+        if tick >= 0:
+            caption += (f" - Alive: {int(cars['alive'].sum())} - "
+                        f"Best Fitness: {round(float(cars['fitness'].max()))}")
+        if not self.playing:
+            caption += " - Paused"
+        pygame.display.set_caption(caption)
+        pygame.display.update()
+
+    def run(self) -> None:
+        while self.handle_events():
+            if self.playing:
+                self.position = min(self.position + self.speed, max(len(self.replay) - 1, 0))
+            self.draw()
+            self.clock.tick(ReplayViewer.FPS)
+        pygame.quit()
+
+
+# ------------------ MAIN FUNCTION ------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play back a generation recorded with main.py --record.")
+    parser.add_argument("replay", help="replay file (the other generations of its directory can be opened too)")
+    parser.add_argument("--speed", type=float, default=1.0, help="ticks played per frame")
+    arguments = parser.parse_args()
+
+    ReplayViewer(arguments.replay, arguments.speed).run()
+
+
+# ------------------ MAIN CALL ------------------
+
+
+if __name__ == "__main__":
+    main()
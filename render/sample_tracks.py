@@ -0,0 +1,69 @@
+# ------------------ IMPORTS ------------------
+
+
+import math
+import pygame
+from typing import Tuple
+from render.car import Car
+from render.colors import Color
+from render.track import Track
+from render.track_generator import TrackGenerator
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+TRACK_WIDTH = 1900
+TRACK_HEIGHT = 950
+SEED = 0
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def ring_track() -> Tuple[Track, list]:
+    """An oval ring, wide and long, where most rays travel far"""
+    track = Track(TRACK_WIDTH, TRACK_HEIGHT)
+    pygame.draw.ellipse(track.surface, Color.BLACK, (100, 100, TRACK_WIDTH - 200, TRACK_HEIGHT - 200))
+    pygame.draw.ellipse(track.surface, Color.WHITE, (350, 330, TRACK_WIDTH - 700, TRACK_HEIGHT - 660))
+    track.invalidate()
+    return track, [TRACK_WIDTH / 2 - Car.CAR_SIZE_X / 2, 200 - Car.CAR_SIZE_Y / 2]
+
+
+def s_curve_track() -> Tuple[Track, list]:
+    """A winding road going from the left to the right of the track"""
+    track = Track(TRACK_WIDTH, TRACK_HEIGHT)
+    points = [(x, TRACK_HEIGHT / 2 + 300 * math.sin(x / TRACK_WIDTH * 3 * math.pi)) for x in range(80, TRACK_WIDTH - 79, 10)]
+    for point in points:
+        pygame.draw.circle(track.surface, Color.BLACK, point, 70)
+    track.invalidate()
+    return track, [points[0][0] - Car.CAR_SIZE_X / 2, points[0][1] - Car.CAR_SIZE_Y / 2]
+
+
+def maze_track() -> Tuple[Track, list]:
+    """A serpentine of narrow corridors, where rays are short and cars turn a lot"""
+    track = Track(TRACK_WIDTH, TRACK_HEIGHT)
+    corridor, margin = 110, 60
+    rows = list(range(margin + corridor // 2, TRACK_HEIGHT - margin, 2 * corridor))
+    for i, y in enumerate(rows):
+        pygame.draw.line(track.surface, Color.BLACK, (margin, y), (TRACK_WIDTH - margin, y), corridor)
+        if i + 1 < len(rows):
+            x = TRACK_WIDTH - margin - corridor // 2 if i % 2 == 0 else margin + corridor // 2
+            pygame.draw.line(track.surface, Color.BLACK, (x, y), (x, rows[i + 1]), corridor)
+    track.invalidate()
+    return track, [margin + 20, rows[0] - Car.CAR_SIZE_Y / 2]
+
+
+def generated_track() -> Tuple[Track, list]:
+    """A seeded procedural loop with turns and hairpins (see TrackGenerator)"""
+    track = TrackGenerator(TRACK_WIDTH, TRACK_HEIGHT, curvature=0.3, hairpins=2).generate(SEED)
+    return track, track.start_position
+
+
+# The synthetic tracks of the benchmarks and of the tests, each built with its start position, without a display
+TRACKS = {
+    "ring": ring_track,
+    "s_curve": s_curve_track,
+    "maze": maze_track,
+    "generated": generated_track,
+}
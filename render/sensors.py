@@ -0,0 +1,214 @@
+# ------------------ IMPORTS ------------------
+
+
+import math
+import numpy as np
+from typing import Tuple
+from render.car import Car
+from render.wall_segments import WallSegments
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def unit_vectors(degrees: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the cosine and sine of the screen angle used by the cars for the given angles
+
+    The values are computed with the math module (once per distinct angle) so that they are bit for bit
+    identical to the ones computed by the Car class, which matters since positions are truncated to pixels.
+
+    Args:
+        degrees (np.ndarray): The angles, in degrees, as stored in Car.angle (plus any offset)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The cosines and the sines, with the same shape as degrees
+    """
+    unique, inverse = np.unique(degrees, return_inverse=True)
+    radians = [math.radians(360 - angle) for angle in unique.tolist()]
+    cos = np.array([math.cos(radian) for radian in radians])[inverse]
+    sin = np.array([math.sin(radian) for radian in radians])[inverse]
+    return cos.reshape(np.shape(degrees)), sin.reshape(np.shape(degrees))
+
+
+# ------------------ CLASSES ------------------
+
+
+class RayCaster:
+    """Base class of the batched sensors, subclasses only change how a ray walks until it stops
+
+    Whatever the backend, a ray stops on the first of the steps 0, 1, 2... (one pixel long each, truncated
+    like in Car.check_sensor) that is a wall or outside the track, or on the step after the maximum length.
+    """
+
+    def __init__(self, width: int, height: int, sensor_angles: Tuple[int, ...] = Car.SENSOR_ANGLES,
+                 max_distance: int = Car.SENSORS_DRAW_DISTANCE):
+        self.width = width
+        self.height = height
+        self.sensor_angles = np.array(sensor_angles)
+        self.max_distance = max_distance
+
+        # Number of ray steps tested since the creation of the caster
+        self.steps = 0
+
+    def cast(self, centers: np.ndarray, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cast every sensor of every given car
+
+        Args:
+            centers (np.ndarray): The (n, 2) centers of the cars
+            angles (np.ndarray): The (n,) angles of the cars, in degrees
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The (n, sensors, 2) end points and the (n, sensors) distances
+        """
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        count = len(centers)
+        rays = len(self.sensor_angles)
+
+        cos, sin = unit_vectors((np.asarray(angles)[:, None] + self.sensor_angles[None, :]).ravel())
+        origin_x = np.repeat(centers[:, 0], rays)
+        origin_y = np.repeat(centers[:, 1], rays)
+
+        end_x, end_y = self._march(origin_x, origin_y, cos, sin)
+
+        distances = np.hypot(end_x - origin_x, end_y - origin_y).astype(int)
+        points = np.stack((end_x, end_y), axis=1)
+        return points.reshape(count, rays, 2), distances.reshape(count, rays)
+
+    def _march(self, origin_x: np.ndarray, origin_y: np.ndarray, cos: np.ndarray,
+               sin: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Walk the rays until they all stop
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The x and y pixel where every ray stopped
+        """
+        raise NotImplementedError
+
+
+class GridRayCaster(RayCaster):
+    """Cast the sensors of many cars at once on a boolean wall grid
+
+    It walks the rays exactly like Car.check_sensor (one pixel per step) but a whole block of steps of every
+    unfinished ray is tested with one numpy operation.
+    """
+
+    BLOCK_SIZE = 64
+
+    def __init__(self, collision_grid: np.ndarray, sensor_angles: Tuple[int, ...] = Car.SENSOR_ANGLES,
+                 max_distance: int = Car.SENSORS_DRAW_DISTANCE):
+        super().__init__(*collision_grid.shape, sensor_angles, max_distance)
+        self.collision_grid = collision_grid
+
+    def _march(self, origin_x: np.ndarray, origin_y: np.ndarray, cos: np.ndarray,
+               sin: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Walk the rays block by block until they all hit something
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The x and y pixel where every ray stopped
+        """
+        end_x = np.zeros(len(origin_x), dtype=int)
+        end_y = np.zeros(len(origin_x), dtype=int)
+
+        # The step after the maximum length is where Car.check_sensor gives up, so it always "hits"
+        last_step = self.max_distance + 1
+        active = np.arange(len(origin_x))
+        start = 0
+
+        while len(active) and start <= last_step:
+            steps = np.arange(start, min(start + GridRayCaster.BLOCK_SIZE, last_step + 1))
+            xs = np.trunc(origin_x[active, None] + cos[active, None] * steps).astype(int)
+            ys = np.trunc(origin_y[active, None] + sin[active, None] * steps).astype(int)
+
+            hit = (xs >= self.width) | (ys >= self.height) | (xs <= 0) | (ys <= 0)
+            inside = ~hit
+            hit[inside] = self.collision_grid[xs[inside], ys[inside]]
+            self.steps += xs.size
+            if steps[-1] == last_step:
+                hit[:, -1] = True
+
+            done = hit.any(axis=1)
+            first = hit[done].argmax(axis=1)
+            finished = active[done]
+            end_x[finished] = xs[done, first]
+            end_y[finished] = ys[done, first]
+
+            active = active[~done]
+            start += GridRayCaster.BLOCK_SIZE
+
+        return end_x, end_y
+
+
+class DistanceFieldRayCaster(RayCaster):
+    """Cast the sensors of many cars at once by sphere tracing a precomputed distance field
+
+    A ray standing on a cell at distance d from the nearest wall cannot meet a wall within its next d - 1
+    steps, so it jumps over them instead of testing them one by one. The steps it lands on are the same
+    integer steps as Car.check_sensor, so the result is identical, only a lot fewer of them are tested.
+    """
+
+    def __init__(self, distance_field: np.ndarray, sensor_angles: Tuple[int, ...] = Car.SENSOR_ANGLES,
+                 max_distance: int = Car.SENSORS_DRAW_DISTANCE):
+        width, height = distance_field.shape
+        super().__init__(width - 1, height - 1, sensor_angles, max_distance)
+        self.distance_field = distance_field
+
+    def _march(self, origin_x: np.ndarray, origin_y: np.ndarray, cos: np.ndarray,
+               sin: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Jump the rays from safe step to safe step until they all hit something
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The x and y pixel where every ray stopped
+        """
+        end_x = np.zeros(len(origin_x), dtype=int)
+        end_y = np.zeros(len(origin_x), dtype=int)
+
+        last_step = self.max_distance + 1
+        active = np.arange(len(origin_x))
+        steps = np.zeros(len(origin_x), dtype=int)
+
+        while len(active):
+            xs = np.trunc(origin_x[active] + cos[active] * steps).astype(int)
+            ys = np.trunc(origin_y[active] + sin[active] * steps).astype(int)
+
+            distances = np.zeros(len(active), dtype=int)
+            inside = (xs < self.width) & (ys < self.height) & (xs > 0) & (ys > 0)
+            distances[inside] = self.distance_field[xs[inside], ys[inside]]
+            self.steps += len(active)
+
+            done = (distances == 0) | (steps == last_step)
+            end_x[active[done]] = xs[done]
+            end_y[active[done]] = ys[done]
+
+            # One step of the jump is kept as a margin for the rounding of the truncated positions
+            keep = ~done
+            active = active[keep]
+            steps = np.minimum(steps[keep] + np.maximum(distances[keep] - 1, 1), last_step)
+
+        return end_x, end_y
+
+
+class SegmentRayCaster(RayCaster):
+    """Cast the sensors of many cars at once on the boundaries of the walls, see WallSegments
+
+    The rays are intersected analytically with the contours of the walls instead of walking pixels, starting
+    from the center of the pixel of their origin. The distances agree with the other casters to a pixel or two,
+    only the rays grazing a wall may go quite further or stop quite sooner. The steps counted are the cells of
+    the segments' index visited by the rays.
+    """
+
+    def __init__(self, wall_segments: WallSegments, sensor_angles: Tuple[int, ...] = Car.SENSOR_ANGLES,
+                 max_distance: int = Car.SENSORS_DRAW_DISTANCE):
+        super().__init__(wall_segments.width, wall_segments.height, sensor_angles, max_distance)
+        self.wall_segments = wall_segments
+
+    def _march(self, origin_x: np.ndarray, origin_y: np.ndarray, cos: np.ndarray,
+               sin: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Intersect the rays with the walls' boundaries
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The x and y point where every ray stopped
+        """
+        visits = self.wall_segments.visits
+        origins = np.stack((origin_x, origin_y), axis=1) + 0.5
+        distances = self.wall_segments.cast(origins, np.stack((cos, sin), axis=1), self.max_distance + 1)
+        self.steps += self.wall_segments.visits - visits
+        return origin_x + cos * distances, origin_y + sin * distances
@@ -0,0 +1,137 @@
+# ------------------ IMPORTS ------------------
+
+
+import pygame
+import threading
+import numpy as np
+from typing import List
+from ai.car_ai import CarAI
+from render.car_fleet import CarFleet
+
+
+# ------------------ CLASSES ------------------
+
+
+class Snapshot:
+    """What the window draws of a generation after a tick, copied out of the simulation so that it never changes
+
+    It can be drawn by RenderPolicy in place of the fleet, while the simulation goes on with the next ticks.
+    """
+
+    def __init__(self, car_ai: CarAI, tick: int):
+        fleet = car_ai.fleet
+        self.tick = tick
+        self.size = fleet.size
+        self.position = fleet.position.copy()
+        self.angle = fleet.angle.copy()
+        self.alive = fleet.alive.copy()
+        self.center = fleet.center.copy()
+        self.sensor_points = fleet.sensor_points.copy()
+        self.has_sensors = fleet.has_sensors.copy()
+        self.fitness = car_ai.fitness.copy()
+        for array in (self.position, self.angle, self.alive, self.center, self.sensor_points, self.has_sensors,
+                      self.fitness):
+            array.flags.writeable = False
+
+        self.remaining_cars = car_ai.remaining_cars
+        self.best_fitness = car_ai.best_fitness
+        self.best_car = car_ai.best_car
+        self.best_input = car_ai.best_input
+        self.best_output = car_ai.best_output
+
+    def draw(self, screen: pygame.Surface, cars: np.ndarray = None) -> List[pygame.Rect]:
+        """Draw cars of the snapshot on the screen, see CarFleet.draw
+
+        Args:
+            screen (pygame.Surface): The surface on which the cars will be drawn
+            cars (np.ndarray): The indices of the cars to draw, every car if None
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen which were drawn on
+        """
+        if cars is None:
+            cars = np.arange(self.size)
+        return CarFleet.draw_cars(screen, self.position[cars], self.angle[cars], self.alive[cars], self.center[cars],
+                                  self.sensor_points[cars], self.has_sensors[cars])
+
+
+class SnapshotBuffer:
+    """Hand the snapshots of the simulation thread over to the window, double-buffered
+
+    The front snapshot is the one the window draws, the back one is the next it will draw. The simulation only
+    copies a new snapshot when the back one was taken, so a snapshot is made per frame rather than per tick and
+    the window is at most a frame behind.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.front = None
+        self.back = None
+
+    def wanted(self) -> bool:
+        """Tell whether the window took the last published snapshot
+
+        Returns:
+            bool: True if a new snapshot should be published
+        """
+        return self.back is None
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """Make a snapshot the next one to be drawn
+
+        Args:
+            snapshot (Snapshot): The snapshot, which must not be modified anymore
+        """
+        with self.lock:
+            self.back = snapshot
+
+    def take(self) -> Snapshot:
+        """Get the latest snapshot, swapping the buffers if a new one was published
+
+        Returns:
+            Snapshot: The snapshot to draw, None if nothing was published yet
+        """
+        with self.lock:
+            if self.back is not None:
+                self.front, self.back = self.back, None
+            return self.front
+
+
+class SimulationThread(threading.Thread):
+    """Simulate a generation on its own thread, as fast as possible, publishing snapshots for the window
+
+    The window keeps pygame on the main thread and draws the latest snapshot at its own frame rate, so a slow
+    display never holds the simulation back. The generation is limited by a number of ticks, like a headless one.
+    """
+
+    def __init__(self, car_ai: CarAI, buffer: SnapshotBuffer, step_limit: int = CarAI.STEP_LIMIT):
+        super().__init__(name="simulation", daemon=True)
+        self.car_ai = car_ai
+        self.buffer = buffer
+        self.step_limit = step_limit
+        self.ticks = 0
+        self.stopping = threading.Event()
+        self.error = None
+
+    def run(self) -> None:
+        try:
+            while self.ticks < self.step_limit and not self.stopping.is_set():
+                self.car_ai.compute()
+                self.ticks += 1
+                if self.buffer.wanted():
+                    self.buffer.publish(Snapshot(self.car_ai, self.ticks))
+                if self.car_ai.is_over():
+                    break
+        except Exception as error:
+            # Raised again by the window's thread, see join
+            self.error = error
+
+    def stop(self) -> None:
+        """Ask the simulation to stop after its current tick"""
+        self.stopping.set()
+
+    def join(self, timeout: float = None) -> None:
+        """Wait for the simulation to end, raising the error which ended it if any"""
+        super().join(timeout)
+        if not self.is_alive() and self.error is not None:
+            raise self.error
@@ -1,11 +1,37 @@
+import os
+import math
+import json
+import hashlib
 import pygame
+import numpy as np
 from typing import Tuple
 from render.colors import Color
+from render.wall_segments import WallSegments
 
 
 class Track:
     
     BRUSH_LIMIT_SIZE = 25
+    WALL_COLOR = Color.WHITE
+
+    # Files of a saved track, which is a directory
+    FORMAT_VERSION = 1
+    METADATA_FILE = "track.json"
+    IMAGE_FILE = "image.png"
+    COLLISION_GRID_FILE = "collision_grid.npy"
+    DISTANCE_FIELD_FILE = "distance_field.npy"
+
+    # Side, in pixels, of the square cells of the progress field
+    PROGRESS_CELL_SIZE = 10
+
+    # Cells of a lap which the search of the progress field never walks: the ones from the cells right behind the
+    # barrier, across it, to the start (the barrier being two cells behind the start and thickened by one cell)
+    BARRIER_CELLS = 3
+
+    # Cells a lap must be longer than: a search reaching the back of the barrier sooner only went around its end
+    # (a track which is not a loop, or a pocket of road next to the start), so such a short "lap" counts as no lap
+    # at all and its length is 0
+    MIN_LAP_CELLS = 10
     
     def __init__(self, width: int, height: int):
         self.width = width
@@ -14,29 +40,379 @@ class Track:
         self.surface.fill(Color.WHITE)
         self.brush_size = 50
         self.last_position = None
+        self._collision_grid = None
+        self._distance_field = None
+        self._wall_segments = None
+        self._progress_fields = {}
+
+        # Where the cars start (top left corner of their sprite) and where the track was saved, if known
+        self.start_position = None
+        self.start_angle = 0
+        self.path = None
+
+    @classmethod
+    def from_image(cls, path: str) -> "Track":
+        """Create a track from an image file (white pixels being the walls), no display is needed
+
+        Args:
+            path (str): The path of the image
+
+        Returns:
+            Track: The track
+        """
+        image = pygame.image.load(path)
+        track = cls(image.get_width(), image.get_height())
+        track.surface.blit(image, (0, 0))
+        return track
+
+    @classmethod
+    def from_arrays(cls, collision_grid: np.ndarray, distance_field: np.ndarray = None) -> "Track":
+        """Create a track from an existing wall grid (and distance field), which are used as is, without copy
+
+        Args:
+            collision_grid (np.ndarray): The (width, height) wall grid, see get_collision_grid
+            distance_field (np.ndarray): The matching distance field, see get_distance_field (computed on demand if None)
+
+        Returns:
+            Track: The track
+        """
+        track = cls(*collision_grid.shape)
+        pygame.surfarray.blit_array(track.surface, collision_grid[..., None] * np.array(Track.WALL_COLOR, dtype=np.uint8))
+        track._collision_grid = collision_grid
+        track._distance_field = distance_field
+        return track
+
+    def save(self, path: str, start_position: list = None, start_angle: int = None) -> None:
+        """Save the track in a directory holding its image, its start pose and its precomputed arrays
+
+        The wall grid and the distance field are stored as raw .npy arrays so that they can be memory-mapped
+        when the track is loaded, without decoding the image nor computing anything.
+
+        Args:
+            path (str): The directory to save the track in (created if needed)
+            start_position (list): The start position of the cars, the track's one if None
+            start_angle (int): The start angle of the cars, the track's one if None
+        """
+        if start_position is not None:
+            self.start_position = [float(start_position[0]), float(start_position[1])]
+        if start_angle is not None:
+            self.start_angle = int(start_angle)
+
+        os.makedirs(path, exist_ok=True)
+        pygame.image.save(self.surface, os.path.join(path, Track.IMAGE_FILE))
+        np.save(os.path.join(path, Track.COLLISION_GRID_FILE), self.get_collision_grid())
+        np.save(os.path.join(path, Track.DISTANCE_FIELD_FILE), self.get_distance_field().astype(np.uint16))
+
+        metadata = {
+            "version": Track.FORMAT_VERSION,
+            "width": self.width,
+            "height": self.height,
+            "start_position": self.start_position,
+            "start_angle": self.start_angle,
+        }
+        with open(os.path.join(path, Track.METADATA_FILE), "w") as file:
+            json.dump(metadata, file, indent=4)
+
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str, load_image: bool = True) -> "Track":
+        """Load a track saved by Track.save, its arrays being memory-mapped (read-only)
+
+        Args:
+            path (str): The directory of the track
+            load_image (bool): Whether to decode the saved image, otherwise the surface is rebuilt from the wall grid
+
+        Returns:
+            Track: The track, with its start pose
+        """
+        with open(os.path.join(path, Track.METADATA_FILE)) as file:
+            metadata = json.load(file)
+        if metadata["version"] != Track.FORMAT_VERSION:
+            raise ValueError(f"Unsupported track format version {metadata['version']} in {path}")
+
+        collision_grid = np.load(os.path.join(path, Track.COLLISION_GRID_FILE), mmap_mode="r")
+        distance_field = np.load(os.path.join(path, Track.DISTANCE_FIELD_FILE), mmap_mode="r")
+
+        if load_image:
+            track = cls.from_image(os.path.join(path, Track.IMAGE_FILE))
+            track._collision_grid = collision_grid
+            track._distance_field = distance_field
+        else:
+            track = cls.from_arrays(collision_grid, distance_field)
+
+        track.start_position = metadata["start_position"]
+        track.start_angle = metadata["start_angle"]
+        track.path = path
+        return track
 
     def draw(self, position: Tuple[int, int], color: Tuple[int, int, int]):
         if self.last_position:
             self.draw_interpolated(self.last_position, position, color)
         else:
-            pygame.draw.circle(self.surface, color, position, self.brush_size)
+            self.invalidate(pygame.draw.circle(self.surface, color, position, self.brush_size))
         self.last_position = position
         
     def adjust_brush_size(self, amount: int):
         self.brush_size = max(Track.BRUSH_LIMIT_SIZE, self.brush_size + amount)
 
-    def draw_interpolated(self, start: Tuple[int, int], end: Tuple[int, int], color: Tuple[int, int, int]):
+    def draw_interpolated(self, start: Tuple[int, int], end: Tuple[int, int], color: Tuple[int, int, int]) -> pygame.Rect:
+        """Draw a stroke of the brush as a single capsule: a rectangle as wide as the brush between two discs
+
+        Args:
+            start (Tuple[int, int]): Where the stroke starts
+            end (Tuple[int, int]): Where the stroke ends
+            color (Tuple[int, int, int]): The color of the stroke
+
+        Returns:
+            pygame.Rect: The area of the track which was drawn on
+        """
+        rect = pygame.draw.circle(self.surface, color, start, self.brush_size)
+        rect.union_ip(pygame.draw.circle(self.surface, color, end, self.brush_size))
+
         dx = end[0] - start[0]
         dy = end[1] - start[1]
-        distance = max(abs(dx), abs(dy))
-        
-        for i in range(distance):
-            x = int(start[0] + float(i) / distance * dx)
-            y = int(start[1] + float(i) / distance * dy)
-            pygame.draw.circle(self.surface, color, (x, y), self.brush_size)
+        length = math.hypot(dx, dy)
+        if length:
+            nx, ny = -dy / length * self.brush_size, dx / length * self.brush_size
+            corners = [(start[0] + nx, start[1] + ny), (end[0] + nx, end[1] + ny),
+                       (end[0] - nx, end[1] - ny), (start[0] - nx, start[1] - ny)]
+            rect.union_ip(pygame.draw.polygon(self.surface, color, corners))
+
+        self.invalidate(rect)
+        return rect
 
     def reset_last_position(self):
         self.last_position = None
 
+    def invalidate(self, rect: pygame.Rect = None):
+        """Update the arrays derived from the surface after it was drawn on, and forget the now outdated saved copy
+
+        Args:
+            rect (pygame.Rect): The area which was drawn on, the arrays already computed are only updated there
+                (see update_distance_field). If None, they are all dropped and rebuilt on their next access.
+        """
+        self._wall_segments = None
+        self._progress_fields = {}
+        self.path = None
+
+        if rect is None or self._collision_grid is None:
+            self._collision_grid = None
+            self._distance_field = None
+            return
+
+        rect = rect.clip(self.surface.get_rect())
+        if not rect.width or not rect.height:
+            return
+
+        # The arrays of a loaded track are read-only memory maps, they are copied on the first change
+        grid = self._collision_grid if self._collision_grid.flags.writeable else np.array(self._collision_grid)
+        pixels = pygame.surfarray.array3d(self.surface.subsurface(rect))
+        grid[rect.left:rect.right, rect.top:rect.bottom] = np.all(pixels == Track.WALL_COLOR, axis=2)
+        self._collision_grid = grid
+
+        if self._distance_field is not None:
+            self.update_distance_field(rect)
+
+    def update_distance_field(self, rect: pygame.Rect):
+        """Recompute the distance field only where walls changed in the given area may change it
+
+        A cell at distance d from the nearest wall keeps it as long as nothing changed within d of it: the
+        walls which appeared in the area are further, and the nearest wall is outside of the area so it is still
+        there. Only the cells at least as far from their nearest wall as from the area are searched again.
+
+        Args:
+            rect (pygame.Rect): The area whose walls changed
+        """
+        field = np.array(self._distance_field, dtype=np.int32)
+        xs = np.arange(field.shape[0], dtype=np.int32)
+        ys = np.arange(field.shape[1], dtype=np.int32)
+        dx = np.maximum(np.maximum(rect.left - xs, xs - (rect.right - 1)), 0)
+        dy = np.maximum(np.maximum(rect.top - ys, ys - (rect.bottom - 1)), 0)
+        affected = field >= np.maximum(dx[:, None], dy[None, :])
+
+        walls = np.ones(field.shape, dtype=bool)
+        walls[1:self.width, 1:self.height] = self.get_collision_grid()[1:, 1:]
+        field[affected] = Track.chebyshev_distance_field(walls, affected)[affected]
+        self._distance_field = field
+
+    def get_collision_grid(self) -> np.ndarray:
+        """Get a boolean grid, indexed as [x, y] like the surface, telling which pixels are walls
+
+        Returns:
+            np.ndarray: The (width, height) wall grid
+        """
+        if self._collision_grid is None:
+            pixels = pygame.surfarray.array3d(self.surface)
+            self._collision_grid = np.all(pixels == Track.WALL_COLOR, axis=2)
+        return self._collision_grid
+
+    def get_distance_field(self) -> np.ndarray:
+        """Get, for each pixel, the chessboard (Chebyshev) distance to the nearest wall
+
+        The first row and column count as walls, like for the sensors, and so does the row and column just past
+        the track, which is why the field is one pixel larger than the track on both axes. The chessboard
+        distance never exceeds the euclidean one, so anything closer than the stored value is free space.
+
+        Returns:
+            np.ndarray: The (width + 1, height + 1) distance field
+        """
+        if self._distance_field is None:
+            walls = np.ones((self.width + 1, self.height + 1), dtype=bool)
+            walls[1:self.width, 1:self.height] = self.get_collision_grid()[1:, 1:]
+            self._distance_field = Track.chebyshev_distance_field(walls)
+        return self._distance_field
+
+    def get_content_hash(self) -> str:
+        """Hash the content of the track, which tells apart tracks whatever their path (or lack of one)
+
+        Returns:
+            str: The hexadecimal hash of its wall grid
+        """
+        grid = self.get_collision_grid()
+        content = hashlib.blake2b(repr(grid.shape).encode(), digest_size=16)
+        content.update(grid.tobytes())
+        return content.hexdigest()
+
+    def get_wall_segments(self) -> WallSegments:
+        """Get the boundaries of the walls as indexed line segments, for the vector sensors and collisions
+
+        Returns:
+            WallSegments: The segments, extracted from the wall grid
+        """
+        if self._wall_segments is None:
+            self._wall_segments = WallSegments.from_grid(self.get_collision_grid())
+        return self._wall_segments
+
+    @staticmethod
+    def chebyshev_distance_field(walls: np.ndarray, cells: np.ndarray = None) -> np.ndarray:
+        """Compute the chessboard distance from each cell to the nearest wall cell
+
+        Each cell binary searches the smallest square around it that contains a wall, the walls of a square
+        being counted in constant time with a summed-area table, so the whole field is built in a dozen
+        vectorized passes.
+
+        Args:
+            walls (np.ndarray): A boolean grid with at least one wall
+            cells (np.ndarray): A boolean grid of the cells to compute, every cell if None (the others are 0)
+
+        Returns:
+            np.ndarray: The distance field, with the shape of walls
+        """
+        width, height = walls.shape
+        table = np.zeros((width + 1, height + 1), dtype=np.int32)
+        table[1:, 1:] = walls.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+
+        if cells is None:
+            xs, ys = (indices.ravel() for indices in np.indices(walls.shape, dtype=np.int32))
+        else:
+            xs, ys = (indices.astype(np.int32) for indices in np.nonzero(cells))
+        low = np.zeros(len(xs), dtype=np.int32)
+        high = np.full(len(xs), max(width, height), dtype=np.int32)
+
+        while True:
+            searching = low < high
+            if not searching.any():
+                break
+            x, y = xs[searching], ys[searching]
+            radius = (low[searching] + high[searching]) // 2
+            x0, x1 = np.maximum(x - radius, 0), np.minimum(x + radius + 1, width)
+            y0, y1 = np.maximum(y - radius, 0), np.minimum(y + radius + 1, height)
+            found = table[x1, y1] - table[x0, y1] - table[x1, y0] + table[x0, y0] > 0
+            high[searching] = np.where(found, radius, high[searching])
+            low[searching] = np.where(found, low[searching], radius + 1)
+
+        distances = np.zeros(walls.shape, dtype=np.int32)
+        distances[xs, ys] = low
+        return distances
+
+    def get_progress_field(self, start_center: Tuple[float, float], start_angle: int) -> Tuple[np.ndarray, int]:
+        """Get, for each cell of PROGRESS_CELL_SIZE pixels, how far it is along the track from a start pose
+
+        The distance is the length of the shortest path through the cells without any wall, starting from the
+        cell of the start center in the direction of the start angle: a barrier is put across the track just
+        behind the start, so a closed track is walked around all the way to the back of the start line. The
+        field is computed once per start pose.
+
+        Args:
+            start_center (Tuple[float, float]): The center of the cars at the start
+            start_angle (int): The angle of the cars at the start, in degrees
+
+        Returns:
+            Tuple[np.ndarray, int]: The (columns, rows) distances in pixels (-1 for the walls and the cells which
+                cannot be reached), and the length of a lap in pixels (0 if the track is not a loop)
+        """
+        key = (float(start_center[0]), float(start_center[1]), int(start_angle))
+        if key not in self._progress_fields:
+            self._progress_fields[key] = self.compute_progress_field(start_center, start_angle)
+        return self._progress_fields[key]
+
+    def compute_progress_field(self, start_center: Tuple[float, float], start_angle: int) -> Tuple[np.ndarray, int]:
+        """Compute the progress field of a start pose, see get_progress_field"""
+        size = Track.PROGRESS_CELL_SIZE
+        columns, rows = -(-self.width // size), -(-self.height // size)
+
+        # A cell with a single wall pixel is a wall, like the pixels past the track
+        walls = np.ones((columns * size, rows * size), dtype=bool)
+        walls[:self.width, :self.height] = self.get_collision_grid()
+        walls = walls.reshape(columns, size, rows, size).any(axis=(1, 3))
+
+        start = (min(max(int(start_center[0] // size), 0), columns - 1),
+                 min(max(int(start_center[1] // size), 0), rows - 1))
+        radian = math.radians(360 - start_angle)
+        forward = (math.cos(radian), math.sin(radian))
+
+        # The barrier goes across the track two cells behind the start, until it meets the walls on each side
+        barrier = np.zeros((columns, rows), dtype=bool)
+        behind = (start[0] + 0.5 - 2 * forward[0], start[1] + 0.5 - 2 * forward[1])
+        for side in (-1, 1):
+            for step in range(2 * (columns + rows)):
+                x = int(behind[0] - side * forward[1] * step / 2)
+                y = int(behind[1] + side * forward[0] * step / 2)
+                if not (0 <= x < columns and 0 <= y < rows) or walls[x, y]:
+                    break
+                barrier[x, y] = True
+
+        # Thickened so that diagonal moves cannot slip through it
+        barrier = Track._grow(barrier, diagonals=True)
+        barrier[start] = False
+        free = ~walls & ~barrier
+        free[start] = True
+
+        # Breadth-first search, one wavefront per iteration, with diagonal moves one iteration out of two (the
+        # resulting octagonal distance is much closer to the euclidean one than with straight or diagonal moves only)
+        progress = np.full((columns, rows), -1, dtype=np.int32)
+        progress[start] = 0
+        frontier = np.zeros((columns, rows), dtype=bool)
+        frontier[start] = True
+        visited = frontier.copy()
+        distance = 0
+        while frontier.any():
+            distance += 1
+            frontier = Track._grow(frontier, diagonals=distance % 2 == 0) & free & ~visited
+            visited |= frontier
+            progress[frontier] = distance
+
+        # The cells right behind the barrier are the last ones of a lap, they are only reached on a closed track
+        behind_barrier = Track._grow(barrier, diagonals=True) & visited
+        lap = int(progress[behind_barrier].max(initial=0))
+        lap_length = (lap + Track.BARRIER_CELLS) * size if lap > Track.MIN_LAP_CELLS else 0
+
+        return np.where(progress >= 0, progress * size, -1), lap_length
+
+    @staticmethod
+    def _grow(cells: np.ndarray, diagonals: bool) -> np.ndarray:
+        """Add to a boolean grid the neighbours of its cells (the 4 closest ones, or the 8 ones with the diagonals)"""
+        grown = cells.copy()
+        grown[1:] |= cells[:-1]
+        grown[:-1] |= cells[1:]
+        if diagonals:
+            grown[:, 1:] |= grown[:, :-1].copy()
+            grown[:, :-1] |= grown[:, 1:].copy()
+        else:
+            grown[:, 1:] |= cells[:, :-1]
+            grown[:, :-1] |= cells[:, 1:]
+        return grown
+
     def get_surface(self) -> pygame.Surface:
-        return self.surface
\ No newline at end of file
+        return self.surface
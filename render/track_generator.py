@@ -0,0 +1,107 @@
+# ------------------ IMPORTS ------------------
+
+
+import math
+import pygame
+import numpy as np
+from render.car import Car
+from render.colors import Color
+from render.track import Track
+
+
+# ------------------ CLASSES ------------------
+
+
+class TrackGenerator:
+    """Build closed tracks from a seed, without any display
+
+    The center line of a track is a closed curve around the middle of the track, its distance to the middle
+    varying with the angle: a few random harmonics give it its turns and narrow dents give it its hairpins.
+    The road is then drawn along the center line, everything else being walls. The same parameters and seed
+    always give the same track.
+    """
+
+    # Enough points for the circles drawn along the center line to make a smooth road
+    POINTS = 720
+
+    def __init__(self, width: int = 1900, height: int = 950, track_width: int = 140, curvature: float = 0.25,
+                 hairpins: int = 0, length: float = 0.9):
+        """
+        Args:
+            width (int): The width of the tracks, in pixels
+            height (int): The height of the tracks, in pixels
+            track_width (int): The width of the road, in pixels (the cars are 60 pixels wide)
+            curvature (float): How much the road winds, from 0 (an ellipse) to about 0.5
+            hairpins (int): The number of hairpins (tight U-turns) of each track
+            length (float): The share of the width and height of the track that the loop spans, from 0 to 1
+        """
+        self.width = width
+        self.height = height
+        self.track_width = track_width
+        self.curvature = curvature
+        self.hairpins = hairpins
+        self.length = length
+
+    def get_center_line(self, seed: int) -> np.ndarray:
+        """Get the center line of the track of a seed
+
+        Args:
+            seed (int): The seed of the track
+
+        Returns:
+            np.ndarray: The (POINTS, 2) points of the closed center line, in the driving direction
+        """
+        rng = np.random.default_rng(seed)
+        theta = np.linspace(0, 2 * math.pi, TrackGenerator.POINTS, endpoint=False)
+
+        # Random harmonics, the higher ones being weaker so that the turns stay drivable
+        radius = np.ones_like(theta)
+        for harmonic in range(2, 6):
+            amplitude = self.curvature * rng.uniform(0, 1) / (harmonic - 1)
+            radius += amplitude * np.sin(harmonic * theta + rng.uniform(0, 2 * math.pi))
+
+        margin = self.track_width / 2 + 5
+        radius_x = (self.width / 2 - margin) * self.length
+        radius_y = (self.height / 2 - margin) * self.length
+        radius /= radius.max()
+
+        # A hairpin is a deep dent towards the middle with a flat bottom: the road goes in, makes a U-turn and
+        # comes back out alongside itself, the two sides of the dent being apart by a bit more than the road
+        for _ in range(self.hairpins):
+            center = rng.uniform(0.5, 2 * math.pi - 0.5)
+            depth = rng.uniform(0.35, 0.5)
+            scale = math.hypot(radius_x * math.cos(center), radius_y * math.sin(center))
+            bottom = np.interp(center, theta, radius, period=2 * math.pi) * (1 - depth) * scale
+            spread = math.asin(min(1.0, 1.2 * self.track_width / bottom))
+            distance = np.angle(np.exp(1j * (theta - center)))
+            radius *= 1 - depth * np.exp(-(distance / spread) ** 4)
+
+        # The opposite sides of the loop must never touch
+        radius = np.maximum(radius, 1.2 * self.track_width / min(radius_x, radius_y))
+
+        # The loop is then stretched to span the requested share of the track
+        points = np.stack((radius * np.cos(theta), radius * np.sin(theta)), axis=1)
+        points -= (points.max(axis=0) + points.min(axis=0)) / 2
+        points *= (radius_x, radius_y) / np.abs(points).max(axis=0)
+        return points + (self.width / 2, self.height / 2)
+
+    def generate(self, seed: int) -> Track:
+        """Build the track of a seed
+
+        Args:
+            seed (int): The seed of the track
+
+        Returns:
+            Track: The track, with its start pose (at the first point of the center line, facing the road)
+        """
+        points = self.get_center_line(seed)
+
+        track = Track(self.width, self.height)
+        for point in points.round().astype(int).tolist():
+            pygame.draw.circle(track.surface, Color.BLACK, point, self.track_width // 2)
+        track.invalidate()
+
+        dx, dy = points[1] - points[0]
+        track.start_position = [float(points[0][0] - Car.CAR_SIZE_X / 2), float(points[0][1] - Car.CAR_SIZE_Y / 2)]
+        track.start_angle = round(-math.degrees(math.atan2(dy, dx))) % 360
+        return track
@@ -0,0 +1,338 @@
+# ------------------ IMPORTS ------------------
+
+
+import numpy as np
+from typing import List, Tuple
+
+
+# ------------------ CLASSES ------------------
+
+
+class WallSegments:
+    """The boundaries of the walls of a track as line segments, indexed in a uniform grid of cells
+
+    The contours are extracted once from the wall grid with marching squares (the boundary between a wall pixel
+    and a road pixel is on the edge between them), chained into closed polylines and simplified, the outside
+    of the track counting as a wall. Rays and car edges are then intersected analytically with the few segments
+    of the cells they cross, so the queries neither depend on the size of a pixel nor need the wall grid.
+    """
+
+    # Side, in pixels, of the square cells of the index
+    CELL_SIZE = 32
+
+    # Maximum distance, in pixels, between a contour and its simplified polyline (the staircase of the pixels)
+    TOLERANCE = 0.75
+
+    # Edges (top, right, bottom, left) of a square of marching squares joined by its contour, by case (the walls
+    # of corners 1, 2, 4, 8 being top left, top right, bottom right, bottom left), ordered so that the wall is on
+    # the left of the segment on the screen, the diagonal cases 5 and 10 keeping the walls apart
+    EDGE_MIDPOINTS = np.array([(0.0, -0.5), (0.5, 0.0), (0.0, 0.5), (-0.5, 0.0)])
+    CASE_EDGES = (
+        (), ((3, 0),), ((0, 1),), ((3, 1),), ((1, 2),), ((3, 0), (1, 2)), ((0, 2),), ((3, 2),),
+        ((2, 3),), ((2, 0),), ((0, 1), (2, 3)), ((2, 1),), ((1, 3),), ((1, 0),), ((0, 3),), (),
+    )
+
+    # Direction of the rays cast to find whether points are in a wall, at an angle (1 radian) meeting no vertex of
+    # the half-pixel lattice head on
+    PROBE_DIRECTION = np.array([np.cos(1.0), np.sin(1.0)])
+
+    def __init__(self, segments: np.ndarray, width: int, height: int):
+        """
+        Args:
+            segments (np.ndarray): The (n, 4) segments (x0, y0, x1, y1) of the walls' boundaries
+            width (int): The width of the track
+            height (int): The height of the track
+        """
+        self.segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        self.width = width
+        self.height = height
+
+        size = WallSegments.CELL_SIZE
+        self.columns = width // size + 2
+        self.rows = height // size + 2
+        self.cell_starts, self.cell_segments = self._index()
+
+        # Number of cells visited by the rays since the creation of the segments
+        self.visits = 0
+
+    @classmethod
+    def from_grid(cls, collision_grid: np.ndarray) -> "WallSegments":
+        """Extract the boundaries of the walls of a wall grid
+
+        Args:
+            collision_grid (np.ndarray): The (width, height) wall grid, see Track.get_collision_grid
+
+        Returns:
+            WallSegments: The indexed segments
+        """
+        segments = [np.concatenate((polyline[:-1], polyline[1:]), axis=1)
+                    for polyline in WallSegments.get_polylines(collision_grid)]
+        return cls(np.concatenate(segments) if segments else np.zeros((0, 4)), *collision_grid.shape)
+
+    @staticmethod
+    def get_polylines(collision_grid: np.ndarray) -> List[np.ndarray]:
+        """Extract the simplified contours of the walls of a wall grid
+
+        Args:
+            collision_grid (np.ndarray): The (width, height) wall grid
+
+        Returns:
+            List[np.ndarray]: The (points, 2) closed polylines, their last point being their first one, with the
+            walls on their left
+        """
+        width, height = collision_grid.shape
+        padded = np.ones((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = collision_grid
+
+        # The square (i, j) has the centers of the pixels i - 1 and i, j - 1 and j for corners
+        padded = padded.view(np.uint8)
+        cases = padded[:-1, :-1] | padded[1:, :-1] << 1 | padded[1:, 1:] << 2 | padded[:-1, 1:] << 3
+        ends = []
+        for case, edges in enumerate(WallSegments.CASE_EDGES):
+            if not edges:
+                continue
+            xs, ys = np.nonzero(cases == case)
+            squares = np.stack((xs, ys), axis=1).astype(float)
+            for first, second in edges:
+                ends.append(np.stack((squares + WallSegments.EDGE_MIDPOINTS[first],
+                                      squares + WallSegments.EDGE_MIDPOINTS[second]), axis=1))
+        if not ends:
+            return []
+        ends = np.concatenate(ends)
+
+        # Every end is shared by exactly two segments, the ones of the squares on both sides of its edge, which it
+        # ends and starts: once sorted, the two occurrences of an end (exact, on the half-pixel lattice) are next to
+        # each other
+        keys = np.round(ends.reshape(-1, 2) * 2).astype(np.int64)
+        keys = keys[:, 0] * (2 * height + 8) + keys[:, 1]
+        order = np.argsort(keys, kind="stable")
+        partner = np.empty(len(keys), dtype=np.int64)
+        partner[order[0::2]] = order[1::2]
+        partner[order[1::2]] = order[0::2]
+        partner = partner.tolist()
+
+        points = ends.reshape(-1, 2)
+        visited = [False] * len(ends)
+        polylines = []
+        for segment in range(len(ends)):
+            if visited[segment]:
+                continue
+            chain = []
+            end = 2 * segment
+            while not visited[end // 2]:
+                visited[end // 2] = True
+                chain.append(end)
+                end = partner[end ^ 1]
+            chain.append(chain[0])
+            polylines.append(WallSegments.simplify(points[chain]))
+
+        return polylines
+
+    @staticmethod
+    def simplify(polyline: np.ndarray) -> np.ndarray:
+        """Drop the points of a closed polyline which are within TOLERANCE of the line between the points kept
+        around them (Douglas-Peucker)
+
+        Args:
+            polyline (np.ndarray): The (points, 2) closed polyline
+
+        Returns:
+            np.ndarray: The simplified polyline, still closed
+        """
+        # A closed polyline is split at its point farthest from the first one
+        farthest = int(np.argmax(np.hypot(*(polyline - polyline[0]).T)))
+        keep = np.zeros(len(polyline), dtype=bool)
+        keep[[0, farthest, -1]] = True
+
+        spans = [(0, farthest), (farthest, len(polyline) - 1)]
+        while spans:
+            first, last = spans.pop()
+            if last - first < 2:
+                continue
+            start, direction = polyline[first], polyline[last] - polyline[first]
+            offsets = polyline[first + 1:last] - start
+            length = np.hypot(*direction)
+            if length:
+                distances = np.abs(offsets[:, 0] * direction[1] - offsets[:, 1] * direction[0]) / length
+            else:
+                distances = np.hypot(*offsets.T)
+            worst = int(np.argmax(distances))
+            if distances[worst] > WallSegments.TOLERANCE:
+                middle = first + 1 + worst
+                keep[middle] = True
+                spans += [(first, middle), (middle, last)]
+
+        return polyline[keep]
+
+    def _index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Put every segment in the cells it crosses
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The start of the segments of each cell in the second array (one more
+            start than there are cells, like a compressed sparse row matrix) and the indices of the segments
+        """
+        size = WallSegments.CELL_SIZE
+        segments = self.segments
+
+        # A segment on the border of a cell is put in the cells of both sides, a ray crossing it while going
+        # from one to the other finding it whatever the rounding
+        low = np.clip(np.floor((np.minimum(segments[:, :2], segments[:, 2:]) - 0.5) / size).astype(int), 0,
+                      (self.columns - 1, self.rows - 1))
+        high = np.clip(np.floor((np.maximum(segments[:, :2], segments[:, 2:]) + 0.5) / size).astype(int), 0,
+                       (self.columns - 1, self.rows - 1))
+
+        # Every cell of the bounding box of a segment, then only the ones its line actually goes through
+        spans = high - low + 1
+        owners, offsets = WallSegments._expand(spans[:, 0] * spans[:, 1])
+        cell_x = low[owners, 0] + offsets % spans[owners, 0]
+        cell_y = low[owners, 1] + offsets // spans[owners, 0]
+
+        start, direction = segments[owners, :2], segments[owners, 2:] - segments[owners, :2]
+        centers = (np.stack((cell_x, cell_y), axis=1) + 0.5) * size - start
+        length = np.maximum(np.hypot(*direction.T), 1e-9)
+        crossed = np.abs(centers[:, 0] * direction[:, 1] - centers[:, 1] * direction[:, 0]) / length <= size * 0.71 + 0.5
+
+        cells = cell_x[crossed] * self.rows + cell_y[crossed]
+        order = np.argsort(cells, kind="stable")
+        cell_starts = np.searchsorted(cells[order], np.arange(self.columns * self.rows + 1))
+        return cell_starts, owners[crossed][order]
+
+    @staticmethod
+    def _expand(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Repeat the index of every item as many times as its count, along with the rank of each repetition
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The indices of the items and the ranks, from 0 to count - 1
+        """
+        owners = np.repeat(np.arange(len(counts)), counts)
+        firsts = np.cumsum(counts) - counts
+        return owners, np.arange(len(owners)) - firsts[owners]
+
+    def _candidates(self, items: np.ndarray, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pair every item with every segment of its cell
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The items and the segments of the pairs
+        """
+        starts = self.cell_starts[cells]
+        owners, offsets = WallSegments._expand(self.cell_starts[cells + 1] - starts)
+        return items[owners], self.cell_segments[starts[owners] + offsets]
+
+    def _intersect(self, origins: np.ndarray, directions: np.ndarray,
+                   segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Intersect lines with segments of the walls
+
+        Args:
+            origins (np.ndarray): The (n, 2) origins of the lines
+            directions (np.ndarray): The (n, 2) directions of the lines
+            segments (np.ndarray): The (n,) indices of the segments
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The parameter of each intersection along its line (infinite if the
+            segment is missed) and whether the line goes from the road into a wall there
+        """
+        walls = self.segments[segments]
+        edges = walls[:, 2:] - walls[:, :2]
+        offsets = walls[:, :2] - origins
+        denominators = directions[:, 0] * edges[:, 1] - directions[:, 1] * edges[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (offsets[:, 0] * edges[:, 1] - offsets[:, 1] * edges[:, 0]) / denominators
+            u = (offsets[:, 0] * directions[:, 1] - offsets[:, 1] * directions[:, 0]) / denominators
+        hit = (denominators != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+        return np.where(hit, t, np.inf), denominators > 0
+
+    def cast(self, origins: np.ndarray, directions: np.ndarray, max_distance: float) -> np.ndarray:
+        """Find how far rays go before meeting a wall
+
+        The rays walk the cells of the index together (one cell each per iteration), a ray stopping in the
+        first cell where it crosses a boundary before leaving the cell. A ray whose first boundary takes it out
+        of a wall started in it and goes nowhere.
+
+        Args:
+            origins (np.ndarray): The (n, 2) origins of the rays
+            directions (np.ndarray): The (n, 2) unit directions of the rays
+            max_distance (float): The distance at which a ray stops if it met nothing
+
+        Returns:
+            np.ndarray: The (n,) distances travelled by the rays
+        """
+        size = WallSegments.CELL_SIZE
+        count = len(origins)
+        distances = np.full(count, float(max_distance))
+
+        cell = np.floor(origins / size).astype(int)
+        step = np.where(directions >= 0, 1, -1)
+        with np.errstate(divide="ignore"):
+            delta = np.abs(size / directions)
+            border = (cell + (step > 0)) * size
+            next_border = np.where(directions != 0, (border - origins) / directions, np.inf)
+
+        active = np.arange(count)
+        while len(active):
+            inside = ((cell[active] >= 0) & (cell[active] < (self.columns, self.rows))).all(axis=1)
+            active = active[inside]
+            if not len(active):
+                break
+
+            self.visits += len(active)
+            rays, segments = self._candidates(active, cell[active, 0] * self.rows + cell[active, 1])
+            hits, entering = self._intersect(origins[rays], directions[rays], segments)
+            nearest = np.full(count, np.inf)
+            np.minimum.at(nearest, rays, hits)
+            nearest_entering = np.full(count, np.inf)
+            np.minimum.at(nearest_entering, rays[entering], hits[entering])
+
+            leave = next_border[active].min(axis=1)
+            nearest, nearest_entering = nearest[active], nearest_entering[active]
+            done = (nearest <= leave) | (leave >= max_distance)
+            distances[active[done]] = np.where(nearest[done] < nearest_entering[done], 0,
+                                               np.minimum(nearest[done], max_distance))
+
+            active = active[~done]
+            axis = np.argmin(next_border[active], axis=1)
+            cell[active, axis] += step[active, axis]
+            next_border[active, axis] += delta[active, axis]
+
+        return distances
+
+    def intersects(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Check which segments cross a wall's boundary
+
+        Args:
+            starts (np.ndarray): The (n, 2) starts of the segments
+            ends (np.ndarray): The (n, 2) ends of the segments
+
+        Returns:
+            np.ndarray: Whether each segment meets a wall's boundary
+        """
+        size = WallSegments.CELL_SIZE
+        bounds = (self.columns - 1, self.rows - 1)
+        low = np.clip(np.floor(np.minimum(starts, ends) / size).astype(int), 0, bounds)
+        high = np.clip(np.floor(np.maximum(starts, ends) / size).astype(int), 0, bounds)
+
+        spans = high - low + 1
+        owners, offsets = WallSegments._expand(spans[:, 0] * spans[:, 1])
+        cells = (low[owners, 0] + offsets % spans[owners, 0]) * self.rows + low[owners, 1] + offsets // spans[owners, 0]
+
+        queries, segments = self._candidates(owners, cells)
+        hits = self._intersect(starts[queries], ends[queries] - starts[queries], segments)[0] <= 1
+        crossing = np.zeros(len(starts), dtype=bool)
+        crossing[queries[hits]] = True
+        return crossing
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Check which points are in a wall
+
+        A ray is cast from every point: the first boundary it meets takes it out of a wall if it started in one,
+        and a ray from the road always meets one before leaving the track, the outside counting as a wall.
+
+        Args:
+            points (np.ndarray): The (n, 2) points, inside of the track
+
+        Returns:
+            np.ndarray: Whether each point is in a wall
+        """
+        max_distance = np.hypot(self.width, self.height) + 1
+        directions = np.broadcast_to(WallSegments.PROBE_DIRECTION, np.shape(points))
+        distances = self.cast(np.asarray(points, dtype=float), directions, max_distance)
+        return (distances == 0) | (distances >= max_distance)
@@ -0,0 +1,102 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import copy
+import random
+
+# The tests never open a window, and import the modules from the root of the repository like the scripts
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import neat
+import pygame
+import pytest
+from typing import List, Tuple
+from ai.policy import ACTIVATIONS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+NEAT_CONFIG_PATH = "neat_config.ini"
+GENOME_COUNT = 60
+POPULATION = 20
+EVOLVED_GENERATIONS = 5
+SEED = 0
+
+
+# ------------------ FIXTURES ------------------
+
+
+@pytest.fixture(scope="session", autouse=True)
+def in_root() -> None:
+    """Run the tests from the root of the repository, where the assets and neat_config.ini are"""
+    directory = os.getcwd()
+    os.chdir(ROOT)
+    yield
+    os.chdir(directory)
+
+
+@pytest.fixture(scope="session")
+def display() -> None:
+    """A tiny hidden display, needed to load the sprites of the cars"""
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    yield
+    pygame.quit()
+
+
+@pytest.fixture(scope="session")
+def neat_config(in_root) -> neat.Config:
+    """The configuration of the trainings"""
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, NEAT_CONFIG_PATH)
+
+
+@pytest.fixture(scope="session")
+def random_genomes(neat_config) -> List[neat.DefaultGenome]:
+    """Seeded genomes with several hidden layers, random activations, disabled connections and, for one in three,
+    an output left without any enabled connection"""
+    random.seed(SEED)
+    genome_config = neat_config.genome_config
+    output_keys = genome_config.output_keys
+    names = sorted(ACTIVATIONS)
+
+    genomes = []
+    for key in range(GENOME_COUNT):
+        genome = neat.DefaultGenome(key)
+        genome.configure_new(genome_config)
+        for _ in range(random.randrange(1, 8)):
+            genome.mutate_add_node(genome_config)
+        for _ in range(10):
+            genome.mutate_add_connection(genome_config)
+
+        for node in genome.nodes.values():
+            node.activation = random.choice(names)
+            node.bias = random.gauss(0.0, 1.0)
+            node.response = random.choice([1.0, random.uniform(-2.0, 2.0)])
+        for connection in genome.connections.values():
+            connection.weight = random.gauss(0.0, 1.0)
+            connection.enabled = random.random() > 0.1
+        if key % 3 == 0:
+            for connection in genome.connections.values():
+                if connection.key[1] == output_keys[key % len(output_keys)]:
+                    connection.enabled = False
+        genomes.append(genome)
+    return genomes
+
+
+@pytest.fixture
+def evolved_genomes(neat_config) -> List[Tuple[int, neat.DefaultGenome]]:
+    """The (genome_id, genome) pairs of a seeded population evolved for a few generations on random fitness, like
+    the first generations of a training"""
+    random.seed(SEED)
+    config = copy.deepcopy(neat_config)
+    config.pop_size = POPULATION
+    population = neat.Population(config)
+    population.run(lambda genomes, _: [setattr(genome, "fitness", random.random()) for _, genome in genomes],
+                   EVOLVED_GENERATIONS)
+    return list(population.population.items())
@@ -0,0 +1,50 @@
+# ------------------ IMPORTS ------------------
+
+
+import neat
+import numpy as np
+from ai.batch_network import BatchNetwork
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+SAMPLES = 10
+SEED = 0
+
+
+# ------------------ TESTS ------------------
+
+
+def test_random_genomes_cover_the_hard_cases(random_genomes, neat_config):
+    network = BatchNetwork.create(random_genomes, neat_config)
+
+    assert len(network.layers) >= 3
+    assert any(len(layer["used_activations"]) > 1 for layer in network.layers)
+    assert any(len(set(network.output_columns[row].tolist())) < len(neat_config.genome_config.output_keys)
+               for row in range(len(random_genomes)))
+
+
+def test_activate_matches_feed_forward_network(random_genomes, neat_config):
+    network = BatchNetwork.create(random_genomes, neat_config)
+    nets = [neat.nn.FeedForwardNetwork.create(genome, neat_config) for genome in random_genomes]
+    rng = np.random.default_rng(SEED)
+
+    for _ in range(SAMPLES):
+        inputs = rng.integers(0, 500, size=(len(nets), network.input_count)) * rng.random((len(nets), 1))
+        expected = np.array([net.activate(row) for net, row in zip(nets, inputs.tolist())])
+
+        np.testing.assert_allclose(network.activate(inputs), expected, rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(network.choose(inputs), expected.argmax(axis=1))
+
+
+def test_activate_rows(random_genomes, neat_config):
+    network = BatchNetwork.create(random_genomes, neat_config)
+    rng = np.random.default_rng(SEED)
+    rows = rng.permutation(len(random_genomes))[:len(random_genomes) // 2]
+    inputs = rng.integers(0, 500, size=(len(rows), network.input_count))
+
+    expected = [neat.nn.FeedForwardNetwork.create(random_genomes[row], neat_config).activate(line)
+                for row, line in zip(rows.tolist(), inputs.tolist())]
+
+    np.testing.assert_allclose(network.activate(inputs, rows), expected, rtol=0, atol=1e-9)
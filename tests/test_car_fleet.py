@@ -0,0 +1,189 @@
+# ------------------ IMPORTS ------------------
+
+
+import neat
+import pygame
+import pytest
+import numpy as np
+from ai.car_ai import CarAI
+from render.car import Car, Action
+from render.car_fleet import CarFleet
+from render.colors import Color
+from render.sample_tracks import TRACKS
+from render.track import Track
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+STALL_WINDOW = 20
+STALL_DISTANCE = 100
+PATIENCE = 15
+TICKS = 40
+PARITY_TICKS = 300
+COLLISION_CARS = 5000
+EDGE_POINTS = 200
+BOUNDARY_MARGIN = 2
+SEED = 0
+START_POSES = 8
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def near_boundary(track: Track, points: np.ndarray) -> np.ndarray:
+    """Check which sets of points have one within BOUNDARY_MARGIN pixels of a wall's boundary
+
+    Args:
+        track (Track): The track
+        points (np.ndarray): The (n, points, 2) sets of points
+
+    Returns:
+        np.ndarray: Whether each set has a point with both wall and road pixels around it
+    """
+    grid = np.pad(track.get_collision_grid(), BOUNDARY_MARGIN + 1, constant_values=True)
+    pixels = np.clip(points.astype(int), -1, (track.width, track.height)) + BOUNDARY_MARGIN + 1
+    walls, roads = np.zeros(points.shape[:-1], dtype=bool), np.zeros(points.shape[:-1], dtype=bool)
+    for dx in range(-BOUNDARY_MARGIN, BOUNDARY_MARGIN + 1):
+        for dy in range(-BOUNDARY_MARGIN, BOUNDARY_MARGIN + 1):
+            around = grid[pixels[..., 0] + dx, pixels[..., 1] + dy]
+            walls |= around
+            roads |= ~around
+    return (walls & roads).any(axis=1)
+
+
+# ------------------ FIXTURES ------------------
+
+
+@pytest.fixture
+def corridor():
+    """A straight corridor, long enough for a car to drive right for TICKS ticks, with its start position"""
+    track = Track(1200, 300)
+    pygame.draw.rect(track.surface, Color.BLACK, (20, 60, 1160, 180))
+    track.invalidate()
+    return track, [100 - Car.CAR_SIZE_X / 2, 150 - Car.CAR_SIZE_Y / 2]
+
+
+# ------------------ TESTS ------------------
+
+
+@pytest.mark.parametrize("rule", ["stall", "patience"])
+def test_stopped_car_is_killed_on_the_configured_tick(corridor, rule):
+    track, start_position = corridor
+    if rule == "stall":
+        fleet = CarFleet(2, start_position, track, stall_window=STALL_WINDOW, stall_distance=STALL_DISTANCE)
+        limit, death_ticks = STALL_WINDOW, fleet.stalled_tick
+    else:
+        fleet = CarFleet(2, start_position, track, patience=PATIENCE)
+        limit, death_ticks = PATIENCE, fleet.stagnant_tick
+
+    # The first car drives right at its default speed, the second one never moves
+    fleet.speed[1] = 0
+    for tick in range(1, TICKS + 1):
+        fleet.update()
+        assert fleet.alive[1] == (tick < limit)
+        assert fleet.alive[0]
+
+    assert death_ticks.tolist() == [-1, limit]
+
+
+def test_rules_are_off_by_default(corridor):
+    assert CarAI.STALL_WINDOW == 0 and CarAI.PATIENCE == 0
+
+    track, start_position = corridor
+    fleet = CarFleet(1, start_position, track)
+    fleet.speed[0] = 0
+    for _ in range(TICKS):
+        fleet.update()
+
+    assert fleet.alive[0]
+
+
+@pytest.mark.parametrize("backend", ["grid", "vector"])
+def test_car_in_a_wall_is_killed(corridor, backend):
+    track, _ = corridor
+    wall_segments = track.get_wall_segments() if backend == "vector" else None
+    # Fully in the wall above the corridor, driving along it
+    fleet = CarFleet(1, [600 - Car.CAR_SIZE_X / 2, 30 - Car.CAR_SIZE_Y / 2], track, wall_segments=wall_segments)
+    fleet.update()
+
+    assert not fleet.alive[0]
+
+
+@pytest.mark.parametrize("track_name", TRACKS)
+def test_vector_collisions_match_the_grid(track_name):
+    track, start_position = TRACKS[track_name]()
+    grid_fleet = CarFleet(1, start_position, track)
+    vector_fleet = CarFleet(1, start_position, track, wall_segments=track.get_wall_segments())
+
+    rng = np.random.default_rng(SEED)
+    centers = rng.uniform((0, 0), (track.width, track.height), (COLLISION_CARS, 2))
+    angles = rng.integers(0, 360 // Car.ANGLE_INCREMENT, COLLISION_CARS) * Car.ANGLE_INCREMENT
+    corners = grid_fleet.get_corners(centers, angles)
+    expected = grid_fleet.check_collision(corners)
+    colliding = vector_fleet.check_collision(corners)
+
+    # The grid only looks at the corners and the boundaries are simplified, so the backends may only disagree on
+    # cars with a wall's boundary within a pixel or two of their rectangle
+    edges = np.roll(corners, -1, axis=1) - corners
+    steps = np.linspace(0, 1, EDGE_POINTS)[:, None]
+    outlines = (corners[:, :, None] + edges[:, :, None] * steps).reshape(COLLISION_CARS, -1, 2)
+    disagreeing = np.flatnonzero(colliding != expected)
+    assert 0 < expected.sum() < COLLISION_CARS
+    assert len(disagreeing) <= COLLISION_CARS // 100
+    assert near_boundary(track, outlines[disagreeing]).all()
+
+
+@pytest.mark.parametrize("track_name", TRACKS)
+def test_start_poses_are_on_the_road(track_name):
+    track, start_position = TRACKS[track_name]()
+    start_angle = getattr(track, "start_angle", Car.DEFAULT_ANGLE)
+    poses = CarFleet.get_start_poses(track, start_position, start_angle, START_POSES)
+    positions, angles = np.array([position for position, _ in poses]), np.array([angle for _, angle in poses])
+
+    assert len(poses) == START_POSES
+    assert poses[0] == (start_position, start_angle)
+    assert len(np.unique(positions, axis=0)) == START_POSES
+    assert np.all(angles[1:] % Car.ANGLE_INCREMENT == 0)
+
+    # The whole car is on the road, and it can drive on from there
+    fleet = CarFleet(START_POSES, positions, track, angles)
+    assert not fleet.check_collision(fleet.get_corners(fleet.center, fleet.angle)).any()
+    fleet.update()
+    assert fleet.alive.all()
+
+
+def test_fleet_follows_the_car_rules(evolved_genomes, neat_config, display):
+    track, start_position = TRACKS["ring"]()
+    car_ai = CarAI(evolved_genomes, neat_config, start_position, track, visualise=False)
+    fleet = car_ai.fleet
+
+    # The generation as the Car class simulated it, one car and one network at a time
+    surface = track.get_surface()
+    cars = [Car(start_position, track) for _ in evolved_genomes]
+    nets = [neat.nn.FeedForwardNetwork.create(genome, neat_config) for _, genome in evolved_genomes]
+    fitness = np.zeros(len(cars))
+    actions = {Action.TURN_LEFT: Car.turn_left, Action.TURN_RIGHT: Car.turn_right,
+               Action.ACCELERATE: Car.accelerate, Action.BRAKE: Car.brake}
+
+    for _ in range(PARITY_TICKS):
+        car_ai.compute()
+
+        for car, net in zip(cars, nets):
+            if car.alive:
+                output = net.activate(car.get_data())
+                actions[output.index(max(output))](car)
+        for i, car in enumerate(cars):
+            if car.alive:
+                car.update_sprite(surface)
+                # The Car class never measures its driven distance, the fleet's one along the track is used
+                car.driven_distance = fleet.driven_distance[i]
+                fitness[i] += car.get_reward()
+
+        np.testing.assert_array_equal(fleet.alive, [car.alive for car in cars])
+        np.testing.assert_array_equal(fleet.position, [car.position for car in cars])
+        np.testing.assert_array_equal(fleet.angle, [car.angle for car in cars])
+        np.testing.assert_array_equal(fleet.sensor_distances, [car.get_data() for car in cars])
+        np.testing.assert_allclose(car_ai.fitness, fitness, rtol=1e-12)
+
+    assert 0 < fleet.alive.sum() < len(cars)
@@ -0,0 +1,31 @@
+# ------------------ IMPORTS ------------------
+
+
+import copy
+import gzip
+import pickle
+from ai.checkpoint import BackgroundCheckpointer
+
+
+# ------------------ TESTS ------------------
+
+
+def test_best_genome_is_kept_as_it_was(random_genomes, neat_config, tmp_path):
+    checkpointer = BackgroundCheckpointer(filename_prefix=str(tmp_path / "checkpoint-"))
+    best, other = copy.deepcopy(random_genomes[:2])
+    best.fitness, other.fitness = 10.0, 5.0
+    checkpointer.post_evaluate(neat_config, {}, None, best)
+    checkpointer.post_evaluate(neat_config, {}, None, other)
+
+    # The population evaluates and mutates the same genome object on the next generations
+    weights = {key: connection.weight for key, connection in best.connections.items()}
+    best.fitness = 1.0
+    for connection in best.connections.values():
+        connection.weight += 1.0
+
+    assert checkpointer.best_fitness == 10.0 and checkpointer.best_genome is not best
+    checkpointer.save_winner(neat_config)
+    with gzip.open(checkpointer.filename_prefix + BackgroundCheckpointer.WINNER_SUFFIX) as file:
+        winner = pickle.load(file)
+    assert winner["fitness"] == 10.0
+    assert {key: connection.weight for key, connection in winner["genome"].connections.items()} == weights
@@ -0,0 +1,43 @@
+# ------------------ IMPORTS ------------------
+
+
+from ai.curriculum import Curriculum
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+NAMES = ["easy", "medium", "hard"]
+PROMOTION_FITNESS = 100.0
+
+
+# ------------------ TESTS ------------------
+
+
+def test_tracks_are_added_one_by_one():
+    curriculum = Curriculum(NAMES, PROMOTION_FITNESS)
+    assert curriculum.active == 1
+
+    assert not curriculum.update(PROMOTION_FITNESS - 1)
+    assert curriculum.active == 1
+
+    # A single generation adds a single track, however good it is
+    assert curriculum.update(10 * PROMOTION_FITNESS)
+    assert curriculum.active == 2
+    assert curriculum.update(PROMOTION_FITNESS)
+    assert curriculum.active == 3
+
+    assert not curriculum.update(10 * PROMOTION_FITNESS)
+    assert curriculum.active == len(NAMES)
+
+
+def test_every_track_is_used_without_promotion_fitness():
+    curriculum = Curriculum(NAMES)
+    assert curriculum.active == len(NAMES)
+    assert not curriculum.update(float("inf"))
+
+
+def test_initial_tracks_are_clamped():
+    assert Curriculum(NAMES, PROMOTION_FITNESS, initial=2).active == 2
+    assert Curriculum(NAMES, PROMOTION_FITNESS, initial=0).active == 1
+    assert Curriculum(NAMES, PROMOTION_FITNESS, initial=5).active == len(NAMES)
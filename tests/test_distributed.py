@@ -0,0 +1,89 @@
+# ------------------ IMPORTS ------------------
+
+
+import os
+import sys
+import time
+import subprocess
+import pytest
+from ai.car_ai import CarAI
+from ai.distributed import Coordinator
+from render.car import Car
+from render.sample_tracks import TRACKS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+WORKER_COUNT = 2
+TIMEOUT = 120.0
+CONNECT_TIMEOUT = 0.5
+
+
+# ------------------ FIXTURES ------------------
+
+
+@pytest.fixture
+def coordinator():
+    """A coordinator listening on a free local port"""
+    with Coordinator("127.0.0.1:0", debug=False) as coordinator:
+        coordinator.start()
+        yield coordinator
+
+
+@pytest.fixture
+def workers(coordinator):
+    """Worker processes connected to the coordinator, as started by hand"""
+    address = f"127.0.0.1:{coordinator.server.getsockname()[1]}"
+    processes = [subprocess.Popen([sys.executable, "-m", "ai.distributed", address], cwd=os.getcwd(),
+                                  stdout=subprocess.DEVNULL)
+                 for _ in range(WORKER_COUNT)]
+    yield processes
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+# ------------------ TESTS ------------------
+
+
+def test_workers_give_the_local_fitness(coordinator, workers, random_genomes, neat_config):
+    track, start_position = TRACKS["ring"]()
+    genomes = list(enumerate(random_genomes))
+    car_ai = CarAI(genomes, neat_config, start_position, track, visualise=False)
+    car_ai.simulate()
+    expected = car_ai.get_genome_fitness().tolist()
+
+    dropped = []
+    drop = coordinator.drop
+
+    def record_drop(worker, reason):
+        if worker.connection.fileno() in coordinator.workers:
+            dropped.append(worker.batch)
+        drop(worker, reason)
+
+    coordinator.drop = record_drop
+    deadline = time.monotonic() + TIMEOUT
+
+    # One worker is killed as soon as both simulate a batch, the batch it held goes to the other one
+    def wait(done, total):
+        assert time.monotonic() < deadline, f"only {done} batches out of {total} were simulated"
+        busy = [worker for worker in coordinator.workers.values() if worker.batch is not None]
+        if len(busy) == WORKER_COUNT and workers[0].poll() is None:
+            workers[0].kill()
+
+    for genome in random_genomes:
+        genome.fitness = None
+    coordinator.evaluate(genomes, neat_config, track, start_position, Car.DEFAULT_ANGLE, wait)
+
+    assert [genome.fitness for genome in random_genomes] == expected
+    assert len(dropped) == 1 and dropped[0] is not None
+    assert len(coordinator.workers) == WORKER_COUNT - 1
+
+
+def test_evaluation_gives_up_without_workers(random_genomes, neat_config):
+    track, start_position = TRACKS["ring"]()
+    with Coordinator("127.0.0.1:0", debug=False, connect_timeout=CONNECT_TIMEOUT) as coordinator:
+        with pytest.raises(TimeoutError):
+            coordinator.evaluate(list(enumerate(random_genomes)), neat_config, track, start_position,
+                                 Car.DEFAULT_ANGLE)
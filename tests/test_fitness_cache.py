@@ -0,0 +1,48 @@
+# ------------------ IMPORTS ------------------
+
+
+from ai.fitness_cache import FitnessCache
+from render.car import Car
+from render.sample_tracks import TRACKS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+MAX_SIZE = 3
+
+
+# ------------------ TESTS ------------------
+
+
+def test_least_recently_used_fitness_is_dropped(random_genomes):
+    track, start_position = TRACKS["ring"]()
+    cache = FitnessCache(MAX_SIZE, track, start_position, Car.DEFAULT_ANGLE)
+    genomes = list(enumerate(random_genomes[:MAX_SIZE + 1]))
+    for i, (_, genome) in enumerate(genomes):
+        genome.fitness = float(i)
+
+    cache.store(genomes[:MAX_SIZE], [True] * MAX_SIZE)
+    # The first genome is used again, the second one becomes the least recently used
+    assert cache.split(genomes[:1]) == []
+    cache.store(genomes[MAX_SIZE:], [True])
+
+    for _, genome in genomes:
+        genome.fitness = None
+    missing = cache.split(genomes)
+
+    assert missing == [genomes[1]]
+    assert [genome.fitness for _, genome in genomes] == [0.0, None, 2.0, 3.0]
+    assert len(cache.entries) == MAX_SIZE
+
+
+def test_only_final_fitnesses_are_stored(random_genomes):
+    track, start_position = TRACKS["ring"]()
+    cache = FitnessCache(MAX_SIZE, track, start_position, Car.DEFAULT_ANGLE)
+    genomes = list(enumerate(random_genomes[:2]))
+    for _, genome in genomes:
+        genome.fitness = 1.0
+
+    cache.store(genomes, [True, False])
+
+    assert cache.split(genomes) == [genomes[1]]
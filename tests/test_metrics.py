@@ -0,0 +1,30 @@
+# ------------------ IMPORTS ------------------
+
+
+import csv
+from ai.metrics import Metrics
+
+
+# ------------------ TESTS ------------------
+
+
+def test_csv_log_gains_new_columns(tmp_path):
+    path = str(tmp_path / "metrics.csv")
+    metrics = Metrics(True, path)
+    for generation in range(4):
+        metrics.start_generation()
+        metrics.count("ticks", 10)
+        if generation >= 2:
+            metrics.count("stagnant_cars")
+        metrics.end_generation(best_fitness=generation)
+
+    # A later run appends to the same log
+    metrics = Metrics(True, path)
+    metrics.start_generation()
+    metrics.end_generation(best_fitness=9)
+
+    with open(path, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["best_fitness"] for row in rows] == ["0", "1", "2", "3", "9"]
+    assert [row["stagnant_cars"] for row in rows] == ["", "", "1", "1", ""]
+    assert [row["ticks"] for row in rows] == ["10"] * 4 + [""]
@@ -0,0 +1,64 @@
+# ------------------ IMPORTS ------------------
+
+
+import sys
+import subprocess
+import neat
+import numpy as np
+import pytest
+from ai.checkpoint import compile_policy, export_policy
+from ai.policy import Policy
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+BATCH_SIZE = 50
+SEED = 0
+
+
+# ------------------ TESTS ------------------
+
+
+def test_activate_matches_feed_forward_network(random_genomes, neat_config):
+    rng = np.random.default_rng(SEED)
+    for genome in random_genomes:
+        net = neat.nn.FeedForwardNetwork.create(genome, neat_config)
+        policy = compile_policy(genome, neat_config)
+        inputs = rng.integers(0, 500, size=(BATCH_SIZE, policy.input_count)) * rng.random((BATCH_SIZE, 1))
+        expected = [net.activate(row) for row in inputs.tolist()]
+
+        assert [policy.activate_one(row) for row in inputs.tolist()] == expected
+        np.testing.assert_allclose(policy.activate(inputs), expected, rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(policy.activate(inputs[0]), expected[0])
+        np.testing.assert_array_equal(policy.choose(inputs), np.argmax(expected, axis=1))
+
+
+def test_save_and_load(random_genomes, neat_config, tmp_path):
+    path = tmp_path / "policies" / "policy.npz"
+    genome = max(random_genomes, key=lambda genome: genome.size())
+    export_policy(genome, neat_config, str(path))
+    policy, loaded = compile_policy(genome, neat_config), Policy.load(str(path))
+
+    assert loaded.activations == policy.activations
+    for name in ("biases", "responses", "node_starts", "sources", "weights", "layer_starts", "output_columns"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(policy, name))
+    inputs = np.random.default_rng(SEED).integers(0, 500, size=(BATCH_SIZE, policy.input_count))
+    np.testing.assert_array_equal(loaded.activate(inputs), policy.activate(inputs))
+
+
+def test_load_rejects_other_versions(random_genomes, neat_config, tmp_path):
+    path = tmp_path / "policy.npz"
+    export_policy(random_genomes[0], neat_config, str(path))
+    with np.load(path) as archive:
+        arrays = dict(archive)
+    arrays["version"] = np.int32(Policy.FORMAT_VERSION + 1)
+    np.savez(path, **arrays)
+
+    with pytest.raises(ValueError):
+        Policy.load(str(path))
+
+
+def test_runtime_only_needs_numpy(in_root):
+    code = "import sys, ai.policy; sys.exit(any(m in sys.modules for m in ('pygame', 'neat')))"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,59 @@
+# ------------------ IMPORTS ------------------
+
+
+import glob
+import numpy as np
+from ai.car_ai import CarAI
+from ai.replay import Replay, ReplayWriter
+from render.car import Car
+from render.sample_tracks import TRACKS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+START_POSES = 3
+TICKS = 200
+
+
+# ------------------ TESTS ------------------
+
+
+def test_sensor_centers_are_found_back(evolved_genomes, neat_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(CarAI, "START_POSES", START_POSES)
+    track, start_position = TRACKS["generated"]()
+    car_ai = CarAI(evolved_genomes, neat_config, start_position, track, track.start_angle, visualise=False,
+                   replay_directory=str(tmp_path))
+
+    centers = []
+    while not car_ai.is_over() and car_ai.ticks < TICKS:
+        car_ai.compute()
+        centers.append(car_ai.fleet.center.copy())
+    car_ai.assign_fitness()
+
+    replay = Replay(glob.glob(str(tmp_path / "*.replay"))[0])
+    assert len(replay.header["start_poses"]) == START_POSES
+    assert len(replay) == len(centers)
+
+    # Like render.replay_viewer, from the position of the previous tick (or the start) of every living car
+    for tick, expected in enumerate(centers):
+        alive = np.flatnonzero(replay.ticks[tick]["alive"])
+        if tick:
+            origins = np.stack((replay.ticks[tick - 1]["x"], replay.ticks[tick - 1]["y"]), axis=1)
+        else:
+            origins = replay.get_start_positions()
+        rebuilt = np.trunc(origins[alive]) + (Car.CAR_SIZE_X / 2, Car.CAR_SIZE_Y / 2)
+        np.testing.assert_array_equal(rebuilt, expected[alive])
+
+
+def test_tracks_recorded_in_the_same_directory_are_kept(tmp_path):
+    paths = []
+    for name in ("ring", "maze"):
+        track, start_position = TRACKS[name]()
+        path = str(tmp_path / f"{name}.replay")
+        ReplayWriter(path, track, 1, len(Car.SENSOR_ANGLES), start_position, Car.DEFAULT_ANGLE, 1).close()
+        paths.append((path, track))
+
+    for path, track in paths:
+        loaded = Replay(path).load_track(load_image=False)
+        np.testing.assert_array_equal(loaded.get_collision_grid(), track.get_collision_grid())
@@ -0,0 +1,109 @@
+# ------------------ IMPORTS ------------------
+
+
+import random
+import numpy as np
+import pytest
+from typing import List, Tuple
+from render.car import Car
+from render.sample_tracks import TRACKS
+from render.sensors import DistanceFieldRayCaster, GridRayCaster, SegmentRayCaster
+from render.track import Track
+from render.track_generator import TrackGenerator
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+CAR_COUNT = 150
+SEED = 0
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def place_cars(track: Track, start_position: list, count: int = CAR_COUNT) -> List[Car]:
+    """Put cars on the start position and on random road pixels, with random angles and fractional positions"""
+    rng = random.Random(SEED)
+    grid = track.get_collision_grid()
+    road_x, road_y = np.nonzero(~grid)
+    cars = []
+    for i in range(count):
+        car = Car(start_position, track)
+        if i:
+            k = rng.randrange(len(road_x))
+            car.position = [road_x[k] - Car.CAR_SIZE_X / 2 + rng.random(), road_y[k] - Car.CAR_SIZE_Y / 2 + rng.random()]
+        car.angle = rng.randrange(0, 360, Car.ANGLE_INCREMENT)
+        car.update_center()
+        cars.append(car)
+    return cars
+
+
+def expected_sensors(track: Track, cars: List[Car]) -> Tuple[np.ndarray, np.ndarray]:
+    """Cast the sensors of the cars one pixel at a time with Car.check_sensor"""
+    surface = track.get_surface()
+    for car in cars:
+        car.sensors.clear()
+        for sensor_angle in Car.SENSOR_ANGLES:
+            car.check_sensor(sensor_angle, surface)
+    points = np.array([[point for point, _ in car.sensors] for car in cars])
+    distances = np.array([[distance for _, distance in car.sensors] for car in cars])
+    return points, distances
+
+
+def generated_track(seed: int) -> Tuple[Track, list]:
+    track = TrackGenerator(curvature=0.3, hairpins=2).generate(seed)
+    return track, track.start_position
+
+
+# ------------------ FIXTURES ------------------
+
+
+@pytest.fixture(scope="module", params=[*TRACKS, "generated_1", "generated_7"])
+def track_cars(request, display) -> Tuple[Track, List[Car], np.ndarray, np.ndarray]:
+    """The benchmark tracks and a few more generated ones, with cars and their sensors from Car.check_sensor"""
+    if request.param in TRACKS:
+        track, start_position = TRACKS[request.param]()
+    else:
+        track, start_position = generated_track(int(request.param.split("_")[1]))
+    cars = place_cars(track, start_position)
+    return (track, cars, *expected_sensors(track, cars))
+
+
+# ------------------ TESTS ------------------
+
+
+@pytest.mark.parametrize("caster_class", [GridRayCaster, DistanceFieldRayCaster])
+def test_exact_casters_match_check_sensor(track_cars, caster_class):
+    track, cars, expected_points, expected_distances = track_cars
+    if caster_class is GridRayCaster:
+        caster = GridRayCaster(track.get_collision_grid())
+    else:
+        caster = DistanceFieldRayCaster(track.get_distance_field())
+
+    points, distances = caster.cast(np.array([car.center for car in cars]), np.array([car.angle for car in cars]))
+
+    np.testing.assert_array_equal(points, expected_points)
+    np.testing.assert_array_equal(distances, expected_distances)
+
+
+def test_segment_caster_is_close_to_check_sensor(track_cars):
+    track, cars, _, expected_distances = track_cars
+    caster = SegmentRayCaster(track.get_wall_segments())
+
+    _, distances = caster.cast(np.array([car.center for car in cars]), np.array([car.angle for car in cars]))
+
+    # Only the rays grazing a wall may be further than a pixel or two (see SegmentRayCaster)
+    errors = np.abs(distances - expected_distances)
+    assert np.median(errors) <= 1
+    assert np.mean(errors <= 2) >= 0.9
+
+
+def test_casters_count_their_steps(track_cars):
+    track, cars, _, _ = track_cars
+    centers, angles = np.array([car.center for car in cars]), np.array([car.angle for car in cars])
+    grid, distance_field = GridRayCaster(track.get_collision_grid()), DistanceFieldRayCaster(track.get_distance_field())
+    grid.cast(centers, angles)
+    distance_field.cast(centers, angles)
+
+    assert 0 < distance_field.steps < grid.steps
@@ -0,0 +1,133 @@
+# ------------------ IMPORTS ------------------
+
+
+import json
+import math
+import random
+import pygame
+import pytest
+import numpy as np
+from render.car import Car
+from render.colors import Color
+from render.sample_tracks import TRACKS
+from render.track import Track
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+START_ANGLE = 90
+STROKES = 40
+SEED = 0
+
+# The middle of the road of the ring track (see render.sample_tracks), an ellipse walked every LAP_STEP degrees
+RING_CENTER = (950, 475)
+RING_RADII = (725, 260)
+LAP_STEP = 5
+
+
+# ------------------ FUNCTIONS ------------------
+
+
+def small_track() -> Track:
+    """A small rectangular ring, quick to rebuild after every stroke"""
+    track = Track(480, 320)
+    pygame.draw.rect(track.surface, Color.BLACK, (20, 20, 440, 280))
+    pygame.draw.rect(track.surface, Track.WALL_COLOR, (120, 120, 240, 80))
+    return track
+
+
+def assert_same_arrays(track: Track, expected: Track) -> None:
+    """Check that two tracks have the same wall grid and distance field"""
+    np.testing.assert_array_equal(track.get_collision_grid(), expected.get_collision_grid())
+    np.testing.assert_array_equal(track.get_distance_field(), expected.get_distance_field())
+
+
+# ------------------ TESTS ------------------
+
+
+@pytest.mark.parametrize("load_image", [True, False])
+def test_saved_track_is_loaded_back(tmp_path, load_image):
+    track, start_position = TRACKS["maze"]()
+    track.save(str(tmp_path), start_position, START_ANGLE)
+
+    loaded = Track.load(str(tmp_path), load_image)
+
+    assert (loaded.width, loaded.height) == (track.width, track.height)
+    assert loaded.start_position == start_position and loaded.start_angle == START_ANGLE
+    assert loaded.path == str(tmp_path)
+    assert_same_arrays(loaded, track)
+    np.testing.assert_array_equal(pygame.surfarray.array3d(loaded.get_surface()),
+                                  pygame.surfarray.array3d(track.get_surface()))
+
+    # The arrays are read-only memory maps of the saved files, copied on the first change
+    for array in (loaded.get_collision_grid(), loaded.get_distance_field()):
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+    loaded.invalidate(pygame.draw.circle(loaded.surface, Color.BLACK, (100, 100), 30))
+    assert loaded.get_collision_grid().flags.writeable and loaded.path is None
+    np.testing.assert_array_equal(np.load(tmp_path / Track.COLLISION_GRID_FILE), track.get_collision_grid())
+
+
+def test_unknown_format_version_is_refused(tmp_path):
+    track, start_position = TRACKS["ring"]()
+    track.save(str(tmp_path), start_position)
+    metadata_path = tmp_path / Track.METADATA_FILE
+    metadata = json.loads(metadata_path.read_text())
+    metadata["version"] = Track.FORMAT_VERSION + 1
+    metadata_path.write_text(json.dumps(metadata))
+
+    with pytest.raises(ValueError):
+        Track.load(str(tmp_path))
+
+
+@pytest.mark.parametrize("loaded", [False, True])
+def test_strokes_update_the_arrays_like_a_rebuild(tmp_path, loaded):
+    track = small_track()
+    if loaded:
+        track.save(str(tmp_path / "saved"))
+        track = Track.load(str(tmp_path / "saved"))
+    track.get_collision_grid()
+    track.get_distance_field()
+
+    # Roads and walls drawn with the brush, from clicks and drags, some of them past the border of the track
+    rng = random.Random(SEED)
+    for _ in range(STROKES):
+        track.brush_size = rng.randrange(Track.BRUSH_LIMIT_SIZE, 80)
+        color = rng.choice([Color.BLACK, Track.WALL_COLOR])
+        for _ in range(rng.randrange(1, 4)):
+            track.draw((rng.randrange(-50, track.width + 50), rng.randrange(-50, track.height + 50)), color)
+        track.reset_last_position()
+
+    pygame.image.save(track.surface, str(tmp_path / "image.png"))
+    assert_same_arrays(track, Track.from_image(str(tmp_path / "image.png")))
+
+
+def test_progress_grows_along_the_ring():
+    track, start_position = TRACKS["ring"]()
+    start_center = (start_position[0] + Car.CAR_SIZE_X / 2, start_position[1] + Car.CAR_SIZE_Y / 2)
+    field, lap_length = track.get_progress_field(start_center, 0)
+
+    def progress(degrees: float) -> int:
+        radian = math.radians(degrees)
+        x = RING_CENTER[0] + RING_RADII[0] * math.cos(radian)
+        y = RING_CENTER[1] + RING_RADII[1] * math.sin(radian)
+        return int(field[int(x // Track.PROGRESS_CELL_SIZE), int(y // Track.PROGRESS_CELL_SIZE)])
+
+    # The start is on top of the ring, heading right: clockwise on the screen, all the way around to the start line
+    lap = [progress(degrees) for degrees in range(-90, 270, LAP_STEP)]
+    assert lap[0] <= Track.PROGRESS_CELL_SIZE
+    assert np.all(np.diff(lap) >= 0) and lap[-1] > lap[0]
+
+    # The barrier behind the start is not crossed, the cells behind it are the end of the lap
+    assert progress(-90 - LAP_STEP) > 0.9 * lap_length
+    # The search follows the inside of the ring, whose perimeter is about 2560 pixels
+    assert 2500 < lap_length < 2800
+
+
+def test_open_track_has_no_lap():
+    track, start_position = TRACKS["s_curve"]()
+    start_center = (start_position[0] + Car.CAR_SIZE_X / 2, start_position[1] + Car.CAR_SIZE_Y / 2)
+    field, lap_length = track.get_progress_field(start_center, 0)
+
+    assert lap_length == 0
+    assert field.max() > track.width
@@ -0,0 +1,42 @@
+# ------------------ IMPORTS ------------------
+
+
+import numpy as np
+from render.car import Car
+from render.track_generator import TrackGenerator
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+SEEDS = (0, 1, 7)
+
+
+# ------------------ TESTS ------------------
+
+
+def test_a_seed_always_gives_the_same_track():
+    generator = TrackGenerator(curvature=0.3, hairpins=2)
+    for seed in SEEDS:
+        track = generator.generate(seed)
+        again = TrackGenerator(curvature=0.3, hairpins=2).generate(seed)
+
+        np.testing.assert_array_equal(track.get_collision_grid(), again.get_collision_grid())
+        assert (track.start_position, track.start_angle) == (again.start_position, again.start_angle)
+
+
+def test_seeds_give_different_tracks():
+    generator = TrackGenerator(curvature=0.3, hairpins=2)
+    grids = [generator.generate(seed).get_collision_grid() for seed in SEEDS]
+
+    for i, grid in enumerate(grids):
+        for other in grids[i + 1:]:
+            assert (grid != other).any()
+
+
+def test_start_is_on_the_road():
+    generator = TrackGenerator(curvature=0.3, hairpins=2)
+    for seed in SEEDS:
+        track = generator.generate(seed)
+        center = track.start_position[0] + Car.CAR_SIZE_X / 2, track.start_position[1] + Car.CAR_SIZE_Y / 2
+        assert not track.get_collision_grid()[int(center[0]), int(center[1])]
@@ -0,0 +1,102 @@
+# ------------------ IMPORTS ------------------
+
+
+import re
+import json
+import neat
+import pytest
+import ai.trainer
+from typing import List
+from ai.metrics import Metrics
+from ai.trainer import HeadlessTrainer
+from render.sample_tracks import TRACKS
+
+
+# ------------------ GLOBAL VARIABLES ------------------
+
+
+NEAT_CONFIG_PATH = "neat_config.ini"
+POPULATION = 20
+GENERATIONS = 2
+STEP_LIMIT = 300
+SEED = 0
+FITNESS_CACHE_SIZE = 1000
+
+
+# ------------------ CLASSES ------------------
+
+
+class BestFitnessReporter(neat.reporting.BaseReporter):
+    """Remember the best fitness of every generation"""
+
+    def __init__(self):
+        self.best_fitnesses = []
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.best_fitnesses.append(best_genome.fitness)
+
+
+# ------------------ FIXTURES ------------------
+
+
+@pytest.fixture
+def neat_config_path(tmp_path) -> str:
+    """The configuration of the trainings, with a smaller population"""
+    with open(NEAT_CONFIG_PATH) as file:
+        content = re.sub(r"(?m)^pop_size\s*=.*$", f"pop_size = {POPULATION}", file.read())
+    path = tmp_path / "neat_config.ini"
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.fixture
+def train(neat_config_path, monkeypatch):
+    """Run a short seeded training and get the best fitness of each of its generations"""
+    load_population = ai.trainer.load_population
+
+    def train(**options) -> List[float]:
+        reporter = BestFitnessReporter()
+
+        def load_reported_population(*args) -> neat.Population:
+            population = load_population(*args)
+            population.add_reporter(reporter)
+            return population
+
+        monkeypatch.setattr(ai.trainer, "load_population", load_reported_population)
+        track, start_position = TRACKS["ring"]()
+        trainer = HeadlessTrainer(neat_config_path, track, start_position, max_simulations=GENERATIONS,
+                                  step_limit=STEP_LIMIT, debug=False, seed=SEED, **options)
+        trainer.run()
+        assert len(reporter.best_fitnesses) == GENERATIONS
+        return reporter.best_fitnesses
+
+    return train
+
+
+# ------------------ TESTS ------------------
+
+
+def test_seeded_training_is_repeatable(train):
+    assert train() == train()
+
+
+def test_workers_give_the_same_generations(train):
+    assert train(workers=2) == train(workers=1)
+
+
+def test_fitness_cache_gives_the_same_generations(train):
+    assert train(fitness_cache_size=FITNESS_CACHE_SIZE) == train()
+
+
+def test_workers_log_the_same_columns(train, tmp_path):
+    logs = []
+    for workers in (1, 2):
+        path = tmp_path / f"metrics_{workers}.jsonl"
+        train(workers=workers, metrics=Metrics(True, str(path)))
+        logs.append([json.loads(line) for line in path.read_text().splitlines()])
+
+    for rows in logs:
+        assert len(rows) == GENERATIONS
+        assert all({"cars", "best_fitness", "best_laps"} <= row.keys() for row in rows)
+    local, parallel = ([(row["best_fitness"], row["best_laps"]) for row in rows] for rows in logs)
+    assert parallel == local